@@ -2,17 +2,29 @@ import chainlit as cl
 import sys
 import os
 print(os.getcwd())
-from ephemerear.EphemerEar import EphemerEar
+from ephemerear.registry import BotRegistry
 
 BOT_PATH = '/Users/donalphipps/Documents/aiphoria/'
 sys.path.append(BOT_PATH)
 
-ee = EphemerEar('donbot.yaml')
+# Every *.yaml config in BOTS_DIR is served as a chat profile named after the
+# file, e.g. donbot.yaml -> "donbot". Bots are built on first use and rebuilt
+# when their config or prompt files change.
+BOTS_DIR = os.environ.get('EPHEMEREAR_BOTS_DIR', BOT_PATH)
+bots = BotRegistry.from_directory(BOTS_DIR)
+DEFAULT_BOT = os.environ.get('EPHEMEREAR_DEFAULT_BOT', 'donbot')
+
+@cl.set_chat_profiles
+async def chat_profiles():
+    return [cl.ChatProfile(name=bot_id, markdown_description=f"Chat with {bot_id}.") for bot_id in bots.bot_ids]
 
 @cl.on_message
 async def main(message: cl.Message):
-    response = ee.gpt_chat(message.content)
-    # Send a response back to the user
-    await cl.Message(
-        content=response,
-    ).send()
+    ee = bots.get(cl.user_session.get("chat_profile") or DEFAULT_BOT)
+    # agpt_chat_stream awaits the model and offloads file I/O, so other
+    # sessions keep being served while this one waits for its answer.
+    response = cl.Message(content="")
+    async for token in ee.agpt_chat_stream(message.content, conversation_id=cl.user_session.get("id")):
+        await response.stream_token(token)
+    # Send the completed response back to the user
+    await response.send()
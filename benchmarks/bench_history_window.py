@@ -0,0 +1,60 @@
+"""Benchmark the per-turn cost of selecting the chat history window.
+
+Usage:
+python benchmarks/bench_history_window.py [--fake-tokenizer]
+
+The per-turn time should stay flat as the history grows, because token counts
+are cached on each entry and the window selection stops once it is full.
+``--fake-tokenizer`` swaps tiktoken for a whitespace count so the benchmark
+can run offline.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+ee_module = importlib.import_module("ephemerear.EphemerEar")
+from ephemerear.EphemerEar import select_message_window
+
+
+def make_history(size: int):
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i} " * 20}
+        for i in range(size)
+    ]
+
+
+def time_turns(history, max_tokens: int, turns: int) -> float:
+    # The first turn tokenises the window and caches the counts on each entry.
+    select_message_window(history, max_tokens)
+    start = time.perf_counter()
+    for _ in range(turns):
+        select_message_window(history, max_tokens)
+    return (time.perf_counter() - start) / turns
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1_000, 10_000, 100_000])
+    parser.add_argument("--max-tokens", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--fake-tokenizer", action="store_true")
+    args = parser.parse_args()
+
+    if args.fake_tokenizer:
+        ee_module.count_tokens = lambda text, encoding_name="p50k_base": len(text.split())
+
+    print(f"{'history':>10} {'per turn (us)':>15}")
+    for size in args.sizes:
+        per_turn = time_turns(make_history(size), args.max_tokens, args.turns)
+        print(f"{size:>10} {per_turn * 1e6:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Benchmark per-call latency with and without a shared connection pool.
+
+Usage:
+python benchmarks/bench_http_pool.py [--calls 200] [--connect-delay 0.03]
+
+A local HTTP stub stands in for the OpenAI and Pushover APIs. It sleeps for
+``--connect-delay`` whenever a new connection is opened, to approximate the
+TCP and TLS handshake that a fresh client pays against the real services.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from ephemerear.clients import ClientRegistry
+
+CHAT_COMPLETION = {
+    "id": "chatcmpl-bench",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "gpt-4o-mini",
+    "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}],
+}
+
+
+def make_handler(connect_delay: float):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            time.sleep(connect_delay)
+            super().setup()
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            body = json.dumps(CHAT_COMPLETION if "chat" in self.path else {"status": 1}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return StubHandler
+
+
+def measure(call, calls: int):
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=100)
+    parser.add_argument("--connect-delay", type=float, default=0.03)
+    args = parser.parse_args()
+
+    import requests
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.connect_delay))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    registry = ClientRegistry("bench-key", base_url=f"{base_url}/v1")
+    messages = [{"role": "user", "content": "hi"}]
+
+    def fresh_openai():
+        from openai import OpenAI
+
+        with OpenAI(api_key="bench-key", base_url=f"{base_url}/v1") as client:
+            client.chat.completions.create(model="gpt-4o-mini", messages=messages)
+
+    def shared_openai():
+        registry.openai().chat.completions.create(model="gpt-4o-mini", messages=messages)
+
+    def fresh_pushover():
+        requests.post(f"{base_url}/1/messages.json", data={"message": "hi"}).raise_for_status()
+
+    def shared_pushover():
+        registry.http_session().post(f"{base_url}/1/messages.json", data={"message": "hi"}).raise_for_status()
+
+    print(f"{'call':<10} {'client per call (ms)':>22} {'shared pool (ms)':>18}")
+    for name, fresh, shared in [("chat", fresh_openai, shared_openai), ("pushover", fresh_pushover, shared_pushover)]:
+        print(f"{name:<10} {measure(fresh, args.calls):>22.2f} {measure(shared, args.calls):>18.2f}")
+
+    registry.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Benchmark how long importing EphemerEar takes in a fresh interpreter.
+
+Usage:
+python benchmarks/bench_import_time.py [--runs 10] [--top 10] [--max-ms 50]
+
+Each statement is run ``--runs`` times with ``python -X importtime`` and the
+median cumulative import time of the ``ephemerear`` modules is reported,
+followed by the slowest modules imported along the way. With ``--max-ms``
+the script exits non-zero when any statement is slower than that, so it
+can guard against regressions in CI.
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+STATEMENTS = [
+    "import ephemerear",
+    "from ephemerear.EphemerEar import EphemerEar",
+    "from ephemerear.registry import BotRegistry",
+    "from ephemerear.transcribe import handle_audio",
+]
+
+
+def import_times(statement: str):
+    """Return ``{module: (self_us, cumulative_us)}`` for one run of *statement*."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # header line
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--max-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    too_slow = []
+    for statement in STATEMENTS:
+        totals = []
+        self_times = defaultdict(list)
+        for _ in range(args.runs):
+            times = import_times(statement)
+            # Top-level ephemerear modules; their cumulative times don't overlap.
+            totals.append(sum(
+                cumulative for name, (_, cumulative) in times.items()
+                if name.startswith("ephemerear") and not any(
+                    other != name and name.startswith(other + ".") for other in times
+                )
+            ) / 1000)
+            for name, (self_us, _) in times.items():
+                self_times[name].append(self_us / 1000)
+
+        median_ms = statistics.median(totals)
+        print(f"{statement}\n  median {median_ms:.1f} ms over {args.runs} runs, {len(self_times)} modules")
+        slowest = sorted(self_times.items(), key=lambda item: statistics.median(item[1]), reverse=True)
+        for name, values in slowest[:args.top]:
+            print(f"    {statistics.median(values):7.2f} ms  {name}")
+        if args.max_ms is not None and median_ms > args.max_ms:
+            too_slow.append(statement)
+
+    if too_slow:
+        sys.exit(f"Import time above {args.max_ms} ms: {', '.join(too_slow)}")
+
+
+if __name__ == "__main__":
+    main()
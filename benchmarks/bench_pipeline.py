@@ -0,0 +1,304 @@
+"""Benchmark the chat and transcription pipeline end to end.
+
+Usage:
+python benchmarks/bench_pipeline.py [--fake-tokenizer] [--save results.json] [--baseline results.json]
+
+Everything runs against local fakes of the OpenAI and Pushover APIs
+(benchmarks/fake_services.py) that add ``--latency`` plus up to ``--jitter``
+seconds to every request and fail ``--error-rate`` of them; uploads to the
+transcription endpoint also take as long as they would at ``--upload-mbps``.
+The fixtures are synthetic: histories of ``--history-sizes`` entries and
+stereo 44.1 kHz tone recordings of ``--audio-seconds`` seconds, a fifth of
+which is silence. The scenarios are:
+
+- ``chat``: ``gpt_chat`` turns, with Pushover notifications on;
+- ``split``: ``split_audio`` cutting a recording into one-minute chunks;
+- ``transcribe``: ``whisper_api_transcribe`` sending ``--chunks`` chunks;
+- ``audio``: ``handle_audio`` from recording to markdown transcript;
+- ``preprocess``: the same with ``stt_preprocess`` on, so recordings are
+  downmixed, trimmed and sent as Opus.
+
+Latency percentiles and throughput are printed per scenario. ``--save``
+writes them to JSON; ``--baseline`` compares the median latency of each
+scenario with a saved run and exits with status 1 when one is more than
+``--max-regression`` slower.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import math
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import wave
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fake_services import FakeServices
+
+from ephemerear.clients import ClientRegistry
+from ephemerear.transcribe import TranscriptionContext, handle_audio, split_audio, whisper_api_transcribe
+
+ee_module = importlib.import_module("ephemerear.EphemerEar")
+
+SAMPLE_RATE = 44100
+SCENARIOS = ("chat", "split", "transcribe", "audio", "preprocess")
+
+
+def percentile(timings: List[float], fraction: float) -> float:
+    """Return the *fraction* percentile of *timings*, interpolating between ranks."""
+    ordered = sorted(timings)
+    position = (len(ordered) - 1) * fraction
+    lower, upper = math.floor(position), math.ceil(position)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(timings: List[float], items_per_run: float = 1, unit: str = "runs") -> Dict[str, float]:
+    return {
+        "n": len(timings),
+        "p50_ms": percentile(timings, 0.5) * 1000,
+        "p90_ms": percentile(timings, 0.9) * 1000,
+        "p99_ms": percentile(timings, 0.99) * 1000,
+        "mean_ms": sum(timings) / len(timings) * 1000,
+        "throughput": items_per_run * len(timings) / sum(timings),
+        "unit": unit,
+    }
+
+
+def measure(run: Callable[[int], None], repeat: int) -> List[float]:
+    timings = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            run(i)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def write_config(directory: Path, services: FakeServices, preprocess: bool = False) -> str:
+    config_path = directory / "config.yaml"
+    config_path.write_text(f"""
+bot:
+  name: BenchBot
+  model: gpt-4o-mini
+  cache: {directory}/cache/
+  history_file: {directory}/memory/history.json
+  history_backend: jsonl
+  system_prompt: {directory}/persona/system.md
+  use_pushover: true
+  max_message_window: 2000
+  openai_base_url: {services.base_url}/v1
+  pushover_url: {services.pushover_url}
+  transcript_cache: false
+  stt_chunk_minutes: 1
+  stt_preprocess: {str(preprocess).lower()}
+user:
+  name: BenchUser
+  user_details: {directory}/user/user_details.txt
+auth_tokens:
+  openai: bench-key
+  pushover_user: bench-user
+  pushover_key: bench-key
+stores:
+  responses: {directory}/output/responses/
+  transcripts: {directory}/output/transcripts/
+""")
+    return str(config_path)
+
+
+def make_history(size: int):
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"history message {i} " * 20}
+        for i in range(size)
+    ]
+
+
+def write_recording(path: Path, seconds: float) -> str:
+    """Write a stereo 44.1 kHz tone that pauses for 4 seconds out of every 20."""
+    tone = b"".join(
+        struct.pack("<hh", sample, sample)
+        for sample in (int(8000 * math.sin(2 * math.pi * 440 * i / SAMPLE_RATE)) for i in range(SAMPLE_RATE))
+    )
+    silence = bytes(len(tone))
+    frames = b"".join(silence if second % 20 >= 16 else tone for second in range(int(seconds)))
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(frames)
+    return str(path)
+
+
+def bench_chat(directory: Path, services: FakeServices, history_sizes: List[int], turns: int) -> Dict[str, dict]:
+    results = {}
+    for size in history_sizes:
+        bot_dir = directory / f"chat-{size}"
+        bot_dir.mkdir()
+        ee = ee_module.EphemerEar(write_config(bot_dir, services))
+        ee.history_store.append(make_history(size))
+        # The first turn pays for importing and connecting the OpenAI client.
+        ee.gpt_chat("warm-up turn")
+        timings = measure(lambda i: ee.gpt_chat(f"benchmark turn {i}"), turns)
+        ee.close()
+        results[f"chat[history={size}]"] = summarize(timings, unit="turns")
+    return results
+
+
+def bench_split(directory: Path, recordings: Dict[int, str], repeat: int) -> Dict[str, dict]:
+    results = {}
+    for seconds, recording in recordings.items():
+        chunk_dir = directory / f"split-{seconds}"
+
+        def run(i):
+            split_audio(recording, target_length_ms=60_000, cache_dir=str(chunk_dir))
+            shutil.rmtree(chunk_dir)
+
+        results[f"split[{seconds}s]"] = summarize(measure(run, repeat), items_per_run=seconds, unit="audio s")
+    return results
+
+
+def bench_transcribe(directory: Path, registry: ClientRegistry, chunks: int, repeat: int) -> Dict[str, dict]:
+    chunk_paths = []
+    for i in range(chunks):
+        path = directory / f"chunk-{i:03}.mp3"
+        path.write_bytes(os.urandom(64 * 1024))
+        chunk_paths.append(str(path))
+
+    def run(i):
+        whisper_api_transcribe(chunk_paths, "bench-key", retry_backoff=0.05, client=registry.transcription_client())
+
+    # The first job pays for importing and connecting the OpenAI client.
+    measure(run, 1)
+    return {f"transcribe[{chunks} chunks]": summarize(measure(run, repeat), items_per_run=chunks, unit="chunks")}
+
+
+def bench_audio(
+    directory: Path, services: FakeServices, recordings: Dict[int, str], repeat: int, preprocess: bool = False
+) -> Dict[str, dict]:
+    scenario = "preprocess" if preprocess else "audio"
+    bot_dir = directory / scenario
+    bot_dir.mkdir()
+    context = TranscriptionContext.from_config_file(write_config(bot_dir, services, preprocess))
+    config = context.config
+    results = {}
+    for seconds, recording in recordings.items():
+        def run(i):
+            # A new name per run, or the transcript would be skipped as a duplicate.
+            copy = bot_dir / f"audio{seconds}x{i}-recording.wav"
+            os.link(recording, copy)
+            handle_audio(
+                str(copy),
+                config["auth_tokens"]["openai"],
+                "",
+                config["stores"]["transcripts"],
+                cache_dir=config["bot"]["cache"],
+                context=context,
+            )
+
+        results[f"{scenario}[{seconds}s]"] = summarize(measure(run, repeat), items_per_run=seconds, unit="audio s")
+    context.close()
+    return results
+
+
+def print_results(results: Dict[str, dict], baseline: Dict[str, dict]) -> Dict[str, float]:
+    """Print a table of *results*; return each scenario's p50 change against *baseline*."""
+    header = f"{'scenario':<26} {'n':>4} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'throughput':>20}"
+    if baseline:
+        header += f" {'p50 vs base':>12}"
+    print(header)
+    changes = {}
+    for name, result in results.items():
+        line = (
+            f"{name:<26} {result['n']:>4} {result['p50_ms']:>9.1f} {result['p90_ms']:>9.1f} "
+            f"{result['p99_ms']:>9.1f} {result['throughput']:>11.1f} {result['unit'] + '/s':<8}"
+        )
+        if name in baseline:
+            changes[name] = result["p50_ms"] / baseline[name]["p50_ms"] - 1
+            line += f" {changes[name]:>+12.1%}"
+        print(line)
+    return changes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument("--turns", type=int, default=20, help="Chat turns per history size")
+    parser.add_argument("--history-sizes", default="0,1000,10000")
+    parser.add_argument("--audio-seconds", default="30,120,600")
+    parser.add_argument("--chunks", type=int, default=8, help="Chunks per transcription job")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per audio and transcription scenario")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every fake API request")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Up to this many more seconds, at random")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of fake API requests that fail with a 500")
+    parser.add_argument("--upload-mbps", type=float, default=20.0, help="Simulated upload bandwidth for transcriptions (0 for unlimited)")
+    parser.add_argument("--fake-tokenizer", action="store_true")
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare with results saved by --save")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed p50 slowdown against the baseline")
+    args = parser.parse_args()
+
+    if args.fake_tokenizer:
+        ee_module.count_tokens = lambda text, encoding_name="p50k_base": len(text.split())
+    scenarios = set(args.scenarios.split(","))
+    audio_scenarios = {"split", "audio", "preprocess"}
+    if scenarios & audio_scenarios and not (shutil.which("ffmpeg") and shutil.which("ffprobe")):
+        print("ffmpeg and ffprobe not found: skipping the split, audio and preprocess scenarios")
+        scenarios -= audio_scenarios
+
+    results: Dict[str, dict] = {}
+    with tempfile.TemporaryDirectory() as tmp, FakeServices(
+        first_token_delay=0, token_delay=0, tokens=20,
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, upload_mbps=args.upload_mbps,
+    ) as services:
+        directory = Path(tmp)
+        recordings = {}
+        if scenarios & audio_scenarios:
+            for seconds in map(int, args.audio_seconds.split(",")):
+                recordings[seconds] = write_recording(directory / f"tone-{seconds}s.wav", seconds)
+
+        if "chat" in scenarios:
+            results.update(bench_chat(directory, services, [int(size) for size in args.history_sizes.split(",")], args.turns))
+        if "split" in scenarios:
+            results.update(bench_split(directory, recordings, args.repeat))
+        if "transcribe" in scenarios:
+            registry = ClientRegistry("bench-key", base_url=f"{services.base_url}/v1")
+            results.update(bench_transcribe(directory, registry, args.chunks, args.repeat))
+            registry.close()
+        if "audio" in scenarios:
+            results.update(bench_audio(directory, services, recordings, args.repeat))
+        if "preprocess" in scenarios:
+            results.update(bench_audio(directory, services, recordings, args.repeat, preprocess=True))
+
+        requests = ", ".join(f"{endpoint} {count}" for endpoint, count in sorted(services.requests.items()))
+        errors = sum(services.errors.values())
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)["results"]
+    changes = print_results(results, baseline)
+    print(f"Fake API requests: {requests or 'none'} ({errors} injected errors)")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump({"args": vars(args), "results": results}, file, indent=2)
+        print(f"Results saved to {args.save}")
+
+    regressions = [name for name, change in changes.items() if change > args.max_regression]
+    if regressions:
+        print(f"Slower than the baseline by more than {args.max_regression:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Benchmark the per-file overhead of handling a recording end to end.
+
+Usage:
+python benchmarks/bench_transcript_overhead.py [--files 20] [--prompt-ratio 0.5] [--fake-tokenizer]
+
+Every recording's transcript is already in the transcript cache and the chat
+API is a local fake answering immediately (benchmarks/fake_services.py), so
+what is measured is EphemerEar's own work per file: loading config, building
+the bot, writing markdown and sending the prompt. Files are handled once
+without a ``TranscriptionContext`` (each file loads the config and builds
+its own bot, as before) and once with one context shared by every file.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import importlib
+import io
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fake_services import FakeServices
+
+from ephemerear.cache import cache_key, hash_file
+from ephemerear.transcribe import DEFAULT_OPENAI_TRANSCRIBE_MODEL, TranscriptionContext, handle_audio
+
+ee_module = importlib.import_module("ephemerear.EphemerEar")
+
+
+def write_config(directory: Path, base_url: str) -> str:
+    config_path = directory / "config.yaml"
+    config_path.write_text(f"""
+bot:
+  name: BenchBot
+  model: gpt-4o-mini
+  cache: {directory}/cache/
+  history_file: {directory}/memory/history.json
+  history_backend: jsonl
+  system_prompt: {directory}/persona/system.md
+  use_pushover: false
+  max_message_window: 2000
+  openai_base_url: {base_url}/v1
+user:
+  name: BenchUser
+  user_details: {directory}/user/user_details.txt
+auth_tokens:
+  openai: bench-key
+stores:
+  responses: {directory}/output/responses/
+  transcripts: {directory}/output/transcripts/
+""")
+    return str(config_path)
+
+
+def write_recordings(directory: Path, context: TranscriptionContext, files: int, prompt_ratio: float, label: str):
+    """Write fake recordings whose transcripts are already cached."""
+    cache = context.transcript_cache(context.config["bot"]["cache"])
+    recordings = []
+    for i in range(files):
+        audio = directory / f"{label}{i:04}-recording.m4a"
+        audio.write_bytes(f"{label} {i}".encode() * 1024)
+        triggered = i < files * prompt_ratio
+        text = f"Prompt: note number {i} for later." if triggered else f"Just thinking out loud, take {i}."
+        cache.put(cache_key(hash_file(str(audio)), "openai", DEFAULT_OPENAI_TRANSCRIBE_MODEL, ""), text)
+        recordings.append(str(audio))
+    return recordings
+
+
+def run(recordings, config, config_file: str, context=None):
+    timings = []
+    for audio in recordings:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            handle_audio(
+                audio,
+                config["auth_tokens"]["openai"],
+                "",
+                config["stores"]["transcripts"],
+                cache_dir=config["bot"]["cache"],
+                config_file=config_file,
+                context=context,
+            )
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--prompt-ratio", type=float, default=0.5, help="Share of recordings that contain a prompt")
+    parser.add_argument("--fake-tokenizer", action="store_true")
+    args = parser.parse_args()
+
+    if args.fake_tokenizer:
+        ee_module.count_tokens = lambda text, encoding_name="p50k_base": len(text.split())
+
+    with tempfile.TemporaryDirectory() as tmp, FakeServices(first_token_delay=0, token_delay=0, tokens=5) as services:
+        directory = Path(tmp)
+        config_file = write_config(directory, services.base_url)
+        context = TranscriptionContext.from_bot(ee_module.EphemerEar(config_file), config_file)
+        recordings = directory / "recordings"
+        recordings.mkdir()
+
+        rebuilt = run(write_recordings(recordings, context, args.files, args.prompt_ratio, "a"), context.config, config_file)
+        shared = run(write_recordings(recordings, context, args.files, args.prompt_ratio, "b"), context.config, config_file, context)
+        context.bot.close()
+
+        print(f"{args.files} files, {args.prompt_ratio:.0%} with a prompt")
+        for label, timings in (("without context", rebuilt), ("shared context", shared)):
+            print(
+                f"{label:<16} median {statistics.median(timings) * 1000:8.1f} ms/file"
+                f"   total {sum(timings) * 1000:8.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Benchmark prompt detection on long transcripts.
+
+Usage:
+python benchmarks/bench_triggers.py [--words 200000] [--repeat 20]
+
+Compares the original approach (lowercase and split the whole transcript
+to test the first words, then lowercase and split it again to cut out the
+prompt) with ``TriggerMatcher``, which only tokenises the first words and
+returns offsets.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from ephemerear.triggers import TriggerMatcher
+
+VOCABULARY = "the a meeting notes about project budget timeline idea call later today tomorrow garden".split()
+
+
+def original_detection(text: str) -> str:
+    word = "prompt|from|prom"
+    splitrange = min(15, len(text.split()))
+    matched = False
+    for split_word in text.lower().split()[0:splitrange]:
+        if re.match(word + ".*", split_word):
+            matched = True
+    if not matched:
+        return ""
+    prompt = text.lower().split("prompt", 1)[1]
+    return prompt.replace(".", "").replace(",", "").strip()
+
+
+def matcher_detection(matcher: TriggerMatcher, text: str) -> str:
+    match = matcher.search(text)
+    return match.prompt(text) if match else ""
+
+
+def make_transcript(words: int, triggered: bool) -> str:
+    rng = random.Random(0)
+    body = " ".join(rng.choice(VOCABULARY) for _ in range(words))
+    return ("Prompt: " if triggered else "Okay so ") + body + "."
+
+
+def measure(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--words", type=int, default=200_000, help="Transcript length (about 20 hours of speech at 200k)")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    matcher = TriggerMatcher()
+    print(f"{'transcript':<24} {'original (ms)':>14} {'matcher (ms)':>14}")
+    for triggered in (False, True):
+        text = make_transcript(args.words, triggered)
+        label = f"{args.words} words, {'prompt' if triggered else 'no prompt'}"
+        original = measure(lambda: original_detection(text), args.repeat)
+        matched = measure(lambda: matcher_detection(matcher, text), args.repeat)
+        print(f"{label:<24} {original:>14.3f} {matched:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
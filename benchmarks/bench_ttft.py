@@ -0,0 +1,90 @@
+"""Benchmark time-to-first-token of gpt_chat_stream against gpt_chat.
+
+Usage:
+python benchmarks/bench_ttft.py [--turns 5] [--fake-tokenizer]
+
+Both paths talk to a local fake OpenAI server (benchmarks/fake_services.py)
+that waits ``--first-token-delay`` seconds and then produces ``--tokens``
+tokens, ``--token-delay`` seconds apart.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fake_services import FakeServices
+
+ee_module = importlib.import_module("ephemerear.EphemerEar")
+
+
+def write_config(directory: Path, base_url: str) -> str:
+    config_path = directory / "config.yaml"
+    config_path.write_text(f"""
+bot:
+  name: BenchBot
+  model: gpt-4o-mini
+  cache: {directory}/cache/
+  history_file: {directory}/memory/history.json
+  history_backend: jsonl
+  system_prompt: {directory}/persona/system.md
+  use_pushover: false
+  max_message_window: 2000
+  openai_base_url: {base_url}/v1
+user:
+  name: BenchUser
+  user_details: {directory}/user/user_details.txt
+auth_tokens:
+  openai: bench-key
+stores:
+  responses: {directory}/output/responses/
+""")
+    return str(config_path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--tokens", type=int, default=50)
+    parser.add_argument("--first-token-delay", type=float, default=0.2)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--fake-tokenizer", action="store_true")
+    args = parser.parse_args()
+
+    if args.fake_tokenizer:
+        ee_module.count_tokens = lambda text, encoding_name="p50k_base": len(text.split())
+
+    with tempfile.TemporaryDirectory() as tmp, FakeServices(
+        first_token_delay=args.first_token_delay, token_delay=args.token_delay, tokens=args.tokens
+    ) as services:
+        ee = ee_module.EphemerEar(write_config(Path(tmp), services.base_url))
+
+        blocking, first_token, stream_total = [], [], []
+        for turn in range(args.turns):
+            start = time.perf_counter()
+            ee.gpt_chat(f"blocking turn {turn}")
+            blocking.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            stream = ee.gpt_chat_stream(f"streaming turn {turn}")
+            next(stream)
+            first_token.append(time.perf_counter() - start)
+            for _ in stream:
+                pass
+            stream_total.append(time.perf_counter() - start)
+
+        print(f"gpt_chat          time to answer:       {statistics.median(blocking) * 1000:8.1f} ms")
+        print(f"gpt_chat_stream   time to first token:  {statistics.median(first_token) * 1000:8.1f} ms")
+        print(f"gpt_chat_stream   time to full answer:  {statistics.median(stream_total) * 1000:8.1f} ms")
+        ee.clients.close()
+
+
+if __name__ == "__main__":
+    main()
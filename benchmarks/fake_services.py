@@ -0,0 +1,177 @@
+"""Local stand-in for the OpenAI and Pushover APIs, used by the benchmarks.
+
+``FakeServices`` runs an HTTP server on localhost that answers:
+
+- chat completions, either in one response or as a server-sent event stream,
+  with a configurable delay before the first token and between tokens;
+- audio transcriptions, after ``latency`` seconds plus the time the upload
+  would take at ``upload_mbps`` megabits per second, if set;
+- anything else (Pushover's ``/1/messages.json``) with ``{"status": 1}``.
+
+Every request waits an extra ``latency`` plus up to ``jitter`` seconds, and
+a share ``error_rate`` of them fail with ``error_status`` instead, so retry
+and error paths can be measured. Requests and injected errors are counted
+per endpoint in ``requests`` and ``errors``.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeServices:
+    """Fake OpenAI and Pushover endpoints; use as a context manager to start and stop them."""
+
+    def __init__(
+        self,
+        first_token_delay: float = 0.2,
+        token_delay: float = 0.02,
+        tokens: int = 50,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+        transcript_words: int = 20,
+        upload_mbps: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.tokens = tokens
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.transcript_words = transcript_words
+        self.upload_mbps = upload_mbps
+        self.requests: Counter = Counter()
+        self.errors: Counter = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    @property
+    def pushover_url(self) -> str:
+        return f"{self.base_url}/1/messages.json"
+
+    def __enter__(self) -> "FakeServices":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _draw(self, endpoint: str):
+        """Count a request and return (extra delay, whether to fail it)."""
+        with self._lock:
+            self.requests[endpoint] += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            fail = self._random.random() < self.error_rate
+            if fail:
+                self.errors[endpoint] += 1
+        return delay, fail
+
+    def _make_handler(self):
+        services = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, payload, status: int = 200) -> None:
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                # Keep the OpenAI client's own retries quick.
+                self.send_header("retry-after-ms", "10")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.path.endswith("/chat/completions"):
+                    endpoint = "chat"
+                elif self.path.endswith("/audio/transcriptions"):
+                    endpoint = "transcriptions"
+                else:
+                    endpoint = "pushover"
+                delay, fail = services._draw(endpoint)
+                if endpoint == "transcriptions" and services.upload_mbps:
+                    delay += len(body) * 8 / (services.upload_mbps * 1e6)
+                time.sleep(delay)
+                if fail:
+                    self._send_json(
+                        {"error": {"message": "Injected error", "type": "server_error", "code": None}},
+                        status=services.error_status,
+                    )
+                elif endpoint == "chat":
+                    request = json.loads(body or b"{}")
+                    if request.get("stream"):
+                        self._stream_chat(request)
+                    else:
+                        self._chat(request)
+                elif endpoint == "transcriptions":
+                    self._send_json({"text": " ".join(f"word{i}" for i in range(services.transcript_words))})
+                else:
+                    self._send_json({"status": 1})
+
+            def _words(self):
+                return [f"token{i} " for i in range(services.tokens)]
+
+            def _chat(self, request):
+                time.sleep(services.first_token_delay + services.token_delay * (services.tokens - 1))
+                self._send_json({
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "created": 0,
+                    "model": request.get("model", "fake"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": "".join(self._words())},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {"prompt_tokens": 10, "completion_tokens": services.tokens, "total_tokens": 10 + services.tokens},
+                })
+
+            def _stream_chat(self, request):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                def send_event(data: str) -> None:
+                    payload = f"data: {data}\n\n".encode()
+                    self.wfile.write(f"{len(payload):x}\r\n".encode() + payload + b"\r\n")
+                    self.wfile.flush()
+
+                time.sleep(services.first_token_delay)
+                for i, word in enumerate(self._words()):
+                    if i:
+                        time.sleep(services.token_delay)
+                    send_event(json.dumps({
+                        "id": "chatcmpl-fake",
+                        "object": "chat.completion.chunk",
+                        "created": 0,
+                        "model": request.get("model", "fake"),
+                        "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}],
+                    }))
+                send_event("[DONE]")
+                self.wfile.write(b"0\r\n\r\n")
+
+        return Handler
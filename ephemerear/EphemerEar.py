@@ -1,18 +1,60 @@
+import atexit
 import datetime
-import inspect
-import json
+import functools
 import os
+import threading
+import weakref
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
 
 import ephemerear.functions
-import yaml
 
-def count_tokens(text, encoding_name: str = 'p50k_base') -> int:
-    """Return the number of tokens in *text* for the given encoding.
+from ephemerear.clients import ClientRegistry
+from ephemerear.fileio import atomic_write_text, create_unique
+from ephemerear.history import DEFAULT_SEGMENT_SIZE, open_history_store
+from ephemerear.metrics import metrics as _metrics
+from ephemerear.retrieval import (
+    DEFAULT_EMBEDDING_MODEL,
+    DEFAULT_RETRIEVAL_MAX_TOKENS,
+    DEFAULT_RETRIEVAL_REFRESH_SECONDS,
+    DEFAULT_RETRIEVAL_STORES,
+    DEFAULT_RETRIEVAL_TOP_K,
+    OpenAIEmbedder,
+    Retriever,
+    VectorIndex,
+    format_passages,
+)
+from ephemerear.side_effects import SideEffectQueue
+from ephemerear.summary import (
+    DEFAULT_SUMMARY_BATCH_TOKENS,
+    DEFAULT_SUMMARY_MAX_TOKENS,
+    DEFAULT_SUMMARY_MIN_MESSAGES,
+    RollingSummary,
+    summary_path_for,
+    summary_request,
+)
+from ephemerear.triggers import TOKEN_PATTERN
+from ephemerear.tools import (
+    DEFAULT_MAX_TOOL_ROUNDS,
+    DEFAULT_TOOL_TIMEOUT,
+    DEFAULT_TOOL_WORKERS,
+    ToolExecutor,
+    assistant_tool_message,
+    parse_tool_arguments,
+    tool_definitions,
+)
+
+PUSHOVER_URL = "https://api.pushover.net/1/messages.json"
+DEFAULT_NOTIFICATION_WINDOW = 2.0
+
+@functools.lru_cache(maxsize=None)
+def get_encoding(encoding_name: str = 'p50k_base'):
+    """Return the (cached) ``tiktoken`` encoding called *encoding_name*.
 
     ``tiktoken`` is an optional dependency and is imported lazily so that the
-    package can be used for functionality that doesn't require it.
+    package can be used for functionality that doesn't require it. Building an
+    encoding is expensive, so each one is only constructed once per process.
     """
     try:
         import tiktoken
@@ -21,25 +63,175 @@ def count_tokens(text, encoding_name: str = 'p50k_base') -> int:
             "tiktoken is required for counting tokens"
         ) from exc
 
-    encoding = tiktoken.get_encoding(encoding_name)
-    return len(encoding.encode(text))
+    return tiktoken.get_encoding(encoding_name)
 
-def testforword(text, word, splitrange=15):
+def count_tokens(text, encoding_name: str = 'p50k_base') -> int:
+    """Return the number of tokens in *text* for the given encoding."""
+    return len(get_encoding(encoding_name).encode(text))
+
+def message_tokens(message: Dict[str, Any]) -> int:
+    """Return the token count of a history entry, caching it on the entry.
+
+    The count is stored under the ``tokens`` key so that it is persisted with
+    the history and never has to be recomputed on later turns.
+    """
+    tokens = message.get('tokens')
+    if tokens is None:
+        tokens = count_tokens(message.get('content') or '')
+        message['tokens'] = tokens
+    return tokens
+
+def select_message_window(messages: List[Dict[str, Any]], max_tokens: int) -> List[Dict[str, str]]:
+    """Return the newest non-system messages that fit within *max_tokens*.
+
+    Walks back from the most recent message and stops as soon as the budget is
+    full, so the cost depends on the window size rather than the length of the
+    whole history. Returned messages only carry the keys the chat API accepts.
+    """
+    window = []
+    running_token_count = 0
+    for m in reversed(messages):
+        if m.get('role') == 'system':
+            continue
+        token_count = message_tokens(m)
+        if running_token_count + token_count > max_tokens:
+            break
+        running_token_count += token_count
+        window.append({'role': m['role'], 'content': m['content']})
+    window.reverse()
+    return window
+
+def add_usage(totals: Dict[str, int], response) -> Dict[str, int]:
+    """Add the token usage reported on *response* (if any) to *totals*."""
+    usage = getattr(response, 'usage', None)
+    if usage is None:
+        return totals
+    for key in ('prompt_tokens', 'completion_tokens', 'total_tokens'):
+        value = getattr(usage, key, None)
+        if isinstance(value, int):
+            totals[key] = totals.get(key, 0) + value
+    return totals
+
+@functools.lru_cache(maxsize=64)
+def _compile_word(word: str):
     import re
+    return re.compile(word)
+
+def testforword(text, word, splitrange=15):
+    """Return whether one of the first *splitrange* words of *text* starts with the regex *word*.
+
+    Kept for existing callers; :class:`ephemerear.triggers.TriggerMatcher`
+    also reports where the prompt starts.
+    """
     if text is None:
         return False
-    splitrange = min(splitrange, len(text.split()))
-    wordmatched = False
-    text_split = text.lower().split()[0:splitrange]
-    for split_word in text_split:
-        if re.match(word + ".*", split_word):
-            wordmatched = True
-    return wordmatched
+    pattern = _compile_word(word)
+    # Only the words that are checked are split off and lowercased.
+    return any(
+        pattern.match(token.group(0).lower())
+        for token, _ in zip(TOKEN_PATTERN.finditer(text), range(splitrange))
+    )
+
+class StreamedMessage:
+    """Assembles a streamed chat completion into a complete message.
+
+    Exposes ``content``, ``tool_calls`` and ``function_call`` like a
+    non-streamed completion message, so it can be handled by the same code
+    once the stream ends.
+    """
+
+    def __init__(self) -> None:
+        self._content: List[str] = []
+        self._function_name: List[str] = []
+        self._function_arguments: List[str] = []
+        self._tool_calls: Dict[int, Dict[str, Any]] = {}
+        self.usage = None
+
+    def add(self, chunk) -> str:
+        """Fold *chunk* into the message and return any new text in it."""
+        # With include_usage the last chunk carries the usage and no choices.
+        if getattr(chunk, 'usage', None) is not None:
+            self.usage = chunk.usage
+        if not chunk.choices:
+            return ""
+        delta = chunk.choices[0].delta
+        # Tool calls arrive in fragments keyed by index: the id and name in
+        # the first, the JSON arguments spread over the rest.
+        for call in getattr(delta, 'tool_calls', None) or []:
+            entry = self._tool_calls.setdefault(call.index, {"id": None, "name": [], "arguments": []})
+            if call.id:
+                entry["id"] = call.id
+            if call.function is not None:
+                entry["name"].append(call.function.name or "")
+                entry["arguments"].append(call.function.arguments or "")
+        if getattr(delta, 'function_call', None):
+            self._function_name.append(delta.function_call.name or "")
+            self._function_arguments.append(delta.function_call.arguments or "")
+        if delta.content:
+            self._content.append(delta.content)
+            return delta.content
+        return ""
+
+    @property
+    def content(self) -> Optional[str]:
+        return "".join(self._content) or None
+
+    @property
+    def tool_calls(self):
+        if not self._tool_calls:
+            return None
+        return [
+            SimpleNamespace(
+                id=entry["id"],
+                type="function",
+                function=SimpleNamespace(name="".join(entry["name"]), arguments="".join(entry["arguments"])),
+            )
+            for _, entry in sorted(self._tool_calls.items())
+        ]
+
+    @property
+    def function_call(self):
+        if not self._function_name:
+            return None
+        return SimpleNamespace(name="".join(self._function_name), arguments="".join(self._function_arguments))
+
+@functools.lru_cache(maxsize=None)
+def _module_function_table(module) -> Tuple[Dict[str, Any], Tuple[Dict[str, Any], ...]]:
+    """Return the functions in *module* and their ``<name>_definition`` schemas.
+
+    Inspecting the module is only done once per process; every bot shares
+    the result.
+    """
+    import inspect
+
+    functions_dict = {}
+    function_definitions_list = []
+
+    for name, obj in inspect.getmembers(module):
+        if inspect.isfunction(obj):
+            # Store the function in a dictionary for potential execution
+            functions_dict[name] = obj
+
+        # Assuming every function has a corresponding definition following the naming convention
+        definition_var_name = f"{name}_definition"
+        definition = getattr(module, definition_var_name, None)
+        if definition:
+            # Append the function definition to the list
+            function_definitions_list.append(definition)
+
+    return functions_dict, tuple(function_definitions_list)
 
 class EphemerEar:
-    def __init__(self, config_path: str = 'config.yaml') -> None:
+    def __init__(self, config_path: str = 'config.yaml', config: Optional[Dict[str, Any]] = None, clients: Optional[ClientRegistry] = None) -> None:
+        """Create a bot from *config_path*.
+
+        *config* may be passed when the YAML has already been parsed, and
+        *clients* to share one :class:`ClientRegistry` between several bots
+        (see :class:`ephemerear.registry.BotRegistry`). A shared registry is
+        left open by :meth:`close`.
+        """
         self.config_path = Path(config_path).resolve()
-        self.config = self.load_yaml_to_dict(config_path)
+        self.config = config if config is not None else self.load_yaml_to_dict(config_path)
         verify_and_create_paths(self.config)
 
         history_file_path_str = self.config['bot']['history_file']
@@ -52,33 +244,46 @@ class EphemerEar:
         self.pushover_key = self.config['auth_tokens'].get('pushover_key', '')
         self.pushover_user = self.config['auth_tokens'].get('pushover_user', '')
         self.notify = bool(self.pushover_key and self.pushover_user and self.config['bot']['use_pushover'])
+        self.pushover_url = self.config['bot'].get('pushover_url', PUSHOVER_URL)
+        self._owns_clients = clients is None
+        self.clients = clients if clients is not None else ClientRegistry.from_config(self.config)
+        self._history_lock = threading.Lock()
+        # Held only while a turn holds or waits for the lock, so conversations
+        # that have gone quiet don't keep their lock forever.
+        self._conversation_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self.background_side_effects = self.config['bot'].get('background_side_effects', True)
+        self._side_effects: Optional[SideEffectQueue] = None
+        self._side_effects_lock = threading.Lock()
         self.initialize_history_file()
         # Derive available functions from functions file
         self.functions_module = ephemerear.functions
         self.available_functions, self.functions_definitions = self._load_functions_from_module(self.functions_module)
+        self.tool_executor = ToolExecutor(
+            self.available_functions,
+            timeout=self.config['bot'].get('tool_timeout', DEFAULT_TOOL_TIMEOUT),
+            timeouts=self.config['bot'].get('tool_timeouts'),
+            max_workers=self.config['bot'].get('tool_workers', DEFAULT_TOOL_WORKERS),
+        )
+        self.max_tool_rounds = self.config['bot'].get('max_tool_rounds', DEFAULT_MAX_TOOL_ROUNDS)
+        self.retriever = self._make_retriever()
+        self.history_summary = self._make_history_summary()
+        self.last_usage: Dict[str, int] = {}
+        _metrics.configure(self.config)
 
     def _load_functions_from_module(self, module):
-            functions_dict = {}
-            function_definitions_list = []
-            
-            for name, obj in inspect.getmembers(module):
-                if inspect.isfunction(obj):
-                    # Store the function in a dictionary for potential execution
-                    functions_dict[name] = obj
-                    
-                # Assuming every function has a corresponding definition following the naming convention
-                definition_var_name = f"{name}_definition"
-                definition = getattr(module, definition_var_name, None)
-                if definition:
-                    # Append the function definition to the list
-                    function_definitions_list.append(definition)
-                    
+            functions_dict, function_definitions = _module_function_table(module)
+
             # Wrap the list of function definitions in the structure expected by the OpenAI API
-            functions_definitions = {"functions": function_definitions_list, "function_call": "auto"}
+            functions_definitions = {"functions": list(function_definitions), "function_call": "auto"}
 
-            return functions_dict, functions_definitions
+            # Copy the table so that per-bot changes don't leak into other bots
+            return dict(functions_dict), functions_definitions
+
+    @staticmethod
+    def load_yaml_to_dict(filepath: str) -> Dict[str, Any]:
+        # PyYAML is only needed when building a bot, not to import the package.
+        import yaml
 
-    def load_yaml_to_dict(self, filepath: str) -> Dict[str, Any]:
         yaml_file_path = Path(filepath).resolve()
         if not yaml_file_path.is_file():
             raise FileNotFoundError(f"The file {filepath} does not exist.")
@@ -105,21 +310,37 @@ class EphemerEar:
         return system_prompt.format(user_name=self.config['user']['name'], user_details=user_details, bot_name=self.config['bot']['name'])
 
     def initialize_history_file(self) -> None:
-        if not self.history_file_path.is_file():
-            with self.history_file_path.open('w') as file:
-                json.dump([], file)
+        self.history_store = open_history_store(
+            self.history_file_path,
+            backend=self.config['bot'].get('history_backend', 'json'),
+            segment_size=self.config['bot'].get('history_segment_size', DEFAULT_SEGMENT_SIZE),
+        )
 
-    def get_history(self) -> List[Dict[str, str]]:
-        with self.history_file_path.open('r') as file:
-            return json.load(file)
+    def get_history(self) -> List[Dict[str, Any]]:
+        return self.history_store.read_all()
 
-    def save_history(self, history: List[Dict[str, str]]) -> None:
+    def save_history(self, history: List[Dict[str, Any]]) -> None:
         # Remove any system messages before persisting chat history. Modifying
         # the list while iterating can lead to skipped items, so build a new
         # list instead of calling ``list.remove`` in-place.
         filtered_history = [m for m in history if m.get('role') != 'system']
-        with self.history_file_path.open('w') as file:
-            json.dump(filtered_history, file)
+        self.history_store.replace(filtered_history)
+
+    def _pushover_payload(self, title: str, message: str, user_key: str, api_key: str, message_url: Optional[str]) -> Dict[str, Any]:
+        if not title:
+            raise ValueError("The title must not be empty.")
+        if not user_key:
+            raise ValueError("The user_key must not be empty.")
+        if not api_key:
+            raise ValueError("The api_key must not be empty.")
+
+        return {
+            "title": title,
+            "token": api_key,
+            "user": user_key,
+            "message": message,
+            "url": message_url
+        }
 
     def send_pushover(self,
         title: str,
@@ -130,82 +351,165 @@ class EphemerEar:
         ):
             # Lazy import so that the package can be used without the requests
             # library installed when notifications are disabled.
-            import requests
             from requests.exceptions import RequestException
-            if not title:
-                raise ValueError("The title must not be empty.")
-            if not user_key:
-                raise ValueError("The user_key must not be empty.")
-            if not api_key:
-                raise ValueError("The api_key must not be empty.")
-
-            url = "https://api.pushover.net/1/messages.json"
-            data = {
-                "title": title,
-                "token": api_key,
-                "user": user_key,
-                "message": message,
-                "url": message_url
-            }
+            data = self._pushover_payload(title, message, user_key, api_key, message_url)
             
             try:
-                response = requests.post(url, data=data)
+                with _metrics.span("pushover.send"):
+                    response = self.clients.http_session().post(self.pushover_url, data=data, timeout=self.clients.timeout)
                 response.raise_for_status()
                 return response
             except RequestException as e:
                 raise RequestException(f"Failed to send the message: {e}")
-            
-    def gpt_chat(self, message: str, model: str = "gpt-4o-mini", max_tokens: int = 800, notify: bool = True, available_functions: dict = None) -> str:
-        history = self.get_history()
-        model = self.model
-        notify = self.notify
-        messages = history.copy()
-        messages.append({"role": "user", "content": message})
-        if available_functions is None:
-            available_functions = self.functions_definitions["functions"]
 
-        max_message_window = self.config['bot']['max_message_window']
-
-        non_system_messages = list(filter(lambda m: m['role'] != 'system', messages))
-        non_system_messages.reverse()
+    async def asend_pushover(self,
+        title: str,
+        message: str,
+        user_key: str,
+        api_key: str,
+        message_url: Optional[str] = None
+        ):
+            """Async version of :meth:`send_pushover` using the shared async HTTP client."""
+            import httpx
+            data = self._pushover_payload(title, message, user_key, api_key, message_url)
+            # httpx rejects None form values, which requests silently dropped.
+            data = {key: value for key, value in data.items() if value is not None}
 
-        running_token_count = 0
-        for m in non_system_messages:
-            token_count = count_tokens(m['content'])
-            if running_token_count + token_count > max_message_window:
-                non_system_messages.remove(m)
-            else:
-                running_token_count += token_count
+            try:
+                with _metrics.span("pushover.send"):
+                    response = await self.clients.async_http_client().post(self.pushover_url, data=data)
+                response.raise_for_status()
+                return response
+            except httpx.HTTPError as e:
+                raise ConnectionError(f"Failed to send the message: {e}")
+
+    def _make_retriever(self) -> Optional[Retriever]:
+        """Build the retriever over the configured stores, if ``bot.retrieval`` is on."""
+        bot_config = self.config['bot']
+        if not bot_config.get('retrieval', False):
+            return None
+        stores = self.config.get('stores', {})
+        sources = [stores[name] for name in bot_config.get('retrieval_stores', DEFAULT_RETRIEVAL_STORES) if name in stores]
+        model = bot_config.get('embedding_model', DEFAULT_EMBEDDING_MODEL)
+        return Retriever(
+            VectorIndex(Path(bot_config['cache']) / 'retrieval', model=model),
+            OpenAIEmbedder(self.clients.openai, model=model),
+            sources,
+            refresh_seconds=bot_config.get('retrieval_refresh_seconds', DEFAULT_RETRIEVAL_REFRESH_SECONDS),
+        )
 
-        non_system_messages.reverse()
-        all_messages = [{"role": "system", "content": self.system_prompt}] + non_system_messages
+    def _retrieved_context(self, message: str) -> Optional[Dict[str, str]]:
+        """Return a system message with stored passages relevant to *message*, if any.
 
+        The index is refreshed on a background thread, so files written since
+        the last refresh are found from a later turn on.
+        """
+        if self.retriever is None:
+            return None
+        bot_config = self.config['bot']
         try:
-            from openai import OpenAI
-        except ModuleNotFoundError as exc:
-            raise ModuleNotFoundError("openai package is required for gpt_chat") from exc
-
-        client = OpenAI(api_key=self.api_key)
-        completion = client.chat.completions.create(
-            model=model,
-            messages=all_messages,
-            max_tokens=max_tokens,
-            functions=available_functions if available_functions else None,
+            self.retriever.refresh_in_background()
+            with _metrics.span("chat.retrieval"):
+                passages = self.retriever.retrieve(
+                    message,
+                    max_tokens=bot_config.get('retrieval_max_tokens', DEFAULT_RETRIEVAL_MAX_TOKENS),
+                    token_counter=count_tokens,
+                    k=bot_config.get('retrieval_top_k', DEFAULT_RETRIEVAL_TOP_K),
+                )
+        except Exception as exc:
+            # Recall is a bonus; a failed lookup shouldn't fail the turn.
+            print(f"Retrieval failed: {exc}")
+            return None
+        if not passages:
+            return None
+        return {"role": "system", "content": format_passages(passages)}
+
+    def _make_history_summary(self) -> Optional[RollingSummary]:
+        """Build the rolling summary of evicted turns, if ``bot.summarize_history`` is on."""
+        if not self.config['bot'].get('summarize_history', False):
+            return None
+        return RollingSummary(
+            summary_path_for(self.history_file_path),
+            self._summarize,
+            min_messages=self.config['bot'].get('summary_min_messages', DEFAULT_SUMMARY_MIN_MESSAGES),
+            token_counter=message_tokens,
+            max_batch_tokens=self.config['bot'].get('summary_batch_tokens', DEFAULT_SUMMARY_BATCH_TOKENS),
         )
-        bot_response = completion.choices[0].message
 
+    def _summarize(self, previous_summary: str, messages: List[Dict[str, Any]]) -> str:
+        with _metrics.span("chat.summary", messages=len(messages)):
+            completion = self.clients.openai().chat.completions.create(
+                model=self.config['bot'].get('summary_model', self.model),
+                messages=summary_request(previous_summary, messages),
+                max_tokens=self.config['bot'].get('summary_max_tokens', DEFAULT_SUMMARY_MAX_TOKENS),
+            )
+        return completion.choices[0].message.content or previous_summary
+
+    def _prepare_chat(self, message: str) -> Tuple[Dict[str, Any], List[Dict[str, str]]]:
+        """Return the new user entry and the messages to send for it.
+
+        The rolling summary, when enabled, is sent ahead of the history and
+        its tokens come out of ``max_message_window``, so the prompt stays
+        the same size however long the conversation gets.
+        """
+        user_entry = {"role": "user", "content": message}
+        max_message_window = self.config['bot']['max_message_window']
+
+        all_messages = [{"role": "system", "content": self.system_prompt}]
+        summary_message = self.history_summary.message() if self.history_summary is not None else None
+        if summary_message is not None:
+            all_messages.append(summary_message)
+            max_message_window = max(0, max_message_window - count_tokens(summary_message["content"]))
+        retrieved = self._retrieved_context(message)
+        if retrieved is not None:
+            all_messages.append(retrieved)
+
+        with _metrics.span("history.read"):
+            history = self.history_store.tail(max_tokens=max_message_window, token_counter=message_tokens)
+        with _metrics.span("chat.window"):
+            non_system_messages = select_message_window(history + [user_entry], max_message_window)
+        all_messages += non_system_messages
+
+        if self.history_summary is not None:
+            # The new user message is the last one in the window, if it fit.
+            window_start = self.history_store.count() - max(0, len(non_system_messages) - 1)
+            self.history_summary.refresh_in_background(self.history_store, window_start)
+        return user_entry, all_messages
+
+    def _tool_options(self, available_functions, tool_round: int) -> Dict[str, Any]:
+        """Return the ``tools`` arguments for a completion in round *tool_round*.
+
+        On the last round the model still sees the tools but may not call
+        them, so the turn always ends with a text reply.
+        """
+        if not available_functions:
+            return {}
+        options = {"tools": tool_definitions(available_functions)}
+        if tool_round >= self.max_tool_rounds:
+            options["tool_choice"] = "none"
+        return options
+
+    def _run_tool_calls(self, bot_response) -> List[Dict[str, Any]]:
+        """Run the tool calls in *bot_response* and return the messages to send back."""
+        _metrics.count("chat.tool_calls", len(bot_response.tool_calls))
+        with _metrics.span("chat.tools"):
+            return [assistant_tool_message(bot_response)] + self.tool_executor.run(bot_response.tool_calls)
+
+    def _handle_bot_response(self, bot_response, tool_messages: Optional[List[Dict[str, Any]]] = None) -> str:
+        """Turn the final completion message into the reply text.
+
+        If the model didn't answer after its tool calls, the tool results
+        themselves are the reply. Legacy ``function_call`` replies are still
+        run here.
+        """
+        tool_results = [m["content"] for m in tool_messages or [] if m["role"] == "tool"]
         if bot_response.content:
             confirmation_message = bot_response.content
-        elif bot_response.function_call:
+        elif tool_results:
+            confirmation_message = "\n".join(tool_results)
+        elif getattr(bot_response, 'function_call', None):
             func_name = bot_response.function_call.name
-            func_args = bot_response.function_call.arguments
-
-            if isinstance(func_args, str):
-                func_args = json.loads(func_args)
-
-            for key in ['date', 'when', 'start', 'end']:
-                if key in func_args:
-                    func_args[key] = datetime.datetime.fromisoformat(func_args[key])
+            func_args = parse_tool_arguments(bot_response.function_call.arguments)
 
             if func_name in self.available_functions:
                 function_to_call = self.available_functions[func_name]
@@ -215,47 +519,280 @@ class EphemerEar:
                 confirmation_message = f"Function '{func_name}' is not available."
         else:
             confirmation_message = "Received a response without content or function call."
+        return confirmation_message
 
-        # Append to history, save, and handle notifications as before
-        history.append({"role": "user", "content": message})
-        history.append({"role": "assistant", "content": confirmation_message})
-        self.save_history(history)
-        self.write_response_to_markdown(message, confirmation_message)
-        if notify:
-            self.send_pushover(title="ephemerear", message=f"Response: {confirmation_message}", user_key=self.pushover_user, api_key=self.pushover_key)
-
-        if notify:
-            self.send_pushover(
-                title="ephemerear",
-                message=f"Response written to MD: {confirmation_message}",
-                user_key=self.pushover_user,
-                api_key=self.pushover_key,
-                message_url=None  # or a URL if applicable
-            )
+    def _save_turn(self, user_entry: Dict[str, Any], confirmation_message: str, usage: Optional[Dict[str, int]] = None) -> None:
+        """Append the turn to the history.
+
+        This stays on the request path so the next turn always sees it. The
+        API token *usage* of the turn is kept on the assistant entry and in
+        :attr:`last_usage`.
+        """
+        assistant_entry = {"role": "assistant", "content": confirmation_message}
+        if usage:
+            assistant_entry["usage"] = usage
+            self.last_usage = usage
+            for name, value in usage.items():
+                _metrics.count(f"chat.{name}", value)
+        _metrics.count("chat.turns")
+        message_tokens(assistant_entry)
+        with _metrics.span("history.write"), self._history_lock:
+            self.history_store.append([user_entry, assistant_entry])
+
+    def _notifications(self, confirmation_message: str) -> List[Dict[str, Any]]:
+        return [
+            {"title": "ephemerear", "message": f"Response: {confirmation_message}"},
+            {"title": "ephemerear", "message": f"Response written to MD: {confirmation_message}", "message_url": None},
+        ]
+
+    @property
+    def side_effects(self) -> SideEffectQueue:
+        """The background queue for markdown writes and notifications, started on first use."""
+        with self._side_effects_lock:
+            if self._side_effects is None:
+                self._side_effects = SideEffectQueue(
+                    lambda title, message, message_url: self.send_pushover(
+                        title, message, self.pushover_user, self.pushover_key, message_url
+                    ),
+                    coalesce_window=self.config['bot'].get('notification_window', DEFAULT_NOTIFICATION_WINDOW),
+                )
+                atexit.register(self._side_effects.close)
+            return self._side_effects
+
+    def _dispatch_side_effects(self, user_message: str, confirmation_message: str) -> None:
+        """Write the response markdown and send notifications for a turn.
+
+        With ``bot.background_side_effects`` (the default) both are queued on
+        :attr:`side_effects` and this returns immediately.
+        """
+        if self.background_side_effects:
+            self.side_effects.submit(self.write_response_to_markdown, user_message, confirmation_message)
+            if self.notify:
+                for notification in self._notifications(confirmation_message):
+                    self.side_effects.notify(**notification)
+            return
+
+        self.write_response_to_markdown(user_message, confirmation_message)
+        if self.notify:
+            for notification in self._notifications(confirmation_message):
+                self.send_pushover(user_key=self.pushover_user, api_key=self.pushover_key, **notification)
+
+    async def _adispatch_side_effects(self, user_message: str, confirmation_message: str) -> None:
+        if self.background_side_effects:
+            self._dispatch_side_effects(user_message, confirmation_message)
+            return
+
+        import asyncio
+
+        await asyncio.to_thread(self.write_response_to_markdown, user_message, confirmation_message)
+        if self.notify:
+            await asyncio.gather(*(
+                self.asend_pushover(user_key=self.pushover_user, api_key=self.pushover_key, **notification)
+                for notification in self._notifications(confirmation_message)
+            ))
+
+    def close(self) -> None:
+        """Drain queued side effects and close the clients this bot created."""
+        if self._side_effects is not None:
+            self._side_effects.close()
+        self.tool_executor.close()
+        if self._owns_clients:
+            self.clients.close()
+
+    def gpt_chat(self, message: str, model: str = "gpt-4o-mini", max_tokens: int = 800, notify: bool = True, available_functions: dict = None) -> str:
+        """Answer *message*, running any tools the model calls along the way.
+
+        Tool calls in a reply are run concurrently and their results sent back
+        for a follow-up completion, up to ``bot.max_tool_rounds`` times, so a
+        request needing several actions finishes in one turn.
+        """
+        model = self.model
+        if available_functions is None:
+            available_functions = self.functions_definitions["functions"]
+
+        user_entry, all_messages = self._prepare_chat(message)
+
+        client = self.clients.openai()
+        tool_messages: List[Dict[str, Any]] = []
+        usage: Dict[str, int] = {}
+        for tool_round in range(self.max_tool_rounds + 1):
+            with _metrics.span("chat.completion", model=model, round=tool_round):
+                completion = client.chat.completions.create(
+                    model=model,
+                    messages=all_messages + tool_messages,
+                    max_tokens=max_tokens,
+                    **self._tool_options(available_functions, tool_round),
+                )
+            add_usage(usage, completion)
+            bot_response = completion.choices[0].message
+            if not getattr(bot_response, 'tool_calls', None):
+                break
+            tool_messages += self._run_tool_calls(bot_response)
+        confirmation_message = self._handle_bot_response(bot_response, tool_messages)
+
+        # Append to history, then hand the markdown and notifications off
+        self._save_turn(user_entry, confirmation_message, usage)
+        self._dispatch_side_effects(message, confirmation_message)
 
         return confirmation_message
 
+    def gpt_chat_stream(self, message: str, max_tokens: int = 800, available_functions: dict = None) -> Iterator[str]:
+        """Like :meth:`gpt_chat`, but yield the reply text as it is generated.
+
+        Tool calls are assembled from the stream, run, and the follow-up
+        completion is streamed in turn. If the model ends without any text,
+        the tool results are yielded instead. History, markdown and
+        notifications are only written after the whole reply has arrived.
+        """
+        if available_functions is None:
+            available_functions = self.functions_definitions["functions"]
+
+        user_entry, all_messages = self._prepare_chat(message)
+
+        client = self.clients.openai()
+        tool_messages: List[Dict[str, Any]] = []
+        usage: Dict[str, int] = {}
+        for tool_round in range(self.max_tool_rounds + 1):
+            # Only up to the first byte: a span left open across yields
+            # would time the caller's work too.
+            with _metrics.span("chat.completion", model=self.model, round=tool_round, stream=True):
+                stream = client.chat.completions.create(
+                    model=self.model,
+                    messages=all_messages + tool_messages,
+                    max_tokens=max_tokens,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    **self._tool_options(available_functions, tool_round),
+                )
+            streamed = StreamedMessage()
+            for chunk in stream:
+                text = streamed.add(chunk)
+                if text:
+                    yield text
+            add_usage(usage, streamed)
+            if not streamed.tool_calls:
+                break
+            tool_messages += self._run_tool_calls(streamed)
+
+        confirmation_message = self._handle_bot_response(streamed, tool_messages)
+        if not streamed.content:
+            yield confirmation_message
+
+        self._save_turn(user_entry, confirmation_message, usage)
+        self._dispatch_side_effects(message, confirmation_message)
+
+    def _conversation_lock(self, conversation_id: str) -> "asyncio.Lock":
+        # asyncio is imported by the async paths only, so that importing
+        # the package for sync use or transcription doesn't pay for it.
+        import asyncio
+
+        lock = self._conversation_locks.get(conversation_id)
+        if lock is None:
+            lock = self._conversation_locks[conversation_id] = asyncio.Lock()
+        return lock
+
+    async def agpt_chat(self, message: str, max_tokens: int = 800, available_functions: dict = None, conversation_id: str = "default") -> str:
+        """Async version of :meth:`gpt_chat` that doesn't block the event loop.
+
+        The completion uses the async OpenAI client, tools, history and file
+        I/O run in worker threads, and notifications use the async HTTP
+        client. Turns within one *conversation_id* are serialised so each
+        sees the history written by the previous one; different
+        conversations run concurrently.
+        """
+        import asyncio
+
+        if available_functions is None:
+            available_functions = self.functions_definitions["functions"]
+
+        async with self._conversation_lock(conversation_id):
+            user_entry, all_messages = await asyncio.to_thread(self._prepare_chat, message)
+
+            client = self.clients.async_openai()
+            tool_messages: List[Dict[str, Any]] = []
+            usage: Dict[str, int] = {}
+            for tool_round in range(self.max_tool_rounds + 1):
+                with _metrics.span("chat.completion", model=self.model, round=tool_round):
+                    completion = await client.chat.completions.create(
+                        model=self.model,
+                        messages=all_messages + tool_messages,
+                        max_tokens=max_tokens,
+                        **self._tool_options(available_functions, tool_round),
+                    )
+                add_usage(usage, completion)
+                bot_response = completion.choices[0].message
+                if not getattr(bot_response, 'tool_calls', None):
+                    break
+                tool_messages += await asyncio.to_thread(self._run_tool_calls, bot_response)
+            confirmation_message = await asyncio.to_thread(self._handle_bot_response, bot_response, tool_messages)
+            await asyncio.to_thread(self._save_turn, user_entry, confirmation_message, usage)
+
+        await self._adispatch_side_effects(message, confirmation_message)
+
+        return confirmation_message
+
+    async def agpt_chat_stream(self, message: str, max_tokens: int = 800, available_functions: dict = None, conversation_id: str = "default") -> AsyncIterator[str]:
+        """Async version of :meth:`gpt_chat_stream`, locked per conversation like :meth:`agpt_chat`."""
+        import asyncio
+
+        if available_functions is None:
+            available_functions = self.functions_definitions["functions"]
+
+        async with self._conversation_lock(conversation_id):
+            user_entry, all_messages = await asyncio.to_thread(self._prepare_chat, message)
+
+            client = self.clients.async_openai()
+            tool_messages: List[Dict[str, Any]] = []
+            usage: Dict[str, int] = {}
+            for tool_round in range(self.max_tool_rounds + 1):
+                with _metrics.span("chat.completion", model=self.model, round=tool_round, stream=True):
+                    stream = await client.chat.completions.create(
+                        model=self.model,
+                        messages=all_messages + tool_messages,
+                        max_tokens=max_tokens,
+                        stream=True,
+                        stream_options={"include_usage": True},
+                        **self._tool_options(available_functions, tool_round),
+                    )
+                streamed = StreamedMessage()
+                async for chunk in stream:
+                    text = streamed.add(chunk)
+                    if text:
+                        yield text
+                add_usage(usage, streamed)
+                if not streamed.tool_calls:
+                    break
+                tool_messages += await asyncio.to_thread(self._run_tool_calls, streamed)
+
+            confirmation_message = await asyncio.to_thread(self._handle_bot_response, streamed, tool_messages)
+            if not streamed.content:
+                yield confirmation_message
+            await asyncio.to_thread(self._save_turn, user_entry, confirmation_message, usage)
+
+        await self._adispatch_side_effects(message, confirmation_message)
+
     def write_response_to_markdown(self, user_message: str, bot_response: str) -> None:
-        response_output_dir = self.config['stores']['responses']
-        now = datetime.datetime.now()
-        current_year = now.strftime("%Y")
-        current_month = now.strftime("%m")
-        year_month_dir = os.path.join(response_output_dir, current_year, current_month)
-        os.makedirs(year_month_dir, exist_ok=True)
+        with _metrics.span("response.write"):
+            response_output_dir = self.config['stores']['responses']
+            now = datetime.datetime.now()
+            current_year = now.strftime("%Y")
+            current_month = now.strftime("%m")
+            year_month_dir = os.path.join(response_output_dir, current_year, current_month)
+            os.makedirs(year_month_dir, exist_ok=True)
         
-        unique_identifier = now.strftime("%Y-%m-%d_at_%H-%M-%S")
-        description = "response"  
+            unique_identifier = now.strftime("%Y-%m-%d_at_%H-%M-%S")
+            description = "response"  
 
-        response_filename = f"{unique_identifier}_{description}.md"
-        response_filepath = os.path.join(year_month_dir, response_filename)
+            # Claim the name first, so two responses in the same second get
+            # separate files instead of one overwriting the other.
+            response_filepath = create_unique(year_month_dir, f"{unique_identifier}_{description}", ".md")
 
-        response_content = f"""## User enquiry
+            response_content = f"""## User enquiry
 {user_message}
 
 ## {self.config['bot']['name']} response
 {bot_response}"""
-        with open(response_filepath, 'w', encoding='utf-8') as response_file:
-            response_file.write(response_content)
+            atomic_write_text(response_filepath, response_content)
         
 def verify_and_create_paths(config: dict) -> None:
     user_name = config.get('user', {}).get('name', 'As yet unnamed User')  # Default user name if not provided
@@ -263,7 +800,7 @@ def verify_and_create_paths(config: dict) -> None:
     for section, settings in config.items():
         if isinstance(settings, dict):
             for key, value in settings.items():
-                if isinstance(value, str):
+                if isinstance(value, str) and '://' not in value:
                     path = Path(value)
                     if '/' in value:
                         # Check if the path has a file name with an extension
@@ -1,8 +1,36 @@
-"""Convenience imports for the :mod:`ephemerear` package."""
+"""Convenience imports for the :mod:`ephemerear` package.
+
+The chat bot is imported eagerly because it is cheap; transcription, which
+needs audio tooling, is only imported the first time one of its names is
+used (PEP 562). ``from ephemerear import handle_audio`` keeps working, but
+``from ephemerear import EphemerEar`` no longer pays for it.
+"""
+
+import importlib
 
 from .EphemerEar import *
-from .transcribe import *
 
 # Provide access to the function helpers under a capitalised module name
 # for compatibility with existing code and tests.
 from . import functions as Functions
+
+_LAZY_SUBMODULES = ("batch", "cache", "clients", "history", "metrics", "preprocess", "registry", "side_effects", "transcribe", "whisper_daemon")
+# Names re-exported from these modules are resolved on first access.
+_LAZY_STAR_MODULES = ("transcribe",)
+
+
+def __getattr__(name):
+    if name in _LAZY_SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    if not name.startswith("_"):
+        for module_name in _LAZY_STAR_MODULES:
+            module = importlib.import_module(f".{module_name}", __name__)
+            if hasattr(module, name):
+                value = getattr(module, name)
+                globals()[name] = value
+                return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_SUBMODULES))
@@ -0,0 +1,170 @@
+"""Batch and watch mode for transcribing many recordings.
+
+Files are tracked in a JSON manifest so that a batch can be interrupted and
+resumed, and recordings that were already processed are skipped on later
+runs unless they change.
+"""
+
+from __future__ import annotations
+
+import glob
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List
+
+from .fileio import atomic_write_text
+
+AUDIO_EXTENSIONS = {".aac", ".flac", ".m4a", ".mp3", ".mp4", ".mpeg", ".mpga", ".ogg", ".wav", ".webm"}
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# A file that keeps failing is given up on after this many tries, until it
+# changes on disk.
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+def discover_audio_files(paths: Iterable[str]) -> List[str]:
+    """Expand files, directories (recursively) and glob patterns to audio files."""
+    found: Dict[str, None] = {}
+    for pattern in paths:
+        if os.path.isdir(pattern):
+            candidates = (str(p) for p in sorted(Path(pattern).rglob("*")))
+        elif os.path.isfile(pattern):
+            candidates = [pattern]
+        else:
+            candidates = sorted(glob.glob(pattern, recursive=True))
+        for candidate in candidates:
+            if os.path.isfile(candidate) and Path(candidate).suffix.lower() in AUDIO_EXTENSIONS:
+                found[os.path.abspath(candidate)] = None
+    return list(found)
+
+
+class WorkManifest:
+    """Persistent record of each file's status in a batch.
+
+    The manifest is rewritten atomically after every status change. Files
+    left ``running`` by a crashed run are put back in the queue on load.
+    Failed files are queued again until they have failed *max_attempts*
+    times.
+    """
+
+    def __init__(self, path: str, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> None:
+        self.path = Path(path)
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self.entries: Dict[str, Dict[str, object]] = {}
+        if self.path.is_file():
+            with self.path.open("r", encoding="utf-8") as file:
+                self.entries = json.load(file)
+        for entry in self.entries.values():
+            if entry["status"] == RUNNING:
+                entry["status"] = PENDING
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(self.path, json.dumps(self.entries, indent=2))
+
+    def enqueue(self, files: Iterable[str], settle_seconds: float = 0.0) -> int:
+        """Queue new, changed and retryable failed files and return how many were added.
+
+        Files modified within the last *settle_seconds* are left for a later
+        call, so recordings that are still being synced aren't picked up.
+        """
+        added = 0
+        now = time.time()
+        with self._lock:
+            for file_path in files:
+                stat = os.stat(file_path)
+                if settle_seconds and now - stat.st_mtime < settle_seconds:
+                    continue
+                entry = self.entries.get(file_path)
+                unchanged = entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime
+                if unchanged and entry["status"] in (DONE, PENDING):
+                    continue
+                if unchanged and entry["status"] == FAILED:
+                    if entry.get("attempts", 0) >= self.max_attempts:
+                        continue
+                    entry["status"] = PENDING
+                else:
+                    self.entries[file_path] = {"status": PENDING, "size": stat.st_size, "mtime": stat.st_mtime}
+                added += 1
+            self._save()
+        return added
+
+    def pending(self) -> List[str]:
+        with self._lock:
+            return [path for path, entry in self.entries.items() if entry["status"] == PENDING]
+
+    def mark(self, file_path: str, status: str, error: str = "") -> None:
+        with self._lock:
+            entry = self.entries[file_path]
+            entry["status"] = status
+            entry["updated"] = datetime.now().isoformat(timespec="seconds")
+            if status == FAILED:
+                entry["attempts"] = entry.get("attempts", 0) + 1
+            if error:
+                entry["error"] = error
+            else:
+                entry.pop("error", None)
+            self._save()
+
+
+def run_queue(manifest: WorkManifest, process: Callable[[str], object], workers: int = 2) -> Dict[str, int]:
+    """Process every pending file with *workers* threads and return counts."""
+
+    def run_one(file_path: str) -> str:
+        manifest.mark(file_path, RUNNING)
+        try:
+            process(file_path)
+        except Exception as exc:
+            print(f"Failed to process {file_path}: {exc}")
+            manifest.mark(file_path, FAILED, error=f"{type(exc).__name__}: {exc}")
+            return FAILED
+        manifest.mark(file_path, DONE)
+        return DONE
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results = list(executor.map(run_one, manifest.pending()))
+    return {DONE: results.count(DONE), FAILED: results.count(FAILED)}
+
+
+def run_batch(
+    paths: Iterable[str],
+    process: Callable[[str], object],
+    manifest_path: str,
+    workers: int = 2,
+    watch: bool = False,
+    interval: float = 30.0,
+    settle_seconds: float = 10.0,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+) -> None:
+    """Queue the audio files under *paths* and process them.
+
+    With *watch*, keep polling *paths* every *interval* seconds for new
+    recordings until interrupted; files are only picked up once they haven't
+    changed for *settle_seconds*. A file that fails *max_attempts* times is
+    skipped until it changes.
+    """
+    paths = list(paths)
+    manifest = WorkManifest(manifest_path, max_attempts=max_attempts)
+    while True:
+        added = manifest.enqueue(discover_audio_files(paths), settle_seconds=settle_seconds if watch else 0.0)
+        pending = manifest.pending()
+        if pending:
+            print(f"Queued {added} new file(s); processing {len(pending)} pending")
+            counts = run_queue(manifest, process, workers=workers)
+            print(f"Batch finished: {counts[DONE]} done, {counts[FAILED]} failed")
+        if not watch:
+            return
+        try:
+            time.sleep(interval)
+        except KeyboardInterrupt:
+            return
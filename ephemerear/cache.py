@@ -0,0 +1,108 @@
+"""Content-addressed cache for transcripts.
+
+Entries are keyed by a hash of the audio content together with everything
+that affects the transcript (engine, model, prompt and, for chunks, the span
+that was cut), so the same recording is never transcribed twice regardless
+of its file name or when it was dropped in.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .fileio import atomic_write_text
+
+
+def hash_file(file_path: str, block_size: int = 1024 * 1024) -> str:
+    """Return the SHA-256 of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(*parts: Any) -> str:
+    """Build a cache key from the values that determine a transcript."""
+    return hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+
+class TranscriptCache:
+    """Transcripts stored as text files under *directory*, one per key.
+
+    Reading an entry refreshes its modification time, so eviction removes the
+    least recently used entries first once the cache is over *max_bytes*, and
+    anything not used for *max_age_days*.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: Optional[int] = None,
+        max_age_days: Optional[float] = None,
+    ) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.txt"
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            text = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        os.utime(path)
+        self.hits += 1
+        return text
+
+    def put(self, key: str, text: str) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Cache entries can be recomputed, so skip the fsync.
+        atomic_write_text(path, text, fsync=False)
+
+    def _entries(self):
+        for path in self.directory.glob("*/*.txt"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            yield path, stat.st_size, stat.st_mtime
+
+    def evict(self) -> int:
+        """Remove expired and least recently used entries; return how many."""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        removed = 0
+        if self.max_age_days is not None:
+            cutoff = time.time() - self.max_age_days * 86400
+            while entries and entries[0][2] < cutoff:
+                entries.pop(0)[0].unlink(missing_ok=True)
+                removed += 1
+        if self.max_bytes is not None:
+            total = sum(size for _, size, _ in entries)
+            while entries and total > self.max_bytes:
+                path, size, _ = entries.pop(0)
+                path.unlink(missing_ok=True)
+                total -= size
+                removed += 1
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        entries = list(self._entries())
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+        }
@@ -0,0 +1,164 @@
+"""Shared API clients for EphemerEar.
+
+Creating a client per request means a fresh TCP and TLS handshake every
+time. The registry creates each client lazily, once, and hands the same
+instance (and its keep-alive connection pool) to chat, transcription and
+notifications.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Optional
+
+DEFAULT_HTTP_TIMEOUT = 60.0
+DEFAULT_HTTP_POOL_SIZE = 10
+DEFAULT_OPENAI_MAX_RETRIES = 2
+
+
+class ClientRegistry:
+    """Lazily created, process-wide OpenAI clients and HTTP session."""
+
+    def __init__(
+        self,
+        api_key: str,
+        timeout: float = DEFAULT_HTTP_TIMEOUT,
+        pool_size: int = DEFAULT_HTTP_POOL_SIZE,
+        max_retries: int = DEFAULT_OPENAI_MAX_RETRIES,
+        base_url: Optional[str] = None,
+        stt_timeout: Optional[float] = None,
+    ) -> None:
+        self.api_key = api_key
+        self.timeout = timeout
+        # None keeps the OpenAI SDK's default, which allows for large uploads.
+        self.stt_timeout = stt_timeout
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.base_url = base_url
+        self._lock = threading.Lock()
+        self._clients: dict = {}
+
+    @classmethod
+    def from_config(cls, config: dict) -> "ClientRegistry":
+        bot_config = config.get('bot', {})
+        return cls(
+            api_key=config['auth_tokens']['openai'],
+            timeout=bot_config.get('http_timeout', DEFAULT_HTTP_TIMEOUT),
+            pool_size=bot_config.get('http_pool_size', DEFAULT_HTTP_POOL_SIZE),
+            base_url=bot_config.get('openai_base_url'),
+            stt_timeout=bot_config.get('stt_timeout'),
+        )
+
+    def _get_or_create(self, name: str, factory) -> Any:
+        client = self._clients.get(name)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(name)
+                if client is None:
+                    client = factory()
+                    self._clients[name] = client
+        return client
+
+    def openai(self):
+        """Return the shared synchronous ``OpenAI`` client."""
+        def create():
+            try:
+                import httpx
+                from openai import DefaultHttpxClient, OpenAI
+            except ModuleNotFoundError as exc:
+                raise ModuleNotFoundError("openai package is required for OpenAI requests") from exc
+
+            limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+            return OpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                timeout=self.timeout,
+                max_retries=self.max_retries,
+                http_client=DefaultHttpxClient(limits=limits),
+            )
+
+        return self._get_or_create('openai', create)
+
+    def async_openai(self):
+        """Return the shared ``AsyncOpenAI`` client."""
+        def create():
+            try:
+                import httpx
+                from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+            except ModuleNotFoundError as exc:
+                raise ModuleNotFoundError("openai package is required for OpenAI requests") from exc
+
+            limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+            return AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                timeout=self.timeout,
+                max_retries=self.max_retries,
+                http_client=DefaultAsyncHttpxClient(limits=limits),
+            )
+
+        return self._get_or_create('async_openai', create)
+
+    def async_http_client(self):
+        """Return a shared ``httpx.AsyncClient`` for notifications."""
+        def create():
+            import httpx
+
+            limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+            return httpx.AsyncClient(timeout=self.timeout, limits=limits)
+
+        return self._get_or_create('async_http_client', create)
+
+    def transcription_client(self):
+        """Return the shared OpenAI client with its built-in retries disabled.
+
+        Transcription retries each chunk itself, so this shares the connection
+        pool of :meth:`openai` without doubling up on retries. Uploads of up
+        to 25 MB can take far longer than a chat request, so it uses
+        *stt_timeout* (default: the SDK's) instead of the HTTP timeout.
+        """
+        # Resolve the base client first: the factory runs under the registry
+        # lock, which isn't reentrant.
+        client = self.openai()
+
+        def create():
+            timeout = self.stt_timeout
+            if timeout is None:
+                from openai import DEFAULT_TIMEOUT as timeout
+            return client.with_options(max_retries=0, timeout=timeout)
+
+        return self._get_or_create('transcription', create)
+
+    def http_session(self):
+        """Return a shared ``requests.Session`` with a keep-alive pool."""
+        def create():
+            # Lazy import so that the package can be used without the
+            # requests library installed when notifications are disabled.
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            return session
+
+        return self._get_or_create('http_session', create)
+
+    def close(self) -> None:
+        """Close the synchronous clients that have been created."""
+        with self._lock:
+            clients = {name: self._clients.pop(name) for name in ('openai', 'http_session', 'transcription') if name in self._clients}
+        for name, client in clients.items():
+            if name != 'transcription':
+                client.close()
+
+    async def aclose(self) -> None:
+        """Close the async clients that have been created."""
+        with self._lock:
+            clients = [self._clients.pop(name) for name in ('async_openai', 'async_http_client') if name in self._clients]
+        for client in clients:
+            if hasattr(client, 'aclose'):
+                await client.aclose()
+            else:
+                await client.close()
@@ -0,0 +1,99 @@
+"""Crash- and concurrency-safe file writes.
+
+Files are written to a temporary file in the same directory and renamed
+over the target, so a reader, or the next run after a crash, sees either
+the old or the new content and never a truncated file. :func:`file_lock`
+serialises read-modify-write cycles between threads and processes, and
+:func:`create_unique` hands out file names that concurrent writers can't
+both get.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import itertools
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, Union
+
+try:
+    import fcntl
+except ModuleNotFoundError:  # Windows
+    fcntl = None
+
+PathLike = Union[str, Path]
+
+DEFAULT_FILE_MODE = 0o644
+
+
+def atomic_write_text(path: PathLike, text: str, encoding: str = 'utf-8', fsync: bool = True) -> None:
+    """Replace the contents of *path* with *text* in one step.
+
+    With *fsync*, the data is on disk before the rename, so even a power
+    loss can't leave an empty file behind.
+    """
+    path = Path(path)
+    try:
+        mode = path.stat().st_mode & 0o777
+    except FileNotFoundError:
+        mode = DEFAULT_FILE_MODE
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding=encoding) as file:
+            file.write(text)
+            file.flush()
+            if fsync:
+                os.fsync(file.fileno())
+        os.chmod(tmp_name, mode)
+        os.replace(tmp_name, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(tmp_name)
+        raise
+
+
+_thread_locks: Dict[str, threading.Lock] = {}
+_thread_locks_guard = threading.Lock()
+
+
+@contextlib.contextmanager
+def file_lock(path: PathLike) -> Iterator[None]:
+    """Hold an exclusive lock on the lock file *path*, creating it if needed.
+
+    Uses ``flock``, which also excludes other threads of this process. Where
+    ``fcntl`` isn't available only threads of this process are excluded.
+    """
+    path = Path(path)
+    if fcntl is None:
+        with _thread_locks_guard:
+            lock = _thread_locks.setdefault(str(path.resolve()), threading.Lock())
+        with lock:
+            yield
+        return
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a') as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def create_unique(directory: PathLike, stem: str, suffix: str) -> Path:
+    """Create and return a new, empty ``<stem><suffix>`` file in *directory*.
+
+    When the name is taken, ``-2``, ``-3`` and so on are added to *stem*.
+    Files are created with ``O_EXCL``, so no two callers get the same path.
+    """
+    directory = Path(directory)
+    for attempt in itertools.count(1):
+        name = f"{stem}{suffix}" if attempt == 1 else f"{stem}-{attempt}{suffix}"
+        try:
+            fd = os.open(directory / name, os.O_CREAT | os.O_EXCL | os.O_WRONLY, DEFAULT_FILE_MODE)
+        except FileExistsError:
+            continue
+        os.close(fd)
+        return directory / name
@@ -6,16 +6,15 @@ def add_todo(text, todo_file="bots/donbot/output/responses/todos/todos.md"):
     text (str): The task description to be added to the todo list.
 
     Returns:
-    None: This function doesn't return any value. It simply appends the text to the file.
+    str: A confirmation for the model. Items already on the list (ignoring
+    case, punctuation and checkbox markup) are not added again.
     """
-    import os
-    if not os.path.exists(os.path.dirname(todo_file)):
-        os.makedirs(os.path.dirname(todo_file))
-    if not os.path.exists(todo_file):
-        with open(todo_file, "w") as file:
-            file.write("# To-Do List\n\n")
-    with open(todo_file, "a") as file:
-        file.write(text + "\n")
+    from ephemerear.notes import note_store_for
+    store = note_store_for(todo_file, "todo")
+    note, created = store.add("todo", text)
+    if not created:
+        return f"This to-do item is already on your list: {note.text}"
+    store.render_markdown("todo", todo_file)
     return f"Added the following to-do item to your list: {text}"
 
 add_todo_definition = {
@@ -41,16 +40,15 @@ def commit_to_memory(text, memory_file="bots/donbot/output/responses/todos/memor
     text (str): The content to be added to the memory file.
 
     Returns:
-    None: This function doesn't return any value. It simply appends the text to the file.
+    str: A confirmation for the model. Memories that are already recorded
+    are not added again.
     """
-    import os
-    if not os.path.exists(os.path.dirname(memory_file)):
-        os.makedirs(os.path.dirname(memory_file))
-    if not os.path.exists(memory_file):
-        with open(memory_file, "w") as file:
-            file.write("# Memories\n\n")
-    with open(memory_file, "a") as file:
-        file.write(text + "\n")
+    from ephemerear.notes import note_store_for
+    store = note_store_for(memory_file, "memory")
+    note, created = store.add("memory", text)
+    if not created:
+        return f"This memory is already recorded: {note.text}"
+    store.render_markdown("memory", memory_file)
     return f"Added the following memory to your list: {text}"
 
 commit_to_memory_definition = {
@@ -66,4 +64,88 @@ commit_to_memory_definition = {
                 },
                 "required": ["text"]
             }
-        }
\ No newline at end of file
+        }
+
+def list_todos(limit=20, todo_file="bots/donbot/output/responses/todos/todos.md"):
+    """
+    Lists the most recently added to-do items.
+
+    Parameters:
+    limit (int): The maximum number of items to return.
+
+    Returns:
+    str: One item per line with the date it was added, newest first.
+    """
+    from ephemerear.notes import note_store_for
+    notes = note_store_for(todo_file, "todo").list("todo", limit=int(limit))
+    if not notes:
+        return "The to-do list is empty."
+    return "\n".join(f"{note.created_at[:10]}: {note.text}" for note in notes)
+
+list_todos_definition = {
+            "name": "list_todos",
+            "description": "This function lists the user's most recently added to-do items, newest first.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "limit": {
+                        "type": "integer",
+                        "description": "The maximum number of to-do items to list. Defaults to 20."
+                    }
+                },
+                "required": []
+            }
+        }
+
+def search_notes(query, kind=None, limit=10, todo_file="bots/donbot/output/responses/todos/todos.md", memory_file="bots/donbot/output/responses/todos/memory.md"):
+    """
+    Searches the user's to-do items and memories for the given words.
+
+    Parameters:
+    query (str): The words to look for. Every word must appear in a match.
+    kind (str): "todo" or "memory" to search only one of them.
+    limit (int): The maximum number of matches to return.
+
+    Returns:
+    str: One match per line, best match first.
+    """
+    from ephemerear.notes import note_store_for
+    sources = {"todo": todo_file, "memory": memory_file}
+    kinds = [kind] if kind in sources else list(sources)
+    # Kinds kept in the same database are ranked in one query; results from
+    # separate databases are merged by rank.
+    stores = {}
+    for note_kind in kinds:
+        store = note_store_for(sources[note_kind], note_kind)
+        stores.setdefault(id(store), (store, []))[1].append(note_kind)
+    ranked = []
+    for store, store_kinds in stores.values():
+        ranked += store.search_ranked(query, kind=store_kinds, limit=int(limit))
+    notes = [note for _, note in sorted(ranked, key=lambda item: item[0])]
+    if not notes:
+        return f"Nothing found for: {query}"
+    return "\n".join(f"[{note.kind}] {note.created_at[:10]}: {note.text}" for note in notes[:int(limit)])
+
+search_notes_definition = {
+            "name": "search_notes",
+            "description": "This function searches the user's to-do items and memories. Use it to recall something the user asked you to remember or to check whether a task is on their list.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "The words to search for."
+                    },
+                    "kind": {
+                        "type": "string",
+                        "enum": ["todo", "memory"],
+                        "description": "Search only to-do items or only memories. Omit to search both."
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "The maximum number of matches to return. Defaults to 10."
+                    }
+                },
+                "required": ["query"]
+            }
+        }
@@ -13,7 +13,7 @@ import os
 import sys
 
 from ephemerear.EphemerEar import EphemerEar
-from ephemerear.transcribe import handle_audio
+from ephemerear.transcribe import TranscriptionContext, handle_audio
 
 
 def main() -> None:
@@ -40,7 +40,7 @@ def main() -> None:
         custom_prompt="",
         transcript_output_dir=ee.config["stores"]["transcripts"],
         cache_dir=ee.config["bot"]["cache"],
-        config_file=config_path,
+        context=TranscriptionContext.from_bot(ee, config_path),
     )
 
     if ee.notify:
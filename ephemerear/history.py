@@ -0,0 +1,318 @@
+"""Chat history backends for EphemerEar.
+
+Two backends are available:
+- ``json``: the original single ``history.json`` file, rewritten on every save.
+- ``jsonl``: an append-only store split into rotating JSONL segments, so that
+  appending a turn and reading the most recent messages don't depend on how
+  long the bot has been running.
+
+Both take a lock file around every write, so several processes (the Hazel
+script, the CLI, a batch run) can share one history without losing turns,
+and neither leaves a half-written file behind after a crash.
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .fileio import atomic_write_text, file_lock
+
+Message = Dict[str, Any]
+
+DEFAULT_SEGMENT_SIZE = 1000
+
+
+class HistoryStore:
+    """Interface shared by the history backends."""
+
+    def append(self, messages: Iterable[Message]) -> None:
+        raise NotImplementedError
+
+    def read_all(self) -> List[Message]:
+        raise NotImplementedError
+
+    def replace(self, messages: Iterable[Message]) -> None:
+        raise NotImplementedError
+
+    def count(self) -> int:
+        """Return the number of messages in the history."""
+        return len(self.read_all())
+
+    def slice(self, start: int, end: int) -> List[Message]:
+        """Return the messages at positions *start* to *end* (exclusive), oldest first."""
+        return self.read_all()[start:end]
+
+    def tail(
+        self,
+        max_messages: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+        token_counter: Optional[Callable[[Message], int]] = None,
+    ) -> List[Message]:
+        """Return the newest messages, oldest first.
+
+        Stops at *max_messages* entries, or as soon as adding another message
+        would exceed *max_tokens* as measured by *token_counter*.
+        """
+        return _take_tail(reversed(self.read_all()), max_messages, max_tokens, token_counter)
+
+
+def _take_tail(
+    newest_first: Iterable[Message],
+    max_messages: Optional[int],
+    max_tokens: Optional[int],
+    token_counter: Optional[Callable[[Message], int]],
+) -> List[Message]:
+    if max_tokens is not None and token_counter is None:
+        raise ValueError("token_counter is required when max_tokens is set.")
+
+    selected = []
+    running_token_count = 0
+    for message in newest_first:
+        if max_messages is not None and len(selected) >= max_messages:
+            break
+        if max_tokens is not None:
+            token_count = token_counter(message)
+            if running_token_count + token_count > max_tokens:
+                break
+            running_token_count += token_count
+        selected.append(message)
+    selected.reverse()
+    return selected
+
+
+class JSONHistoryStore(HistoryStore):
+    """The original backend: the whole history in a single JSON array.
+
+    The parsed history is kept in memory and only re-read when the file
+    changes on disk, so token counts cached on the entries survive between
+    turns and are written back on the next save. Saves replace the file
+    atomically while holding ``history.json.lock``.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._lock_path = self.path.with_name(self.path.name + '.lock')
+        self._messages: Optional[List[Message]] = None
+        self._file_key: Optional[tuple] = None
+        if not self.path.is_file():
+            with file_lock(self._lock_path):
+                if not self.path.is_file():
+                    atomic_write_text(self.path, json.dumps([]))
+
+    def _stat_key(self) -> tuple:
+        stat = self.path.stat()
+        # Saves rename a new file into place, so the inode changes even when
+        # two saves land within the filesystem's timestamp resolution.
+        return (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+
+    def _load(self) -> List[Message]:
+        file_key = self._stat_key()
+        if self._messages is None or file_key != self._file_key:
+            with self.path.open('r') as file:
+                self._messages = json.load(file)
+            self._file_key = file_key
+        return self._messages
+
+    def read_all(self) -> List[Message]:
+        return list(self._load())
+
+    def count(self) -> int:
+        return len(self._load())
+
+    def slice(self, start: int, end: int) -> List[Message]:
+        return self._load()[start:end]
+
+    def _write(self, messages: List[Message]) -> None:
+        atomic_write_text(self.path, json.dumps(messages))
+        self._messages = messages
+        self._file_key = self._stat_key()
+
+    def replace(self, messages: Iterable[Message]) -> None:
+        messages = list(messages)
+        with file_lock(self._lock_path):
+            self._write(messages)
+
+    def append(self, messages: Iterable[Message]) -> None:
+        messages = list(messages)
+        with file_lock(self._lock_path):
+            # Re-read under the lock so turns saved by another process are kept.
+            self._write(self._load() + messages)
+
+
+class JSONLHistoryStore(HistoryStore):
+    """Append-only history split into numbered JSONL segment files.
+
+    A new segment is started once the current one holds *segment_size*
+    messages, so reading the tail of the history only touches the last few
+    segments.
+    """
+
+    def __init__(self, directory: Path, segment_size: int = DEFAULT_SEGMENT_SIZE) -> None:
+        if segment_size < 1:
+            raise ValueError("segment_size must be at least 1.")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_size = segment_size
+        self._lock_path = self.directory / '.lock'
+        # Line counts of segments keyed by (name, size), so counting the
+        # history only reads segments that changed since the last count.
+        self._segment_counts: Dict[tuple, int] = {}
+
+    def segments(self) -> List[Path]:
+        """Return the segment files, oldest first."""
+        return sorted(self.directory.glob('segment-*.jsonl'))
+
+    def _segment_path(self, index: int) -> Path:
+        return self.directory / f'segment-{index:06d}.jsonl'
+
+    @staticmethod
+    def _segment_index(path: Path) -> int:
+        return int(path.stem.split('-', 1)[1])
+
+    @staticmethod
+    def _read_segment(path: Path) -> List[Message]:
+        with path.open('r', encoding='utf-8') as file:
+            # A line without its newline is a write cut short by a crash.
+            return [json.loads(line) for line in file if line.endswith('\n') and line.strip()]
+
+    @staticmethod
+    def _repair_tail(path: Path) -> None:
+        """Cut off a partial last line left behind by a crashed write."""
+        with path.open('rb+') as file:
+            size = file.seek(0, 2)
+            if size == 0:
+                return
+            file.seek(size - 1)
+            if file.read(1) == b'\n':
+                return
+            file.seek(0)
+            keep = file.read().rfind(b'\n') + 1
+            file.truncate(keep)
+        print(f"Removed {size - keep} bytes of an incomplete message from {path}")
+
+    def append(self, messages: Iterable[Message]) -> None:
+        pending = list(messages)
+        if not pending:
+            return
+        with file_lock(self._lock_path):
+            # Find the current segment on disk rather than trusting what this
+            # process last wrote: another process may have appended since.
+            counted = self._counted_segments()
+            if counted:
+                path, count = counted[-1]
+                self._repair_tail(path)
+                index = self._segment_index(path)
+            else:
+                index, count = 0, 0
+
+            while pending:
+                if count >= self.segment_size:
+                    index += 1
+                    count = 0
+                room = self.segment_size - count
+                batch, pending = pending[:room], pending[room:]
+                path = self._segment_path(index)
+                with path.open('a', encoding='utf-8') as file:
+                    file.write(''.join(json.dumps(message) + '\n' for message in batch))
+                count += len(batch)
+                self._segment_counts[(path.name, path.stat().st_size)] = count
+
+    def read_all(self) -> List[Message]:
+        messages: List[Message] = []
+        for segment in self.segments():
+            messages.extend(self._read_segment(segment))
+        return messages
+
+    def replace(self, messages: Iterable[Message]) -> None:
+        messages = list(messages)
+        with file_lock(self._lock_path):
+            new_segments = []
+            for start in range(0, len(messages), self.segment_size):
+                path = self._segment_path(len(new_segments))
+                batch = messages[start:start + self.segment_size]
+                atomic_write_text(path, ''.join(json.dumps(message) + '\n' for message in batch))
+                new_segments.append(path)
+            for segment in self.segments():
+                if segment not in new_segments:
+                    segment.unlink()
+            self._segment_counts = {}
+
+    def _counted_segments(self) -> List[tuple]:
+        """Return ``(path, message_count)`` for each segment, oldest first."""
+        counted = []
+        counts = {}
+        for segment in self.segments():
+            key = (segment.name, segment.stat().st_size)
+            count = self._segment_counts.get(key)
+            if count is None:
+                count = len(self._read_segment(segment))
+            counts[key] = count
+            counted.append((segment, count))
+        self._segment_counts = counts
+        return counted
+
+    def count(self) -> int:
+        return sum(count for _, count in self._counted_segments())
+
+    def slice(self, start: int, end: int) -> List[Message]:
+        messages: List[Message] = []
+        offset = 0
+        for segment, count in self._counted_segments():
+            if offset + count > start and offset < end:
+                segment_messages = self._read_segment(segment)
+                messages.extend(segment_messages[max(0, start - offset):end - offset])
+            offset += count
+            if offset >= end:
+                break
+        return messages
+
+    def _iter_newest_first(self):
+        for segment in reversed(self.segments()):
+            yield from reversed(self._read_segment(segment))
+
+    def tail(
+        self,
+        max_messages: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+        token_counter: Optional[Callable[[Message], int]] = None,
+    ) -> List[Message]:
+        return _take_tail(self._iter_newest_first(), max_messages, max_tokens, token_counter)
+
+
+def migrate_json_history(json_path: Path, store: HistoryStore) -> int:
+    """Copy a legacy ``history.json`` into *store* and return the message count.
+
+    The JSON file is renamed with a ``.migrated`` suffix afterwards so the
+    migration only ever runs once.
+    """
+    json_path = Path(json_path)
+    with json_path.open('r') as file:
+        messages = [m for m in json.load(file) if m.get('role') != 'system']
+    store.append(messages)
+    json_path.rename(json_path.with_name(json_path.name + '.migrated'))
+    return len(messages)
+
+
+def open_history_store(
+    history_file_path: Path,
+    backend: str = 'json',
+    segment_size: int = DEFAULT_SEGMENT_SIZE,
+) -> HistoryStore:
+    """Create the history backend configured for a bot.
+
+    For the ``jsonl`` backend the segments live in a directory named after the
+    history file (``history.json`` -> ``history/``), and an existing
+    ``history.json`` is migrated into it the first time it is opened.
+    """
+    history_file_path = Path(history_file_path)
+    if backend == 'json':
+        return JSONHistoryStore(history_file_path)
+    if backend == 'jsonl':
+        store = JSONLHistoryStore(history_file_path.with_suffix(''), segment_size=segment_size)
+        if history_file_path.is_file() and not store.segments():
+            migrated = migrate_json_history(history_file_path, store)
+            print(f"Migrated {migrated} messages from {history_file_path} to {store.directory}")
+        return store
+    raise ValueError(f"Unknown history backend: {backend}")
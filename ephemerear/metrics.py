@@ -0,0 +1,259 @@
+"""Per-stage timings and counters for the chat and transcription pipeline.
+
+Stages are wrapped in ``metrics.span("stage")`` and quantities such as
+bytes, tokens and cache hits are recorded with ``metrics.count(name, n)``.
+Both do nothing until metrics are enabled (``bot.metrics: true``), so the
+instrumentation stays in place at close to no cost. Once enabled, every span
+and count is appended to a JSONL file, and the totals can be served in the
+Prometheus text format.
+"""
+
+from __future__ import annotations
+
+import atexit
+import contextvars
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+DEFAULT_METRICS_FILE_NAME = "metrics.jsonl"
+DEFAULT_FLUSH_EVENTS = 256
+DEFAULT_METRICS_HOST = "127.0.0.1"
+
+_PROMETHEUS_UNSAFE = re.compile(r"[^a-zA-Z0-9_]")
+# The innermost open span, per thread and per asyncio task.
+_current_span: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("ephemerear_span", default=None)
+
+
+class _NoopSpan:
+    """Returned by :meth:`Metrics.span` while metrics are disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """A timed stage; attributes given to :meth:`set` go into its JSONL record."""
+
+    __slots__ = ("_metrics", "name", "attrs", "parent", "_start", "_token")
+
+    def __init__(self, metrics: "Metrics", name: str, attrs: Dict[str, Any]) -> None:
+        self._metrics = metrics
+        self.name = name
+        self.attrs = attrs
+        self.parent: Optional[str] = None
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> "Span":
+        self.parent = _current_span.get()
+        self._token = _current_span.set(self.name)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        duration = time.perf_counter() - self._start
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            # Exited in another context, e.g. a generator resumed elsewhere.
+            pass
+        self._metrics._record_span(self, duration, exc_type is not None)
+        return False
+
+
+class Metrics:
+    """Span timings and counters, aggregated in memory and logged as JSONL."""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.path: Optional[str] = None
+        self.flush_events = DEFAULT_FLUSH_EVENTS
+        self._lock = threading.Lock()
+        self._events: List[Dict[str, Any]] = []
+        # name -> [count, total seconds, max seconds, errors]
+        self._spans: Dict[str, List[float]] = {}
+        self._counters: Dict[str, float] = {}
+        self._server = None
+        self._atexit_registered = False
+
+    def configure(self, config: dict) -> "Metrics":
+        """Enable metrics as set in the ``bot`` section of *config*.
+
+        ``bot.metrics`` turns them on, ``bot.metrics_file`` sets the JSONL
+        file (default ``<bot.cache>/metrics.jsonl``) and ``bot.metrics_port``
+        starts the Prometheus endpoint.
+        """
+        bot_config = config.get('bot', {})
+        if not bot_config.get('metrics', False):
+            return self
+        self.enable(bot_config.get('metrics_file') or os.path.join(bot_config.get('cache', '.'), DEFAULT_METRICS_FILE_NAME))
+        port = bot_config.get('metrics_port')
+        if port and self._server is None:
+            self.serve_prometheus(int(port), bot_config.get('metrics_host', DEFAULT_METRICS_HOST))
+        return self
+
+    def enable(self, path: Optional[str] = None) -> None:
+        """Start recording; events are appended to *path* when given."""
+        if self.enabled and path == self.path:
+            return
+        self.flush()
+        with self._lock:
+            self.path = path
+            self.enabled = True
+            if not self._atexit_registered:
+                atexit.register(self.close)
+                self._atexit_registered = True
+
+    def disable(self) -> None:
+        self.flush()
+        self.enabled = False
+
+    def reset(self) -> None:
+        """Forget the totals and any events not yet written."""
+        with self._lock:
+            self._events.clear()
+            self._spans.clear()
+            self._counters.clear()
+
+    def span(self, name: str, **attrs: Any):
+        """Return a context manager timing the stage *name*."""
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, name, attrs)
+
+    def count(self, name: str, value: float = 1, **attrs: Any) -> None:
+        """Add *value* to the counter *name*."""
+        if not self.enabled:
+            return
+        event = {"ts": time.time(), "type": "count", "name": name, "value": value}
+        if attrs:
+            event.update(attrs)
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+            self._append(event)
+
+    def _record_span(self, span: Span, duration: float, error: bool) -> None:
+        event = {"ts": time.time(), "type": "span", "name": span.name, "seconds": round(duration, 6)}
+        if span.parent:
+            event["parent"] = span.parent
+        if error:
+            event["error"] = True
+        if span.attrs:
+            event.update(span.attrs)
+        with self._lock:
+            totals = self._spans.get(span.name)
+            if totals is None:
+                totals = self._spans[span.name] = [0, 0.0, 0.0, 0]
+            totals[0] += 1
+            totals[1] += duration
+            totals[2] = max(totals[2], duration)
+            totals[3] += error
+            self._append(event)
+
+    def _append(self, event: Dict[str, Any]) -> None:
+        # Called with the lock held.
+        if self.path is None:
+            return
+        self._events.append(event)
+        if len(self._events) >= self.flush_events:
+            self._write(self._events)
+            self._events = []
+
+    def _write(self, events: List[Dict[str, Any]]) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.writelines(json.dumps(event, default=str) + "\n" for event in events)
+
+    def flush(self) -> None:
+        """Append the events recorded so far to the JSONL file."""
+        with self._lock:
+            if self._events and self.path is not None:
+                self._write(self._events)
+            self._events = []
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Return the span and counter totals recorded so far."""
+        with self._lock:
+            return {
+                "spans": {
+                    name: {"count": int(count), "seconds": total, "max_seconds": longest, "errors": int(errors)}
+                    for name, (count, total, longest, errors) in self._spans.items()
+                },
+                "counters": dict(self._counters),
+            }
+
+    def render_prometheus(self) -> str:
+        """Return the totals in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+        if snapshot["spans"]:
+            lines += [
+                "# HELP ephemerear_span_seconds Time spent in each pipeline stage.",
+                "# TYPE ephemerear_span_seconds summary",
+            ]
+            for name, totals in sorted(snapshot["spans"].items()):
+                lines.append(f'ephemerear_span_seconds_count{{span="{name}"}} {totals["count"]}')
+                lines.append(f'ephemerear_span_seconds_sum{{span="{name}"}} {totals["seconds"]:.6f}')
+            lines.append("# TYPE ephemerear_span_errors_total counter")
+            for name, totals in sorted(snapshot["spans"].items()):
+                lines.append(f'ephemerear_span_errors_total{{span="{name}"}} {totals["errors"]}')
+        for name, value in sorted(snapshot["counters"].items()):
+            metric = "ephemerear_" + _PROMETHEUS_UNSAFE.sub("_", name) + "_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def serve_prometheus(self, port: int, host: str = DEFAULT_METRICS_HOST):
+        """Serve :meth:`render_prometheus` at ``/metrics`` on a background thread."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="ephemerear-metrics", daemon=True).start()
+        print(f"Serving metrics at http://{host}:{self._server.server_address[1]}/metrics")
+        return self._server
+
+    def close(self) -> None:
+        """Write pending events and stop the Prometheus endpoint."""
+        self.flush()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+# The process-wide instance used by the instrumented code.
+metrics = Metrics()
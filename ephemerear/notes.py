@@ -0,0 +1,252 @@
+"""SQLite store for the todos and memories the bot records.
+
+Entries are kept in one table with an FTS5 index for search. Adding an
+entry that says the same as an existing one of the same kind, ignoring case,
+punctuation and list markup, is a no-op, and the markdown files the user
+reads are updated by appending only the entries that haven't been written to
+them yet.
+"""
+
+from __future__ import annotations
+
+import datetime
+import difflib
+import re
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+DEFAULT_DATABASE_NAME = "notes.sqlite3"
+# Fuzzy matching is off by default: entries that differ by a word or two
+# ("Buy 2 apples" / "Buy 3 apples") are usually different entries.
+DEFAULT_SIMILARITY = None
+
+MARKDOWN_HEADERS = {
+    "todo": "# To-Do List\n\n",
+    "memory": "# Memories\n\n",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    text TEXT NOT NULL,
+    normalized TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    rendered INTEGER NOT NULL DEFAULT 0
+);
+CREATE UNIQUE INDEX IF NOT EXISTS entries_kind_normalized ON entries (kind, normalized);
+CREATE INDEX IF NOT EXISTS entries_kind_rendered ON entries (kind, rendered);
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5 (text, content='entries', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN
+    INSERT INTO entries_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_ad AFTER DELETE ON entries BEGIN
+    INSERT INTO entries_fts (entries_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+# Markdown list markers and checkboxes, which don't change what an entry says.
+_LIST_MARKER = re.compile(r"^\s*(?:[-*+]|\d+\.)\s+(?:\[[ xX]\]\s*)?")
+_WORD = re.compile(r"\w+")
+_DATE_WORDS = {
+    "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+    "january", "february", "march", "april", "may", "june", "july", "august",
+    "september", "october", "november", "december", "today", "tomorrow", "tonight", "yesterday",
+}
+
+
+def normalize(text: str) -> str:
+    """Return *text* reduced to its lowercase words, for duplicate detection."""
+    return " ".join(_WORD.findall(_LIST_MARKER.sub("", text).lower()))
+
+
+def _fixed_tokens(normalized: str) -> List[str]:
+    """Return the numbers, times and dates in *normalized* text."""
+    return sorted(
+        word for word in normalized.split()
+        if word in _DATE_WORDS or any(char.isdigit() for char in word)
+    )
+
+
+@dataclass
+class Note:
+    id: int
+    kind: str
+    text: str
+    created_at: str
+
+
+class NoteStore:
+    """Todos and memories in a SQLite database at *path*.
+
+    An entry is a duplicate when its normalized text matches an existing one.
+    With *similarity* set, entries whose text is at least that similar are
+    duplicates too, provided they have the same numbers, times and dates.
+
+    One connection is shared by the threads using the store, guarded by a
+    lock; tool calls run concurrently but each only holds it briefly.
+    """
+
+    def __init__(self, path: Union[str, Path], similarity: Optional[float] = DEFAULT_SIMILARITY) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.similarity = similarity
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        with self._connection:
+            self._connection.executescript(SCHEMA)
+
+    def _find_duplicate(self, kind: str, normalized: str) -> Optional[sqlite3.Row]:
+        row = self._connection.execute(
+            "SELECT * FROM entries WHERE kind = ? AND normalized = ?", (kind, normalized)
+        ).fetchone()
+        if row is not None or not normalized or self.similarity is None:
+            return row
+        # Near-identical entries share most of their words, so the full-text
+        # index narrows the candidates to compare down to a handful.
+        fixed = _fixed_tokens(normalized)
+        for candidate in self._match(kind, normalized.split(), any_word=True, limit=20):
+            if _fixed_tokens(candidate["normalized"]) != fixed:
+                continue
+            ratio = difflib.SequenceMatcher(None, normalized, candidate["normalized"]).ratio()
+            if ratio >= self.similarity:
+                return candidate
+        return None
+
+    def add(self, kind: str, text: str) -> Tuple[Note, bool]:
+        """Record *text* as a *kind* entry; return it and whether it was new."""
+        text = text.strip()
+        normalized = normalize(text)
+        with self._lock, self._connection:
+            duplicate = self._find_duplicate(kind, normalized)
+            if duplicate is not None:
+                return self._note(duplicate), False
+            created_at = datetime.datetime.now().isoformat(timespec="seconds")
+            cursor = self._connection.execute(
+                "INSERT INTO entries (kind, text, normalized, created_at) VALUES (?, ?, ?, ?)",
+                (kind, text, normalized, created_at),
+            )
+            return Note(cursor.lastrowid, kind, text, created_at), True
+
+    def list(self, kind: str, limit: int = 20) -> List[Note]:
+        """Return the newest *limit* entries of *kind*, newest first."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT * FROM entries WHERE kind = ? ORDER BY id DESC LIMIT ?", (kind, limit)
+            ).fetchall()
+        return [self._note(row) for row in rows]
+
+    def search(self, query: str, kind: Union[str, Sequence[str], None] = None, limit: int = 10) -> List[Note]:
+        """Return the entries matching all words of *query*, best match first."""
+        return [note for _, note in self.search_ranked(query, kind, limit)]
+
+    def search_ranked(
+        self, query: str, kind: Union[str, Sequence[str], None] = None, limit: int = 10
+    ) -> List[Tuple[float, Note]]:
+        """Like :meth:`search`, with each entry's BM25 rank (lower is better)."""
+        words = _WORD.findall(query.lower())
+        if not words:
+            return []
+        with self._lock:
+            rows = self._match(kind, words, any_word=False, limit=limit)
+        return [(row["rank"], self._note(row)) for row in rows]
+
+    def _match(
+        self, kind: Union[str, Sequence[str], None], words: List[str], any_word: bool, limit: int
+    ) -> List[sqlite3.Row]:
+        # Quote every word so user text can't be read as FTS5 query syntax.
+        match = (" OR " if any_word else " ").join(f'"{word}"' for word in words)
+        sql = (
+            "SELECT entries.*, bm25(entries_fts) AS rank FROM entries_fts "
+            "JOIN entries ON entries.id = entries_fts.rowid WHERE entries_fts MATCH ?"
+        )
+        params: list = [match]
+        if kind is not None:
+            kinds = [kind] if isinstance(kind, str) else list(kind)
+            sql += f" AND entries.kind IN ({', '.join('?' * len(kinds))})"
+            params += kinds
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+        return self._connection.execute(sql, params).fetchall()
+
+    def render_markdown(self, kind: str, markdown_path: Union[str, Path]) -> int:
+        """Append the *kind* entries not yet in *markdown_path* to it.
+
+        Only new entries are written, so the cost doesn't grow with the size
+        of the file. Returns the number of entries written.
+        """
+        markdown_path = Path(markdown_path)
+        with self._lock, self._connection:
+            if not markdown_path.exists():
+                # The file was removed or never written: start it over.
+                self._connection.execute("UPDATE entries SET rendered = 0 WHERE kind = ?", (kind,))
+            rows = self._connection.execute(
+                "SELECT id, text FROM entries WHERE kind = ? AND rendered = 0 ORDER BY id", (kind,)
+            ).fetchall()
+            if not rows and markdown_path.exists():
+                return 0
+            markdown_path.parent.mkdir(parents=True, exist_ok=True)
+            with markdown_path.open("a", encoding="utf-8") as file:
+                if file.tell() == 0:
+                    file.write(MARKDOWN_HEADERS.get(kind, f"# {kind.title()}\n\n"))
+                file.writelines(f"{row['text']}\n" for row in rows)
+            self._connection.executemany("UPDATE entries SET rendered = 1 WHERE id = ?", [(row["id"],) for row in rows])
+        return len(rows)
+
+    def import_markdown(self, kind: str, markdown_path: Union[str, Path]) -> int:
+        """Load the entries of an existing markdown file written before the store existed.
+
+        Imported entries are marked as already rendered. Returns how many
+        were added.
+        """
+        markdown_path = Path(markdown_path)
+        if not markdown_path.exists():
+            return 0
+        added = 0
+        for line in markdown_path.read_text(encoding="utf-8").splitlines():
+            if not line.strip() or line.startswith("#"):
+                continue
+            note, created = self.add(kind, line)
+            if created:
+                added += 1
+                with self._lock, self._connection:
+                    self._connection.execute("UPDATE entries SET rendered = 1 WHERE id = ?", (note.id,))
+        return added
+
+    @staticmethod
+    def _note(row: sqlite3.Row) -> Note:
+        return Note(row["id"], row["kind"], row["text"], row["created_at"])
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+_stores: Dict[Path, NoteStore] = {}
+_imported: set = set()
+_stores_lock = threading.Lock()
+
+
+def note_store_for(markdown_path: Union[str, Path], kind: str) -> NoteStore:
+    """Return the store kept next to *markdown_path*, opening it once per process.
+
+    The first time a store is opened for an existing markdown file, the
+    entries already in the file are imported so they are deduplicated
+    against and searchable.
+    """
+    markdown_path = Path(markdown_path).resolve()
+    database_path = markdown_path.parent / DEFAULT_DATABASE_NAME
+    with _stores_lock:
+        store = _stores.get(database_path)
+        if store is None:
+            store = _stores[database_path] = NoteStore(database_path)
+        imported_key = (markdown_path, kind)
+        if imported_key not in _imported:
+            _imported.add(imported_key)
+            if not store.list(kind, limit=1):
+                store.import_markdown(kind, markdown_path)
+    return store
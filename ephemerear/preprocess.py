@@ -0,0 +1,349 @@
+"""Shrink recordings before they are uploaded for transcription.
+
+:func:`preprocess_audio` downmixes a recording to mono, resamples it to
+16 kHz, cuts out long silences found by an energy-based voice activity
+detector and encodes what is left as low-bitrate Opus. Speech models don't
+use more than 16 kHz mono, so the transcript is unaffected, but the upload
+is typically a tenth of the original or less and there is less audio to
+transcribe. The returned :class:`TimestampMap` translates a position in the
+processed audio back to the original recording.
+"""
+
+from __future__ import annotations
+
+import bisect
+import functools
+import json
+import os
+import subprocess
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from .fileio import atomic_write_text, create_unique
+from .metrics import metrics
+from .transcribe import AUDIO_CODECS, AudioFormat, _ffmpeg, _require_numpy, frame_rms, probe_duration_ms
+
+SPEECH_SAMPLE_RATE = 16000
+DEFAULT_SPEECH_BITRATE_KBPS = 24
+SPEECH_FORMAT = AudioFormat("opus", DEFAULT_SPEECH_BITRATE_KBPS, SPEECH_SAMPLE_RATE, 1)
+# Lossless, for audio that is cut into chunks and encoded per chunk later.
+SPEECH_WAV_FORMAT = AudioFormat("wav", 256, SPEECH_SAMPLE_RATE, 1)
+DEFAULT_FRAME_MS = 30
+DEFAULT_MIN_SILENCE_MS = 1000
+DEFAULT_PADDING_MS = 250
+DEFAULT_MARGIN_DB = 12.0
+# Frames quieter than this are never speech, and frames louder than this
+# far below the loudest speech always are.
+SILENCE_FLOOR_DBFS = -60.0
+SPEECH_RANGE_DB = 20.0
+_BYTES_PER_SAMPLE = 2
+_READ_BLOCK_BYTES = 64 * 1024
+
+
+@dataclass
+class TimestampMap:
+    """The stretches of the original recording kept in the processed audio.
+
+    *segments* are ``(start_ms, end_ms)`` in the original, in order; in the
+    processed audio they follow each other without gaps.
+    """
+
+    segments: List[Tuple[int, int]]
+    _starts: List[int] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.segments = [tuple(segment) for segment in self.segments]
+        self._starts = []
+        position = 0
+        for start, end in self.segments:
+            self._starts.append(position)
+            position += end - start
+
+    @property
+    def duration_ms(self) -> int:
+        """Length of the processed audio."""
+        return sum(end - start for start, end in self.segments)
+
+    def to_source(self, processed_ms: int) -> int:
+        """Return where *processed_ms* in the processed audio is in the original."""
+        if not self.segments:
+            return processed_ms
+        i = max(0, bisect.bisect_right(self._starts, processed_ms) - 1)
+        start, end = self.segments[i]
+        return min(start + processed_ms - self._starts[i], end)
+
+    def save(self, path: str) -> None:
+        atomic_write_text(path, json.dumps({"segments": self.segments}), fsync=False)
+
+    @classmethod
+    def load(cls, path: str) -> "TimestampMap":
+        with open(path, "r", encoding="utf-8") as file:
+            return cls(json.load(file)["segments"])
+
+
+@dataclass
+class PreprocessResult:
+    """The processed file and what preprocessing saved.
+
+    *audio_format* is what is uploaded. When *encoded_per_chunk* is set the
+    file itself is 16 kHz WAV and each chunk cut from it is encoded as
+    *audio_format*.
+    """
+
+    output_path: str
+    timestamp_map: TimestampMap
+    audio_format: AudioFormat
+    input_bytes: int
+    output_bytes: int
+    input_ms: int
+    seconds: float
+    encoded_per_chunk: bool = False
+
+    @property
+    def timemap_path(self) -> str:
+        return os.path.splitext(self.output_path)[0] + ".timemap.json"
+
+    @property
+    def output_ms(self) -> int:
+        return self.timestamp_map.duration_ms
+
+    @property
+    def upload_bytes(self) -> int:
+        """Bytes to upload; estimated from the bitrate when encoded per chunk."""
+        if self.encoded_per_chunk:
+            return self.output_ms * self.audio_format.bitrate_kbps // 8
+        return self.output_bytes
+
+    @property
+    def saved_bytes(self) -> int:
+        return self.input_bytes - self.upload_bytes
+
+    def summary(self) -> str:
+        saved = self.saved_bytes / self.input_bytes if self.input_bytes else 0.0
+        approx = "~" if self.encoded_per_chunk else ""
+        return (
+            f"Preprocessed {Path(self.output_path).name}: "
+            f"{self.input_bytes / 1e6:.2f} MB -> {approx}{self.upload_bytes / 1e6:.2f} MB ({saved:.0%} smaller), "
+            f"{self.input_ms / 1000:.1f}s -> {self.output_ms / 1000:.1f}s of audio "
+            f"({len(self.timestamp_map.segments)} speech segment(s)) in {self.seconds:.2f}s"
+            + (f", to be sent as {self.audio_format.codec} chunks" if self.encoded_per_chunk else "")
+        )
+
+
+def speech_segments(
+    rms,
+    frame_ms: int = DEFAULT_FRAME_MS,
+    min_silence_ms: int = DEFAULT_MIN_SILENCE_MS,
+    padding_ms: int = DEFAULT_PADDING_MS,
+    margin_db: float = DEFAULT_MARGIN_DB,
+) -> List[Tuple[int, int]]:
+    """Return the ``(start_ms, end_ms)`` spans that contain speech.
+
+    A frame is speech when its energy is *margin_db* above the noise floor
+    (the 10th percentile of all frames), capped so that anything within
+    ``SPEECH_RANGE_DB`` of the loudest frames counts. Pauses shorter than
+    *min_silence_ms* are kept, and each span is widened by *padding_ms* so
+    that word onsets and endings aren't clipped. When nothing is found to be
+    speech, the whole recording is kept.
+    """
+    np = _require_numpy()
+    rms = np.asarray(rms, dtype=np.float64)
+    duration_ms = len(rms) * frame_ms
+    if len(rms) == 0:
+        return []
+
+    levels = 20 * np.log10(np.maximum(rms, 1e-9) / 32768)
+    floor, loud = np.percentile(levels, [10, 99])
+    threshold = max(min(floor + margin_db, loud - SPEECH_RANGE_DB), SILENCE_FLOOR_DBFS)
+    voiced = np.flatnonzero(levels > threshold)
+    if len(voiced) == 0:
+        return [(0, duration_ms)]
+
+    # Start a new span wherever the gap between voiced frames is a real pause.
+    breaks = np.flatnonzero(np.diff(voiced) * frame_ms > min_silence_ms)
+    starts = np.concatenate(([voiced[0]], voiced[breaks + 1]))
+    ends = np.concatenate((voiced[breaks], [voiced[-1]])) + 1
+
+    segments: List[Tuple[int, int]] = []
+    for start, end in zip(starts * frame_ms - padding_ms, ends * frame_ms + padding_ms):
+        start, end = max(0, int(start)), min(duration_ms, int(end))
+        if segments and start <= segments[-1][1]:
+            segments[-1] = (segments[-1][0], end)
+        else:
+            segments.append((start, end))
+    return segments
+
+
+def _decode_speech_pcm(file_path: str) -> subprocess.Popen:
+    """Start ffmpeg decoding *file_path* to mono 16 kHz 16-bit PCM on stdout."""
+    return subprocess.Popen(
+        [
+            _ffmpeg(),
+            "-hide_banner", "-loglevel", "error",
+            "-i", file_path,
+            "-vn", "-ac", "1", "-ar", str(SPEECH_SAMPLE_RATE), "-f", "s16le", "-",
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+
+
+def _read_blocks(process: subprocess.Popen, block_bytes: int = _READ_BLOCK_BYTES) -> Iterator[bytes]:
+    yield from iter(lambda: process.stdout.read(block_bytes), b"")
+    _, stderr = process.communicate()
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, process.args, stderr=stderr)
+
+
+def measure_frames(file_path: str, frame_ms: int = DEFAULT_FRAME_MS):
+    """Return the RMS energy of every *frame_ms* frame of *file_path* at 16 kHz mono.
+
+    The audio is decoded as a stream, so memory use is bounded by the number
+    of frames rather than the decoded audio.
+    """
+    np = _require_numpy()
+    frame_bytes = SPEECH_SAMPLE_RATE * frame_ms // 1000 * _BYTES_PER_SAMPLE
+    energies = []
+    pending = b""
+    for block in _read_blocks(_decode_speech_pcm(file_path)):
+        pending += block
+        whole = len(pending) - len(pending) % frame_bytes
+        if whole:
+            samples = np.frombuffer(pending[:whole], dtype=np.int16)
+            energies.append(frame_rms(samples, frame_bytes // _BYTES_PER_SAMPLE))
+            pending = pending[whole:]
+    if pending:
+        samples = np.frombuffer(pending[:len(pending) - len(pending) % _BYTES_PER_SAMPLE], dtype=np.int16)
+        energies.append(frame_rms(samples, len(samples)) if len(samples) else np.zeros(0))
+    return np.concatenate(energies) if energies else np.zeros(0)
+
+
+@functools.lru_cache(maxsize=None)
+def has_encoder(codec: str) -> bool:
+    """Return True if the ffmpeg in use can encode *codec*."""
+    result = subprocess.run([_ffmpeg(), "-hide_banner", "-encoders"], capture_output=True, text=True)
+    return f" {AUDIO_CODECS[codec][0]} " in result.stdout
+
+
+def _encode_segments(file_path: str, output_path: str, segments: List[Tuple[int, int]], audio_format: AudioFormat) -> None:
+    """Encode only *segments* of *file_path*, back to back, to *output_path*."""
+    ranges = [
+        (start * SPEECH_SAMPLE_RATE // 1000 * _BYTES_PER_SAMPLE, end * SPEECH_SAMPLE_RATE // 1000 * _BYTES_PER_SAMPLE)
+        for start, end in segments
+    ]
+    encoder = subprocess.Popen(
+        [
+            _ffmpeg(),
+            "-hide_banner", "-loglevel", "error", "-y",
+            "-f", "s16le", "-ar", str(SPEECH_SAMPLE_RATE), "-ac", "1", "-i", "-",
+            *audio_format.ffmpeg_args(),
+            output_path,
+        ],
+        stdin=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    decoder = _decode_speech_pcm(file_path)
+    try:
+        position = 0
+        i = 0
+        for block in _read_blocks(decoder):
+            block_end = position + len(block)
+            while i < len(ranges) and ranges[i][0] < block_end:
+                start, end = max(ranges[i][0], position), min(ranges[i][1], block_end)
+                if start < end:
+                    encoder.stdin.write(block[start - position:end - position])
+                if ranges[i][1] > block_end:
+                    break
+                i += 1
+            position = block_end
+    except BrokenPipeError:
+        # The encoder failed; its error is raised below.
+        decoder.kill()
+        decoder.communicate()
+    finally:
+        _, stderr = encoder.communicate()
+    if encoder.returncode:
+        raise subprocess.CalledProcessError(encoder.returncode, encoder.args, stderr=stderr)
+
+
+def preprocess_audio(
+    file_path: str,
+    output_dir: str,
+    audio_format: AudioFormat = SPEECH_FORMAT,
+    trim_silence: bool = True,
+    min_silence_ms: int = DEFAULT_MIN_SILENCE_MS,
+    padding_ms: int = DEFAULT_PADDING_MS,
+    chunk_length_ms: Optional[int] = None,
+) -> PreprocessResult:
+    """Write a compact speech-only copy of *file_path* to *output_dir*.
+
+    With *trim_silence*, pauses longer than *min_silence_ms* are removed and
+    the kept spans are listed in the result's :class:`TimestampMap`, which is
+    also saved next to the output as ``<name>.timemap.json``. Without it the
+    recording is only downmixed, resampled and re-encoded. When ffmpeg has no
+    Opus encoder, low-bitrate MP3 is used instead.
+
+    Each call writes to a new file name, even for inputs with the same name;
+    the caller deletes ``output_path`` and ``timemap_path`` once done.
+
+    Audio longer than *chunk_length_ms* will be cut into chunks that are each
+    encoded as *audio_format*, so it is written as 16 kHz WAV rather than
+    encoded twice.
+    """
+    if not has_encoder(audio_format.codec):
+        print(f"ffmpeg can't encode {audio_format.codec}; preprocessing to MP3 instead")
+        audio_format = AudioFormat("mp3", audio_format.bitrate_kbps, audio_format.sample_rate, audio_format.channels)
+
+    start_time = time.perf_counter()
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+
+    with metrics.span("audio.preprocess", trim_silence=trim_silence) as span:
+        if trim_silence:
+            rms = measure_frames(file_path)
+            input_ms = len(rms) * DEFAULT_FRAME_MS
+            segments = speech_segments(rms, min_silence_ms=min_silence_ms, padding_ms=padding_ms)
+        else:
+            input_ms = probe_duration_ms(file_path)
+            segments = [(0, input_ms)]
+        timestamp_map = TimestampMap(segments)
+        encoded_per_chunk = chunk_length_ms is not None and timestamp_map.duration_ms > chunk_length_ms
+        file_format = SPEECH_WAV_FORMAT if encoded_per_chunk else audio_format
+        # Recordings from different folders can share a name, so claim one.
+        output_path = str(create_unique(output_dir, Path(file_path).stem, file_format.suffix))
+
+        try:
+            if trim_silence:
+                _encode_segments(file_path, output_path, segments, file_format)
+            else:
+                subprocess.run(
+                    [
+                        _ffmpeg(),
+                        "-hide_banner", "-loglevel", "error", "-y",
+                        "-i", file_path,
+                        *file_format.ffmpeg_args(),
+                        output_path,
+                    ],
+                    capture_output=True,
+                    check=True,
+                )
+        except BaseException:
+            Path(output_path).unlink(missing_ok=True)
+            raise
+        timestamp_map.save(os.path.splitext(output_path)[0] + ".timemap.json")
+        result = PreprocessResult(
+            output_path=output_path,
+            timestamp_map=timestamp_map,
+            audio_format=audio_format,
+            input_bytes=os.path.getsize(file_path),
+            output_bytes=os.path.getsize(output_path),
+            input_ms=input_ms,
+            seconds=time.perf_counter() - start_time,
+            encoded_per_chunk=encoded_per_chunk,
+        )
+        span.set(saved_bytes=result.saved_bytes, trimmed_ms=input_ms - result.output_ms)
+
+    metrics.count("preprocess.saved_bytes", result.saved_bytes)
+    metrics.count("preprocess.trimmed_ms", input_ms - result.output_ms)
+    return result
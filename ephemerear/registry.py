@@ -0,0 +1,136 @@
+"""Serve several bots from one process.
+
+``EphemerEar(config_path)`` parses the YAML, creates missing paths and reads
+the prompt files every time it is constructed. :class:`BotRegistry` does that
+once per bot and hands out the same instance until one of its files changes,
+and bots that use the same API key and endpoint share one connection pool.
+"""
+
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from ephemerear.clients import DEFAULT_HTTP_POOL_SIZE, DEFAULT_HTTP_TIMEOUT, ClientRegistry
+from ephemerear.EphemerEar import EphemerEar
+
+CONFIG_SUFFIXES = ('.yaml', '.yml')
+
+
+def _mtime_ns(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+class BotRegistry:
+    """Maps bot ids to config files and caches the constructed bots.
+
+    A cached bot is rebuilt when the modification time of its config, system
+    prompt or user details file changes, so edits are picked up without a
+    restart. The replaced instance is closed, which drains its queued
+    markdown writes and notifications; turns still running on it afterwards
+    write and notify inline.
+    """
+
+    def __init__(self, bots: Optional[Dict[str, Union[str, Path]]] = None) -> None:
+        self._paths: Dict[str, Path] = {}
+        self._bots: Dict[Path, Tuple[Tuple[Optional[int], ...], EphemerEar]] = {}
+        self._clients: Dict[tuple, ClientRegistry] = {}
+        self._lock = threading.Lock()
+        self._path_locks: Dict[Path, threading.Lock] = {}
+        for bot_id, config_path in (bots or {}).items():
+            self.register(bot_id, config_path)
+
+    @classmethod
+    def from_directory(cls, directory: Union[str, Path]) -> "BotRegistry":
+        """Register every YAML file in *directory*, using the file stem as the bot id."""
+        directory = Path(directory)
+        if not directory.is_dir():
+            raise FileNotFoundError(f"The directory {directory} does not exist.")
+        return cls({
+            path.stem: path
+            for path in sorted(directory.iterdir())
+            if path.suffix in CONFIG_SUFFIXES
+        })
+
+    def register(self, bot_id: str, config_path: Union[str, Path]) -> None:
+        with self._lock:
+            self._paths[bot_id] = Path(config_path).resolve()
+
+    @property
+    def bot_ids(self) -> List[str]:
+        return list(self._paths)
+
+    def get(self, bot_id: str) -> EphemerEar:
+        """Return the bot registered as *bot_id*, building it if needed."""
+        try:
+            config_path = self._paths[bot_id]
+        except KeyError:
+            raise KeyError(f"Unknown bot id: {bot_id}") from None
+        return self.for_config(config_path)
+
+    __getitem__ = get
+
+    def for_config(self, config_path: Union[str, Path]) -> EphemerEar:
+        """Return the cached bot for *config_path*, rebuilding it if its files changed."""
+        config_path = Path(config_path).resolve()
+        cached = self._bots.get(config_path)
+        if cached is not None and cached[0] == self._signature(config_path, cached[1]):
+            return cached[1]
+
+        with self._lock:
+            path_lock = self._path_locks.setdefault(config_path, threading.Lock())
+        with path_lock:
+            cached = self._bots.get(config_path)
+            if cached is not None and cached[0] == self._signature(config_path, cached[1]):
+                return cached[1]
+
+            # Stat the config before parsing it, so an edit made while the bot
+            # is being built still invalidates it on the next call.
+            config_mtime = _mtime_ns(config_path)
+            config = EphemerEar.load_yaml_to_dict(config_path)
+            bot = EphemerEar(config_path, config=config, clients=self._shared_clients(config))
+            signature = (config_mtime,) + self._signature(config_path, bot)[1:]
+            self._bots[config_path] = (signature, bot)
+
+        if cached is not None:
+            cached[1].close()
+        return bot
+
+    @staticmethod
+    def _signature(config_path: Path, bot: EphemerEar) -> Tuple[Optional[int], ...]:
+        return (
+            _mtime_ns(config_path),
+            _mtime_ns(Path(bot.config['bot']['system_prompt'])),
+            _mtime_ns(Path(bot.config['user']['user_details'])),
+        )
+
+    def _shared_clients(self, config: dict) -> ClientRegistry:
+        bot_config = config.get('bot', {})
+        key = (
+            config['auth_tokens']['openai'],
+            bot_config.get('openai_base_url'),
+            bot_config.get('http_timeout', DEFAULT_HTTP_TIMEOUT),
+            bot_config.get('http_pool_size', DEFAULT_HTTP_POOL_SIZE),
+            bot_config.get('stt_timeout'),
+        )
+        with self._lock:
+            clients = self._clients.get(key)
+            if clients is None:
+                clients = self._clients[key] = ClientRegistry.from_config(config)
+            return clients
+
+    def close(self) -> None:
+        """Close every cached bot and the shared clients."""
+        with self._lock:
+            bots = [bot for _, bot in self._bots.values()]
+            clients = list(self._clients.values())
+            self._bots.clear()
+            self._clients.clear()
+        for bot in bots:
+            bot.close()
+        for registry in clients:
+            registry.close()
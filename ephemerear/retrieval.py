@@ -0,0 +1,345 @@
+"""Embedding index over the bot's stores, for retrieval-augmented prompts.
+
+Markdown and text files under the configured stores (knowledge, transcripts,
+notes, responses) are split into passages and embedded. The vectors live in
+a float32 matrix on disk that is memory-mapped for search, so the index
+doesn't have to fit in memory. Only new or changed files are embedded when
+the index is refreshed.
+
+NumPy is an optional dependency and is imported lazily.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_EMBEDDING_MODEL = "text-embedding-3-small"
+DEFAULT_RETRIEVAL_STORES = ("knowledge", "transcripts", "notes", "responses")
+DEFAULT_RETRIEVAL_MAX_TOKENS = 500
+DEFAULT_RETRIEVAL_TOP_K = 5
+DEFAULT_RETRIEVAL_REFRESH_SECONDS = 60.0
+DEFAULT_PASSAGE_WORDS = 200
+DEFAULT_PASSAGE_OVERLAP = 40
+INDEXED_SUFFIXES = (".md", ".txt")
+EMBEDDING_BATCH_SIZE = 64
+
+
+def _require_numpy():
+    try:
+        import numpy
+    except ModuleNotFoundError as exc:
+        raise ModuleNotFoundError(
+            "Retrieval requires the 'numpy' package"
+        ) from exc
+    return numpy
+
+
+def split_passages(
+    text: str,
+    max_words: int = DEFAULT_PASSAGE_WORDS,
+    overlap: int = DEFAULT_PASSAGE_OVERLAP,
+) -> List[str]:
+    """Split *text* into passages of at most *max_words* words.
+
+    Consecutive passages share *overlap* words so that a sentence cut at a
+    boundary is still found whole in one of them.
+    """
+    words = text.split()
+    if not words:
+        return []
+    step = max(1, max_words - overlap)
+    return [
+        " ".join(words[start:start + max_words])
+        for start in range(0, max(1, len(words) - overlap), step)
+    ]
+
+
+class OpenAIEmbedder:
+    """Embeds texts with the OpenAI embeddings API, in batches.
+
+    *get_client* returns the OpenAI client to use, so that it is only
+    created when something is first embedded.
+    """
+
+    def __init__(self, get_client: Callable[[], Any], model: str = DEFAULT_EMBEDDING_MODEL, batch_size: int = EMBEDDING_BATCH_SIZE) -> None:
+        self.get_client = get_client
+        self.model = model
+        self.batch_size = batch_size
+
+    def __call__(self, texts: Sequence[str]):
+        np = _require_numpy()
+        client = self.get_client()
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            response = client.embeddings.create(model=self.model, input=list(texts[start:start + self.batch_size]))
+            vectors.extend(item.embedding for item in sorted(response.data, key=lambda item: item.index))
+        return np.asarray(vectors, dtype=np.float32)
+
+
+class VectorIndex:
+    """Passages and their unit-length embeddings, stored in *directory*.
+
+    ``vectors.f32`` holds the embedding matrix, one row per passage, and is
+    memory-mapped for search. ``passages.jsonl`` holds the matching source
+    path and text, and ``index.json`` the rows belonging to each file.
+    Rows of changed or deleted files are dropped from the manifest and
+    skipped by searches; the files are rewritten without them once they
+    make up over half of the rows.
+    """
+
+    def __init__(self, directory, model: str = DEFAULT_EMBEDDING_MODEL) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.model = model
+        self._lock = threading.RLock()
+        self._matrix = None
+        self._active = None
+        self._load()
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self.directory / "vectors.f32"
+
+    @property
+    def _passages_path(self) -> Path:
+        return self.directory / "passages.jsonl"
+
+    @property
+    def _manifest_path(self) -> Path:
+        return self.directory / "index.json"
+
+    def _load(self) -> None:
+        manifest = {}
+        if self._manifest_path.exists():
+            manifest = json.loads(self._manifest_path.read_text(encoding="utf-8"))
+        if manifest.get("model") != self.model:
+            # Vectors from another model aren't comparable: start over.
+            manifest = {}
+            for path in (self._vectors_path, self._passages_path):
+                path.unlink(missing_ok=True)
+        self.dim: Optional[int] = manifest.get("dim")
+        self.rows: int = manifest.get("rows", 0)
+        self.files: Dict[str, Dict[str, Any]] = manifest.get("files", {})
+
+        # Rows written after the last manifest save (e.g. by a crash
+        # mid-update) aren't referenced by it and are cut off.
+        self.passages: List[Dict[str, str]] = []
+        if self._passages_path.exists():
+            with self._passages_path.open("r+", encoding="utf-8") as file:
+                for _ in range(self.rows):
+                    self.passages.append(json.loads(file.readline()))
+                file.truncate(file.tell())
+        if self.dim and self._vectors_path.exists():
+            with self._vectors_path.open("r+b") as file:
+                file.truncate(self.rows * self.dim * 4)
+        self._matrix = None
+        self._active = None
+
+    def _save_manifest(self) -> None:
+        tmp_path = self._manifest_path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps({"model": self.model, "dim": self.dim, "rows": self.rows, "files": self.files}),
+            encoding="utf-8",
+        )
+        os.replace(tmp_path, self._manifest_path)
+
+    def _view(self):
+        """Return the memory-mapped matrix and the mask of live rows."""
+        np = _require_numpy()
+        if self._matrix is None:
+            if self.rows and self.dim:
+                self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(self.rows, self.dim))
+            else:
+                self._matrix = np.zeros((0, self.dim or 0), dtype=np.float32)
+            active = np.zeros(self.rows, dtype=bool)
+            for entry in self.files.values():
+                active[entry["start"]:entry["end"]] = True
+            self._active = active
+        return self._matrix, self._active
+
+    @property
+    def active_rows(self) -> int:
+        return sum(entry["end"] - entry["start"] for entry in self.files.values())
+
+    def stale(self, path: str, stat: os.stat_result) -> bool:
+        entry = self.files.get(path)
+        return entry is None or entry["mtime_ns"] != stat.st_mtime_ns or entry["size"] != stat.st_size
+
+    def add_file(self, path: str, stat: os.stat_result, passages: List[str], vectors) -> None:
+        """Replace the passages of *path* with *passages* and their *vectors*."""
+        np = _require_numpy()
+        if not passages:
+            vectors = np.zeros((0, self.dim or 0), dtype=np.float32)
+        else:
+            vectors = np.asarray(vectors, dtype=np.float32).reshape(len(passages), -1)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1, norms)
+        with self._lock:
+            if self.dim is None and len(passages):
+                self.dim = vectors.shape[1]
+            with self._vectors_path.open("ab") as file:
+                file.write(vectors.tobytes())
+            with self._passages_path.open("a", encoding="utf-8") as file:
+                for text in passages:
+                    file.write(json.dumps({"source": path, "text": text}) + "\n")
+            self.passages.extend({"source": path, "text": text} for text in passages)
+            self.files[path] = {
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "start": self.rows,
+                "end": self.rows + len(passages),
+            }
+            self.rows += len(passages)
+            self._save_manifest()
+            self._matrix = None
+
+    def remove_file(self, path: str) -> None:
+        with self._lock:
+            if self.files.pop(path, None) is not None:
+                self._save_manifest()
+                self._active = None
+                self._matrix = None
+
+    def compact(self) -> None:
+        """Rewrite the index without the rows of changed or deleted files."""
+        np = _require_numpy()
+        with self._lock:
+            matrix, _ = self._view()
+            files, passages, blocks = {}, [], []
+            for path, entry in sorted(self.files.items(), key=lambda item: item[1]["start"]):
+                start = len(passages)
+                passages.extend(self.passages[entry["start"]:entry["end"]])
+                blocks.append(np.array(matrix[entry["start"]:entry["end"]]))
+                files[path] = dict(entry, start=start, end=len(passages))
+            self._matrix = None
+
+            tmp_vectors = self._vectors_path.with_suffix(".tmp")
+            with tmp_vectors.open("wb") as file:
+                for block in blocks:
+                    file.write(block.tobytes())
+            tmp_passages = self._passages_path.with_suffix(".tmp")
+            with tmp_passages.open("w", encoding="utf-8") as file:
+                file.writelines(json.dumps(passage) + "\n" for passage in passages)
+            os.replace(tmp_vectors, self._vectors_path)
+            os.replace(tmp_passages, self._passages_path)
+
+            self.files, self.passages, self.rows = files, passages, len(passages)
+            self._save_manifest()
+
+    def search(self, vector, k: int = DEFAULT_RETRIEVAL_TOP_K) -> List[Tuple[float, Dict[str, str]]]:
+        """Return up to *k* ``(score, passage)`` pairs by cosine similarity, best first."""
+        np = _require_numpy()
+        with self._lock:
+            matrix, active = self._view()
+            if not active.any():
+                return []
+            vector = np.asarray(vector, dtype=np.float32).ravel()
+            vector = vector / (np.linalg.norm(vector) or 1)
+            scores = np.where(active, matrix @ vector, -np.inf)
+            k = min(k, int(active.sum()))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(float(scores[i]), self.passages[i]) for i in top]
+
+
+class Retriever:
+    """Keeps a :class:`VectorIndex` in step with *sources* and queries it.
+
+    *embed* maps a list of texts to a matrix of embeddings.
+    """
+
+    def __init__(
+        self,
+        index: VectorIndex,
+        embed: Callable[[Sequence[str]], Any],
+        sources: Iterable[str],
+        refresh_seconds: float = DEFAULT_RETRIEVAL_REFRESH_SECONDS,
+    ) -> None:
+        self.index = index
+        self.embed = embed
+        self.sources = [Path(source) for source in sources]
+        self.refresh_seconds = refresh_seconds
+        self._refresh_lock = threading.Lock()
+        self._last_refresh: Optional[float] = None
+        self.files_embedded = 0
+
+    def _source_files(self) -> Dict[str, os.stat_result]:
+        files = {}
+        for source in self.sources:
+            if not source.is_dir():
+                continue
+            for path in source.rglob("*"):
+                if path.suffix in INDEXED_SUFFIXES and path.is_file():
+                    files[str(path.resolve())] = path.stat()
+        return files
+
+    def refresh(self) -> int:
+        """Embed new and changed files and forget deleted ones; return files embedded."""
+        with self._refresh_lock:
+            files = self._source_files()
+            for path in set(self.index.files) - set(files):
+                self.index.remove_file(path)
+
+            embedded = 0
+            for path, stat in sorted(files.items()):
+                if not self.index.stale(path, stat):
+                    continue
+                passages = split_passages(Path(path).read_text(encoding="utf-8", errors="replace"))
+                vectors = self.embed(passages) if passages else []
+                self.index.remove_file(path)
+                self.index.add_file(path, stat, passages, vectors)
+                embedded += 1
+
+            if self.index.rows > 2 * self.index.active_rows:
+                self.index.compact()
+            self._last_refresh = time.monotonic()
+            self.files_embedded += embedded
+            return embedded
+
+    def refresh_in_background(self) -> Optional[threading.Thread]:
+        """Start :meth:`refresh` on a thread if the index is due one and none is running."""
+        due = self._last_refresh is None or time.monotonic() - self._last_refresh >= self.refresh_seconds
+        if not due or self._refresh_lock.locked():
+            return None
+        self._last_refresh = time.monotonic()
+
+        def run():
+            try:
+                self.refresh()
+            except Exception as exc:
+                print(f"Retrieval index refresh failed: {exc}")
+
+        thread = threading.Thread(target=run, name="ephemerear-retrieval", daemon=True)
+        thread.start()
+        return thread
+
+    def retrieve(
+        self,
+        query: str,
+        max_tokens: int = DEFAULT_RETRIEVAL_MAX_TOKENS,
+        token_counter: Callable[[str], int] = lambda text: len(text.split()),
+        k: int = DEFAULT_RETRIEVAL_TOP_K,
+    ) -> List[Dict[str, str]]:
+        """Return the passages most relevant to *query* that fit in *max_tokens*."""
+        if not self.index.active_rows or not query.strip():
+            return []
+        results = self.index.search(self.embed([query])[0], k=k)
+        selected, used = [], 0
+        for _, passage in results:
+            tokens = token_counter(passage["text"])
+            if used + tokens > max_tokens:
+                continue
+            used += tokens
+            selected.append(passage)
+        return selected
+
+
+def format_passages(passages: List[Dict[str, str]]) -> str:
+    """Render retrieved passages as the text of a system message."""
+    sections = [f"From {Path(passage['source']).name}:\n{passage['text']}" for passage in passages]
+    return "Notes from earlier that may be relevant:\n\n" + "\n\n".join(sections)
@@ -0,0 +1,143 @@
+"""Background worker for the side effects of a chat turn.
+
+Writing the response markdown and sending Pushover notifications don't
+affect the reply, so they are handed to a single background thread instead
+of running on the caller's critical path. Notifications arriving within
+``coalesce_window`` seconds of each other are combined into one push.
+"""
+
+from __future__ import annotations
+
+import functools
+import threading
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+PUSHOVER_MAX_MESSAGE_LENGTH = 1024
+
+Notification = Tuple[str, str, Optional[str]]
+
+
+class SideEffectQueue:
+    """Runs queued file writes and coalesced notifications on a worker thread.
+
+    *send_notification* is called as ``send_notification(title, message,
+    message_url)``. Failures are printed and don't stop the worker. Call
+    :meth:`close` (registered with ``atexit`` by EphemerEar) to drain
+    everything that is still queued before the process exits. Work handed
+    to a closed queue, e.g. by a turn still running on a bot that has just
+    been replaced, is run immediately on the caller's thread.
+    """
+
+    def __init__(
+        self,
+        send_notification: Callable[[str, str, Optional[str]], Any],
+        coalesce_window: float = 2.0,
+        max_message_length: int = PUSHOVER_MAX_MESSAGE_LENGTH,
+    ) -> None:
+        self._send_notification = send_notification
+        self.coalesce_window = coalesce_window
+        self.max_message_length = max_message_length
+        self._cond = threading.Condition()
+        self._writes: List[Callable[[], Any]] = []
+        self._notifications: List[Notification] = []
+        self._deadline: Optional[float] = None
+        self._flushing = 0
+        self._busy = False
+        self._closed = False
+        self.pushes_sent = 0
+        self._thread = threading.Thread(target=self._run, name="ephemerear-side-effects", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+        """Queue a file write (or any other call) to run on the worker."""
+        write = functools.partial(fn, *args, **kwargs)
+        with self._cond:
+            if not self._closed:
+                self._writes.append(write)
+                self._cond.notify_all()
+                return
+        self._run_write(write)
+
+    def notify(self, title: str, message: str, message_url: Optional[str] = None) -> None:
+        """Queue a notification to be sent, combined with any that follow it."""
+        with self._cond:
+            if not self._closed:
+                self._notifications.append((title, message, message_url))
+                if self._deadline is None:
+                    self._deadline = time.monotonic() + self.coalesce_window
+                self._cond.notify_all()
+                return
+        self._send([(title, message, message_url)])
+
+    @staticmethod
+    def _run_write(write: Callable[[], Any]) -> None:
+        try:
+            write()
+        except Exception as exc:
+            print(f"Background write failed: {exc}")
+
+    def _send(self, notifications: List[Notification]) -> None:
+        try:
+            self._send_notification(*self._coalesce(notifications))
+            self.pushes_sent += 1
+        except Exception as exc:
+            print(f"Background notification failed: {exc}")
+
+    def _notifications_due(self) -> bool:
+        if not self._notifications:
+            return False
+        return self._closed or self._flushing > 0 or time.monotonic() >= self._deadline
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not (self._writes or self._notifications_due()):
+                    if self._closed and not self._notifications:
+                        return
+                    timeout = None
+                    if self._notifications:
+                        timeout = max(0.0, self._deadline - time.monotonic())
+                    self._cond.wait(timeout)
+                writes, self._writes = self._writes, []
+                notifications = []
+                if self._notifications_due():
+                    notifications, self._notifications, self._deadline = self._notifications, [], None
+                self._busy = True
+
+            for write in writes:
+                self._run_write(write)
+            if notifications:
+                self._send(notifications)
+
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+
+    def _coalesce(self, notifications: List[Notification]) -> Notification:
+        title = notifications[0][0]
+        messages = list(dict.fromkeys(message for _, message, _ in notifications))
+        message = "\n\n".join(messages)
+        if len(message) > self.max_message_length:
+            message = message[:self.max_message_length - 1] + "…"
+        message_url = next((url for _, _, url in notifications if url), None)
+        return title, message, message_url
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Run everything queued now and wait for it; False on timeout."""
+        with self._cond:
+            self._flushing += 1
+            self._cond.notify_all()
+            try:
+                return self._cond.wait_for(
+                    lambda: not (self._writes or self._notifications or self._busy), timeout
+                )
+            finally:
+                self._flushing -= 1
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Stop accepting work, drain the queue and stop the worker."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
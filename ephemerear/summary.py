@@ -0,0 +1,151 @@
+"""Rolling summary of the conversation that has left the prompt window.
+
+Messages older than the history window used to be dropped outright. Instead,
+once enough of them have been evicted, they are folded into a running
+summary that is sent with every prompt. The summary is refreshed on a
+background thread, so no turn waits for it, and is cached in a JSON file
+next to the history so it survives restarts.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .fileio import atomic_write_text
+
+DEFAULT_SUMMARY_MAX_TOKENS = 300
+DEFAULT_SUMMARY_MIN_MESSAGES = 6
+# Evicted messages are summarized this many tokens at a time, so a long
+# backlog (an existing history, or one just migrated) fits the model.
+DEFAULT_SUMMARY_BATCH_TOKENS = 6000
+_SLICE_MESSAGES = 200
+
+SUMMARY_INSTRUCTIONS = (
+    "You maintain a running summary of a conversation between a user and an assistant. "
+    "Update the summary with the new messages below. Keep facts, decisions, names, dates "
+    "and open tasks; drop small talk. Reply with the updated summary only."
+)
+
+Message = Dict[str, Any]
+Summarize = Callable[[str, List[Message]], str]
+
+
+def _approximate_tokens(message: Message) -> int:
+    return len(message.get('content') or '') // 4 + 1
+
+
+def summary_path_for(history_file_path: Path) -> Path:
+    """Return where the summary of the history at *history_file_path* is cached."""
+    history_file_path = Path(history_file_path)
+    return history_file_path.with_name(history_file_path.stem + '.summary.json')
+
+
+def summary_request(previous_summary: str, messages: List[Message]) -> List[Dict[str, str]]:
+    """Return the chat messages asking a model to fold *messages* into *previous_summary*."""
+    transcript = "\n".join(f"{m['role']}: {m.get('content') or ''}" for m in messages)
+    return [
+        {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+        {"role": "user", "content": f"Current summary:\n{previous_summary or '(none yet)'}\n\nNew messages:\n{transcript}"},
+    ]
+
+
+class RollingSummary:
+    """The summary of history positions ``0`` to ``covered``, cached at *path*.
+
+    *summarize* is called as ``summarize(previous_summary, messages)`` and
+    returns the updated summary text. Each call gets at most
+    *max_batch_tokens* of messages, as measured by *token_counter*.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        summarize: Summarize,
+        min_messages: int = DEFAULT_SUMMARY_MIN_MESSAGES,
+        token_counter: Optional[Callable[[Message], int]] = None,
+        max_batch_tokens: int = DEFAULT_SUMMARY_BATCH_TOKENS,
+    ) -> None:
+        self.path = Path(path)
+        self.summarize = summarize
+        self.min_messages = min_messages
+        self.token_counter = token_counter or _approximate_tokens
+        self.max_batch_tokens = max_batch_tokens
+        self.text = ""
+        self.covered = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        if self.path.is_file():
+            with self.path.open('r', encoding='utf-8') as file:
+                state = json.load(file)
+            self.text = state.get('summary', '')
+            self.covered = state.get('covered', 0)
+
+    def _save(self) -> None:
+        atomic_write_text(self.path, json.dumps({'summary': self.text, 'covered': self.covered}))
+
+    def message(self) -> Optional[Dict[str, str]]:
+        """Return the summary as a system message, or None before there is one."""
+        if not self.text:
+            return None
+        return {"role": "system", "content": f"Summary of the earlier conversation:\n{self.text}"}
+
+    def refresh(self, history_store, window_start: int) -> bool:
+        """Fold the messages evicted before *window_start* into the summary.
+
+        Does nothing until at least ``min_messages`` messages are waiting.
+        The messages are folded in token-bounded batches and progress is
+        saved after each, so a failure part-way keeps the batches done.
+        Returns whether the summary changed.
+        """
+        with self._lock:
+            if self.covered > history_store.count():
+                # The history was rewritten or cleared: start over.
+                self.text, self.covered = "", 0
+            if window_start - self.covered < self.min_messages:
+                return False
+            while self.covered < window_start:
+                batch = self._next_batch(history_store, window_start)
+                self.text = self.summarize(self.text, batch).strip()
+                self.covered += len(batch)
+                self._save()
+            return True
+
+    def _next_batch(self, history_store, window_start: int) -> List[Message]:
+        """Return the messages from ``covered`` on that fit in one summarize call."""
+        batch: List[Message] = []
+        tokens = 0
+        position = self.covered
+        while position < window_start:
+            for message in history_store.slice(position, min(position + _SLICE_MESSAGES, window_start)):
+                message_tokens = self.token_counter(message)
+                if batch and tokens + message_tokens > self.max_batch_tokens:
+                    return batch
+                batch.append(message)
+                tokens += message_tokens
+            position += _SLICE_MESSAGES
+        return batch
+
+    def refresh_in_background(self, history_store, window_start: int) -> Optional[threading.Thread]:
+        """Start :meth:`refresh` on a thread when enough messages have been evicted."""
+        if window_start - self.covered < self.min_messages:
+            return None
+        if self._thread is not None and self._thread.is_alive():
+            return None
+
+        def run():
+            try:
+                self.refresh(history_store, window_start)
+            except Exception as exc:
+                print(f"History summary refresh failed: {exc}")
+
+        self._thread = threading.Thread(target=run, name="ephemerear-summary", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Wait for a background refresh to finish, if one is running."""
+        if self._thread is not None:
+            self._thread.join(timeout)
@@ -0,0 +1,143 @@
+"""Run the tool calls requested by a chat completion.
+
+A single reply can ask for several tools at once ("add three todos and
+remember X"). :class:`ToolExecutor` runs them concurrently in a thread pool,
+gives each a timeout, and returns the ``tool`` messages to send back to the
+model for the follow-up completion.
+"""
+
+from __future__ import annotations
+
+import datetime
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+DEFAULT_TOOL_TIMEOUT = 30.0
+DEFAULT_TOOL_WORKERS = 4
+DEFAULT_MAX_TOOL_ROUNDS = 3
+
+# Arguments with these names are converted to ``datetime`` objects.
+DATE_ARGUMENTS = ('date', 'when', 'start', 'end')
+
+
+def tool_definitions(function_definitions: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Wrap legacy ``functions=`` schemas in the structure the ``tools`` API expects."""
+    return [{"type": "function", "function": definition} for definition in function_definitions]
+
+
+def parse_tool_arguments(arguments: Any) -> Dict[str, Any]:
+    """Decode a tool call's JSON arguments, converting date fields to ``datetime``."""
+    if isinstance(arguments, str):
+        arguments = json.loads(arguments) if arguments.strip() else {}
+    arguments = dict(arguments or {})
+    for key in DATE_ARGUMENTS:
+        if isinstance(arguments.get(key), str):
+            arguments[key] = datetime.datetime.fromisoformat(arguments[key])
+    return arguments
+
+
+def assistant_tool_message(message) -> Dict[str, Any]:
+    """Return the assistant message carrying *message*'s tool calls, as a dict."""
+    return {
+        "role": "assistant",
+        "content": message.content,
+        "tool_calls": [
+            {
+                "id": call.id,
+                "type": "function",
+                "function": {"name": call.function.name, "arguments": call.function.arguments},
+            }
+            for call in message.tool_calls
+        ],
+    }
+
+
+class ToolExecutor:
+    """Runs tool calls concurrently, each bounded by a timeout.
+
+    *functions* maps tool names to callables and is looked up at call time,
+    so tools added to it later are picked up. *timeouts* overrides *timeout*
+    for individual tools. A call's timeout starts when a worker picks it up,
+    not while it waits behind other calls. A tool that times out is reported
+    to the model as such; its thread can't be interrupted and finishes in the
+    background. A call that still hasn't started once the whole batch's
+    timeouts have passed is cancelled and never runs.
+    """
+
+    def __init__(
+        self,
+        functions: Dict[str, Callable[..., Any]],
+        timeout: float = DEFAULT_TOOL_TIMEOUT,
+        timeouts: Optional[Dict[str, float]] = None,
+        max_workers: int = DEFAULT_TOOL_WORKERS,
+    ) -> None:
+        self.functions = functions
+        self.timeout = timeout
+        self.timeouts = dict(timeouts or {})
+        self.max_workers = max_workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _executor(self) -> ThreadPoolExecutor:
+        # Called with the lock held.
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ephemerear-tool")
+        return self._pool
+
+    def _call(self, name: str, arguments: Any) -> str:
+        function = self.functions.get(name)
+        if function is None:
+            return f"Function '{name}' is not available."
+        response = function(**parse_tool_arguments(arguments))
+        return f"Function '{name}' executed with response: {response}"
+
+    def run(self, tool_calls) -> List[Dict[str, Any]]:
+        """Run *tool_calls* and return one ``tool`` message per call, in order."""
+        tool_calls = list(tool_calls)
+        started = [threading.Event() for _ in tool_calls]
+        start_times = [0.0] * len(tool_calls)
+
+        def start(index: int, name: str, arguments: Any) -> str:
+            start_times[index] = time.monotonic()
+            started[index].set()
+            return self._call(name, arguments)
+
+        # Calls queued behind busy workers wait at most this long to start.
+        queue_deadline = time.monotonic() + sum(
+            self.timeouts.get(call.function.name, self.timeout) for call in tool_calls
+        )
+        # Submit under the lock so close() can't shut the pool down in
+        # between; after a close, a new pool is started.
+        with self._lock:
+            executor = self._executor()
+            futures = [
+                executor.submit(start, index, call.function.name, call.function.arguments)
+                for index, call in enumerate(tool_calls)
+            ]
+
+        results = []
+        for index, (call, future) in enumerate(zip(tool_calls, futures)):
+            name = call.function.name
+            timeout = self.timeouts.get(name, self.timeout)
+            try:
+                if not started[index].wait(max(0.0, queue_deadline - time.monotonic())) and future.cancel():
+                    content = f"Function '{name}' did not start: all {self.max_workers} tool workers were busy."
+                else:
+                    # A call that couldn't be cancelled has just started.
+                    started[index].wait()
+                    content = future.result(timeout=max(0.0, start_times[index] + timeout - time.monotonic()))
+            except FutureTimeoutError:
+                content = f"Function '{name}' timed out after {timeout:g} seconds."
+            except Exception as exc:
+                content = f"Function '{name}' failed: {exc}"
+            results.append({"role": "tool", "tool_call_id": call.id, "content": content})
+        return results
+
+    def close(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False)
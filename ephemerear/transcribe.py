@@ -8,86 +8,491 @@ This module supports two speech-to-text engines:
 from __future__ import annotations
 
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
 from datetime import datetime
 import math
 import os
+import random
+import subprocess
+import threading
+import time
 from pathlib import Path
-from typing import Iterable, List
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
-from pydub import AudioSegment
-import yaml
-
-from .EphemerEar import EphemerEar, testforword
+from .EphemerEar import EphemerEar
+from .batch import DEFAULT_MAX_ATTEMPTS, run_batch
+from .cache import TranscriptCache, cache_key, hash_file
+from .clients import ClientRegistry
+from .fileio import atomic_write_text
+from .metrics import metrics
+from .triggers import DEFAULT_TRIGGER_WORDS, TriggerMatcher, cached_matcher
 
 DEFAULT_OPENAI_TRANSCRIBE_MODEL = "gpt-4o-mini-transcribe"
+DEFAULT_STT_MAX_CONCURRENCY = 4
+DEFAULT_CHUNK_ENCODE_WORKERS = 2
+DEFAULT_CHUNK_LENGTH_MS = 10 * 60 * 1000
+DEFAULT_CHUNK_BITRATE_KBPS = 128
+DEFAULT_MAX_UPLOAD_MB = 25
+DEFAULT_SILENCE_SEARCH_MS = 20 * 1000
+DEFAULT_TRANSCRIPT_CACHE_MB = 200
+DEFAULT_TRANSCRIPT_CACHE_DAYS = 180
+# ffmpeg encoder and file suffix for each codec audio can be sent in.
+AUDIO_CODECS = {"mp3": ("libmp3lame", ".mp3"), "opus": ("libopus", ".ogg"), "wav": ("pcm_s16le", ".wav")}
+# libopus at its default level 10 runs at well under half the speed for
+# little gain on speech.
+OPUS_COMPRESSION_LEVEL = 5
 
 
 def whisper_local_transcribe(
     file_path: str,
     model: str = "base",
     custom_prompt: str = "Here is the full text, in English:",
+    socket_path: Optional[str] = None,
+    use_daemon: bool = True,
 ) -> str:
-    """Run local whisper transcription for a single audio file."""
+    """Run local whisper transcription for a single audio file.
+
+    The job is sent to the warm whisper daemon on *socket_path* (by default
+    :data:`~ephemerear.whisper_daemon.DEFAULT_SOCKET_PATH`) when one is
+    running; otherwise the model is loaded (once per process) and run here.
+    Pass ``use_daemon=False`` to always transcribe in-process.
+    """
+    # Imported here so the OpenAI path never loads the Unix socket code.
+    from .whisper_daemon import DEFAULT_SOCKET_PATH, DaemonUnavailable, submit_job, transcribe_in_process
+
+    if use_daemon:
+        try:
+            with metrics.span("stt.whisper_daemon", model=model):
+                return submit_job(
+                    file_path, model=model, custom_prompt=custom_prompt, socket_path=socket_path or DEFAULT_SOCKET_PATH
+                )
+        except DaemonUnavailable:
+            print("Whisper daemon not running; transcribing in-process")
+    with metrics.span("stt.whisper_local", model=model):
+        return transcribe_in_process(file_path, model, custom_prompt)
+
+
+def _ffmpeg() -> str:
+    """Return the ffmpeg executable pydub would use.
+
+    pydub is imported here rather than at module level: it pulls in audio
+    tooling that most callers of this module never need.
+    """
+    from pydub import AudioSegment
+
+    return AudioSegment.converter
+
+
+def _ffprobe() -> str:
+    from pydub.utils import get_prober_name
+
+    return get_prober_name()
+
+
+def probe_duration_ms(file_path: str) -> int:
+    """Return the duration of *file_path* in milliseconds without decoding it."""
+    with metrics.span("audio.probe"):
+        result = subprocess.run(
+            [
+                _ffprobe(),
+                "-v", "error",
+                "-show_entries", "format=duration",
+                "-of", "default=noprint_wrappers=1:nokey=1",
+                file_path,
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    return int(float(result.stdout.strip()) * 1000)
+
+
+def chunk_spans(duration_ms: int, target_length_ms: int) -> List[Tuple[int, int]]:
+    """Return fixed-size ``(start_ms, end_ms)`` windows covering *duration_ms*."""
+    total_chunks = max(1, math.ceil(duration_ms / target_length_ms))
+    return [
+        (i * target_length_ms, min((i + 1) * target_length_ms, duration_ms))
+        for i in range(total_chunks)
+    ]
+
+
+def _require_numpy():
     try:
-        import whisper
+        import numpy
     except ModuleNotFoundError as exc:
         raise ModuleNotFoundError(
-            "Local whisper transcription requires the 'openai-whisper' package"
+            "Silence-aware chunking requires the 'numpy' package"
         ) from exc
+    return numpy
+
+
+def decode_pcm(file_path: str, start_ms: int, length_ms: int, sample_rate: int = 8000) -> bytes:
+    """Decode a window of *file_path* to mono 16-bit PCM at *sample_rate*."""
+    with metrics.span("audio.decode", length_ms=length_ms):
+        result = subprocess.run(
+            [
+                _ffmpeg(),
+                "-hide_banner", "-loglevel", "error",
+                "-ss", f"{start_ms / 1000:.3f}",
+                "-t", f"{length_ms / 1000:.3f}",
+                "-i", file_path,
+                "-vn", "-ac", "1", "-ar", str(sample_rate), "-f", "s16le", "-",
+            ],
+            capture_output=True,
+            check=True,
+        )
+    metrics.count("audio.decoded_bytes", len(result.stdout))
+    return result.stdout
+
 
-    local_model = whisper.load_model(model)
-    result = local_model.transcribe(file_path, language="en", initial_prompt=custom_prompt)
-    return result["text"]
+def frame_rms(samples, frame_length: int):
+    """Return the RMS energy of consecutive *frame_length*-sample frames."""
+    np = _require_numpy()
+    frames = len(samples) // frame_length
+    if frames == 0:
+        return np.zeros(0, dtype=np.float32)
+    framed = np.asarray(samples[:frames * frame_length], dtype=np.float32).reshape(frames, frame_length)
+    return np.sqrt(np.mean(framed ** 2, axis=1))
+
+
+def find_quiet_point(
+    file_path: str,
+    center_ms: int,
+    search_ms: int,
+    sample_rate: int = 8000,
+    frame_ms: int = 20,
+    smooth_ms: int = 200,
+) -> int:
+    """Return the quietest offset within *search_ms* around *center_ms*.
+
+    Only the search window is decoded. Frame energies are smoothed so a cut
+    lands in a pause rather than a single quiet frame, and among equally
+    quiet frames the one closest to *center_ms* wins.
+    """
+    np = _require_numpy()
+    start_ms = max(0, center_ms - search_ms // 2)
+    samples = np.frombuffer(decode_pcm(file_path, start_ms, search_ms, sample_rate), dtype=np.int16)
+    rms = frame_rms(samples, sample_rate * frame_ms // 1000)
+    if len(rms) == 0:
+        return center_ms
+
+    window = min(len(rms), max(1, smooth_ms // frame_ms))
+    energy = np.convolve(rms, np.ones(window) / window, mode="same")
+    quiet = np.flatnonzero(energy <= energy.min() * 1.05 + 1e-6)
+    center_frame = (center_ms - start_ms) // frame_ms
+    best = quiet[np.argmin(np.abs(quiet - center_frame))]
+    return start_ms + int(best) * frame_ms + frame_ms // 2
+
+
+@dataclass(frozen=True)
+class AudioFormat:
+    """How audio is encoded before it is uploaded.
+
+    *sample_rate* and *channels* are left as they are in the source unless set.
+    """
+
+    codec: str = "mp3"
+    bitrate_kbps: int = DEFAULT_CHUNK_BITRATE_KBPS
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+
+    def __post_init__(self) -> None:
+        if self.codec not in AUDIO_CODECS:
+            raise ValueError(f"Unknown audio codec: {self.codec}")
+
+    @property
+    def suffix(self) -> str:
+        return AUDIO_CODECS[self.codec][1]
+
+    def ffmpeg_args(self) -> List[str]:
+        """Return the ffmpeg output options that produce this format."""
+        args = ["-vn"]
+        if self.channels:
+            args += ["-ac", str(self.channels)]
+        if self.sample_rate:
+            args += ["-ar", str(self.sample_rate)]
+        args += ["-c:a", AUDIO_CODECS[self.codec][0]]
+        if self.codec == "opus":
+            args += ["-compression_level", str(OPUS_COMPRESSION_LEVEL)]
+        if self.codec != "wav":
+            args += ["-b:a", f"{self.bitrate_kbps}k"]
+        return args
+
+
+MP3_CHUNK_FORMAT = AudioFormat()
+
+
+@dataclass
+class ChunkPlan:
+    """Where a recording will be cut, and why."""
+
+    duration_ms: int
+    target_length_ms: int
+    spans: List[Tuple[int, int]]
+    nominal_cuts: List[int] = field(default_factory=list)
+
+    @property
+    def cuts(self) -> List[int]:
+        return [end for _, end in self.spans[:-1]]
+
+    def summary(self) -> str:
+        lines = [
+            f"{len(self.spans)} chunk(s) over {self.duration_ms / 1000:.1f}s "
+            f"(target {self.target_length_ms / 1000:.1f}s per chunk)"
+        ]
+        for i, (start, end) in enumerate(self.spans):
+            line = f"  chunk {i:03}: {start / 1000:.1f}s -> {end / 1000:.1f}s"
+            if i < len(self.nominal_cuts):
+                line += f" (cut moved {(end - self.nominal_cuts[i]) / 1000:+.1f}s to a pause)"
+            lines.append(line)
+        return "\n".join(lines)
+
+
+def plan_chunks(
+    file_path: str,
+    max_chunk_ms: int = DEFAULT_CHUNK_LENGTH_MS,
+    max_chunk_bytes: Optional[int] = None,
+    bitrate_kbps: int = DEFAULT_CHUNK_BITRATE_KBPS,
+    silence_search_ms: int = DEFAULT_SILENCE_SEARCH_MS,
+    duration_ms: Optional[int] = None,
+) -> ChunkPlan:
+    """Plan evenly sized chunks whose boundaries fall on nearby silences.
+
+    The chunk length is the smaller of *max_chunk_ms* and the duration that
+    fits in *max_chunk_bytes* at *bitrate_kbps*. Nominal cuts are spaced so
+    that moving each one by up to half of *silence_search_ms* still keeps
+    every chunk within budget. The search is also narrowed to two thirds of
+    the spacing between cuts, so neighbouring cuts can't cross.
+    """
+    if duration_ms is None:
+        duration_ms = probe_duration_ms(file_path)
+
+    target_length_ms = max_chunk_ms
+    if max_chunk_bytes is not None:
+        target_length_ms = min(target_length_ms, max_chunk_bytes * 8 // bitrate_kbps)
+
+    silence_search_ms = min(silence_search_ms, target_length_ms // 2)
+    spacing_ms = max(1, target_length_ms - silence_search_ms)
+    total_chunks = max(1, math.ceil(duration_ms / spacing_ms))
+    if silence_search_ms <= 0 or total_chunks == 1:
+        return ChunkPlan(duration_ms, target_length_ms, chunk_spans(duration_ms, target_length_ms))
+
+    nominal_cuts = [round(i * duration_ms / total_chunks) for i in range(1, total_chunks)]
+    silence_search_ms = min(silence_search_ms, 2 * (duration_ms // total_chunks) // 3)
+    with metrics.span("audio.silence_search", cuts=len(nominal_cuts)):
+        cuts = [find_quiet_point(file_path, cut, silence_search_ms) for cut in nominal_cuts]
+    bounds = [0] + cuts + [duration_ms]
+    spans = list(zip(bounds[:-1], bounds[1:]))
+    return ChunkPlan(duration_ms, target_length_ms, spans, nominal_cuts)
+
+
+def export_span(
+    file_path: str,
+    start_ms: int,
+    end_ms: int,
+    output_path: str,
+    audio_format: AudioFormat = MP3_CHUNK_FORMAT,
+) -> str:
+    """Decode and encode one window of *file_path* to *audio_format* with ffmpeg.
+
+    ffmpeg seeks to *start_ms* in the input and only decodes the requested
+    window, so memory use is bounded by the chunk rather than the recording.
+    """
+    with metrics.span("audio.export", length_ms=end_ms - start_ms):
+        subprocess.run(
+            [
+                _ffmpeg(),
+                "-hide_banner", "-loglevel", "error", "-y",
+                "-ss", f"{start_ms / 1000:.3f}",
+                "-t", f"{(end_ms - start_ms) / 1000:.3f}",
+                "-i", file_path,
+                *audio_format.ffmpeg_args(),
+                output_path,
+            ],
+            capture_output=True,
+            check=True,
+        )
+    if metrics.enabled:
+        metrics.count("audio.exported_bytes", os.path.getsize(output_path))
+    return output_path
 
 
-def split_audio(file_path: str, target_length_ms: int = 10 * 60 * 1000, cache_dir: str = "./cache") -> List[str]:
-    """Split audio into fixed-size MP3 chunks and return created chunk paths."""
-    audio = AudioSegment.from_file(file_path)
-    chunks: List[str] = []
+def iter_audio_chunks(
+    file_path: str,
+    target_length_ms: int = DEFAULT_CHUNK_LENGTH_MS,
+    cache_dir: str = "./cache",
+    encode_workers: int = DEFAULT_CHUNK_ENCODE_WORKERS,
+    plan: Optional[ChunkPlan] = None,
+    audio_format: AudioFormat = MP3_CHUNK_FORMAT,
+) -> Iterator[str]:
+    """Yield chunk paths in order as soon as each one has been written.
+
+    Each chunk is cut by its own ffmpeg process, and up to *encode_workers*
+    of them run at once. Consumers can start on the first chunk while later
+    ones are still being encoded. Without a *plan*, cut points are chosen by
+    :func:`plan_chunks` with a duration budget of *target_length_ms*.
+    """
+    if plan is None:
+        plan = plan_chunks(file_path, max_chunk_ms=target_length_ms)
+
     cache_path = Path(cache_dir)
     cache_path.mkdir(parents=True, exist_ok=True)
-
-    total_chunks = max(1, math.ceil(len(audio) / target_length_ms))
     stem = Path(file_path).stem
+    outputs = [str(cache_path / f"{stem}_chunk{i:03}{audio_format.suffix}") for i in range(len(plan.spans))]
+
+    with ThreadPoolExecutor(max_workers=max(1, encode_workers)) as executor:
+        futures = [
+            executor.submit(export_span, file_path, start, end, output, audio_format)
+            for (start, end), output in zip(plan.spans, outputs)
+        ]
+        try:
+            for future in futures:
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def split_audio(
+    file_path: str,
+    target_length_ms: int = DEFAULT_CHUNK_LENGTH_MS,
+    cache_dir: str = "./cache",
+    encode_workers: int = DEFAULT_CHUNK_ENCODE_WORKERS,
+    audio_format: AudioFormat = MP3_CHUNK_FORMAT,
+) -> List[str]:
+    """Split audio into chunks cut at pauses and return created chunk paths."""
+    return list(iter_audio_chunks(file_path, target_length_ms, cache_dir, encode_workers, audio_format=audio_format))
 
-    for i in range(total_chunks):
-        start = i * target_length_ms
-        end = min((i + 1) * target_length_ms, len(audio))
-        chunk = audio[start:end]
-        chunk_name = cache_path / f"{stem}_chunk{i:03}.mp3"
-        chunk.export(chunk_name, format="mp3")
-        chunks.append(str(chunk_name))
 
-    return chunks
+def _is_retryable(exc: Exception) -> bool:
+    """Return True for rate limits, server errors and dropped connections."""
+    status_code = getattr(exc, "status_code", None)
+    if status_code is not None:
+        return status_code == 429 or status_code >= 500
+    return type(exc).__name__ in {"APIConnectionError", "APITimeoutError"}
 
 
-def whisper_api_transcribe(
+def _transcribe_chunk(
+    client,
+    chunk: str,
+    custom_prompt: str,
+    model: str,
+    max_retries: int,
+    retry_backoff: float,
+) -> str:
+    """Transcribe a single chunk, retrying transient API errors with backoff."""
+    for attempt in range(max_retries + 1):
+        try:
+            print(f"Transcribing {chunk}")
+            with metrics.span("stt.request", model=model, attempt=attempt), open(chunk, "rb") as audio_file:
+                response = client.audio.transcriptions.create(
+                    model=model,
+                    file=audio_file,
+                    prompt=custom_prompt,
+                )
+            if metrics.enabled:
+                metrics.count("stt.uploaded_bytes", os.path.getsize(chunk))
+            return response.text
+        except Exception as exc:
+            if attempt == max_retries or not _is_retryable(exc):
+                raise
+            metrics.count("stt.retries")
+            delay = retry_backoff * (2 ** attempt) * (1 + random.random())
+            print(f"Retrying {chunk} in {delay:.1f}s after error: {exc}")
+            time.sleep(delay)
+
+
+def transcribe_chunks(
     chunks: Iterable[str],
     api_key: str,
     custom_prompt: str = "Here is the full text, in English:",
     model: str = DEFAULT_OPENAI_TRANSCRIBE_MODEL,
-) -> str:
-    """Transcribe one or more chunks with OpenAI's speech-to-text API."""
-    try:
-        from openai import OpenAI
-    except ModuleNotFoundError as exc:
-        raise ModuleNotFoundError(
-            "OpenAI transcription requires the 'openai' package"
-        ) from exc
+    max_concurrency: int = DEFAULT_STT_MAX_CONCURRENCY,
+    max_retries: int = 3,
+    retry_backoff: float = 1.0,
+    client=None,
+    on_result: Optional[Callable[[int, str], None]] = None,
+) -> List[str]:
+    """Transcribe chunks with OpenAI's speech-to-text API, one text per chunk.
+
+    Up to *max_concurrency* chunks are in flight at once. Rate limits (429)
+    and server errors (5xx) are retried with exponential backoff. Every
+    successful chunk is passed to *on_result*, in chunk order and as soon as
+    the chunks before it are done, before the first failure, if any, is
+    re-raised, so completed work isn't lost.
+    """
+    if client is None:
+        try:
+            from openai import OpenAI
+        except ModuleNotFoundError as exc:
+            raise ModuleNotFoundError(
+                "OpenAI transcription requires the 'openai' package"
+            ) from exc
+
+        # Retries are handled per chunk below.
+        client = OpenAI(api_key=api_key, max_retries=0)
+
+    futures: list = []
+    transcriptions: List[str] = []
+    first_error: Optional[Exception] = None
+    collected = 0
+
+    def collect(wait: bool) -> None:
+        # Hand finished chunks to on_result in chunk order. Without *wait*,
+        # stop at the first chunk that is still in flight.
+        nonlocal collected, first_error
+        while collected < len(futures) and (wait or futures[collected].done()):
+            index = collected
+            collected += 1
+            try:
+                text = futures[index].result()
+            except Exception as exc:
+                first_error = first_error or exc
+                continue
+            transcriptions.append(text)
+            if on_result is not None:
+                on_result(index, text)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+        # Chunks may still be being cut: pass on finished transcripts
+        # between chunks rather than only once all have been submitted.
+        for chunk in chunks:
+            futures.append(executor.submit(
+                _transcribe_chunk, client, chunk, custom_prompt, model, max_retries, retry_backoff
+            ))
+            collect(wait=False)
+        collect(wait=True)
+
+    if first_error is not None:
+        raise first_error
+    return transcriptions
 
-    client = OpenAI(api_key=api_key)
-    transcriptions = []
-
-    for chunk in chunks:
-        print(f"Transcribing {chunk}")
-        with open(chunk, "rb") as audio_file:
-            response = client.audio.transcriptions.create(
-                model=model,
-                file=audio_file,
-                prompt=custom_prompt,
-            )
-        transcriptions.append(response.text)
 
+def whisper_api_transcribe(
+    chunks: Iterable[str],
+    api_key: str,
+    custom_prompt: str = "Here is the full text, in English:",
+    model: str = DEFAULT_OPENAI_TRANSCRIBE_MODEL,
+    max_concurrency: int = DEFAULT_STT_MAX_CONCURRENCY,
+    max_retries: int = 3,
+    retry_backoff: float = 1.0,
+    client=None,
+) -> str:
+    """Transcribe one or more chunks with OpenAI's speech-to-text API.
+
+    Transcripts are joined in chunk order regardless of completion order.
+    """
+    transcriptions = transcribe_chunks(
+        chunks,
+        api_key,
+        custom_prompt=custom_prompt,
+        model=model,
+        max_concurrency=max_concurrency,
+        max_retries=max_retries,
+        retry_backoff=retry_backoff,
+        client=client,
+    )
     return " ".join(transcriptions).strip()
 
 
@@ -97,11 +502,237 @@ def transcribe_audio(
     custom_prompt: str = "Here is the full text, in English:",
     cache_dir: str = "./cache",
     model: str = DEFAULT_OPENAI_TRANSCRIBE_MODEL,
+    max_concurrency: int = DEFAULT_STT_MAX_CONCURRENCY,
+    encode_workers: int = DEFAULT_CHUNK_ENCODE_WORKERS,
+    chunk_length_ms: int = DEFAULT_CHUNK_LENGTH_MS,
+    max_upload_mb: float = DEFAULT_MAX_UPLOAD_MB,
+    silence_search_ms: int = DEFAULT_SILENCE_SEARCH_MS,
+    transcript_cache: Optional[TranscriptCache] = None,
+    audio_hash: Optional[str] = None,
+    client=None,
+    on_chunk: Optional[Callable[[int, str], None]] = None,
+    audio_format: AudioFormat = MP3_CHUNK_FORMAT,
 ) -> str:
-    """Transcribe audio and transparently chunk files over OpenAI's size limit."""
-    file_size_mb = os.path.getsize(file_path) / (1024 * 1024)
-    chunks = split_audio(file_path, cache_dir=cache_dir) if file_size_mb > 25 else [file_path]
-    return whisper_api_transcribe(chunks, api_key, custom_prompt=custom_prompt, model=model)
+    """Transcribe audio, chunking files that are too large or too long.
+
+    Files over *max_upload_mb* or longer than *chunk_length_ms* are cut at
+    pauses into chunks that fit both budgets. Chunks are streamed into the
+    transcription pool as they are cut, so the first request goes out before
+    the whole file has been split. With a *transcript_cache*, chunks that were
+    already transcribed are neither cut nor sent again, and chunk files are
+    removed once transcribed. Chunks are encoded as *audio_format*.
+
+    *on_chunk* is called with each chunk's index and text, in order, as soon
+    as that chunk and all chunks before it are transcribed.
+    """
+    max_upload_bytes = int(max_upload_mb * 1024 * 1024)
+    plan = plan_chunks(
+        file_path,
+        max_chunk_ms=chunk_length_ms,
+        max_chunk_bytes=max_upload_bytes,
+        bitrate_kbps=audio_format.bitrate_kbps,
+        silence_search_ms=silence_search_ms,
+    )
+    if len(plan.spans) == 1 and os.path.getsize(file_path) <= max_upload_bytes:
+        text = whisper_api_transcribe(
+            [file_path],
+            api_key,
+            custom_prompt=custom_prompt,
+            model=model,
+            max_concurrency=max_concurrency,
+            client=client,
+        )
+        if on_chunk is not None:
+            on_chunk(0, text)
+        return text
+
+    print(plan.summary())
+    texts: List[Optional[str]] = [None] * len(plan.spans)
+    chunk_keys: List[str] = []
+    if transcript_cache is not None:
+        audio_hash = audio_hash or hash_file(file_path)
+        chunk_keys = [
+            cache_key(audio_hash, "openai", model, custom_prompt, start, end)
+            for start, end in plan.spans
+        ]
+        texts = [transcript_cache.get(key) for key in chunk_keys]
+        metrics.count("transcript_cache.chunk_hits", sum(text is not None for text in texts))
+
+    emitted = 0
+
+    def emit_ready() -> None:
+        nonlocal emitted
+        while emitted < len(texts) and texts[emitted] is not None:
+            if on_chunk is not None:
+                on_chunk(emitted, texts[emitted])
+            emitted += 1
+
+    emit_ready()
+
+    missing = [i for i, text in enumerate(texts) if text is None]
+    if missing:
+        print(f"Transcribing {len(missing)} of {len(plan.spans)} chunk(s)")
+        missing_plan = replace(plan, spans=[plan.spans[i] for i in missing], nominal_cuts=[])
+        chunk_paths: List[str] = []
+
+        def tracked_chunks() -> Iterator[str]:
+            for chunk in iter_audio_chunks(
+                file_path, cache_dir=cache_dir, encode_workers=encode_workers, plan=missing_plan, audio_format=audio_format
+            ):
+                chunk_paths.append(chunk)
+                yield chunk
+
+        def store_result(index: int, text: str) -> None:
+            texts[missing[index]] = text
+            if transcript_cache is not None:
+                transcript_cache.put(chunk_keys[missing[index]], text)
+            emit_ready()
+
+        try:
+            transcribe_chunks(
+                tracked_chunks(),
+                api_key,
+                custom_prompt=custom_prompt,
+                model=model,
+                max_concurrency=max_concurrency,
+                client=client,
+                on_result=store_result,
+            )
+        finally:
+            if transcript_cache is not None:
+                for chunk in chunk_paths:
+                    Path(chunk).unlink(missing_ok=True)
+
+    return " ".join(texts).strip()
+
+
+@dataclass
+class TranscriptionContext:
+    """The loaded config, clients and bot shared by every recording handled.
+
+    Build one per process with :meth:`from_bot` (or :meth:`from_config_file`)
+    and pass it to :func:`handle_audio`, so a recording doesn't re-read the
+    config or rebuild the bot. Without a *bot*, one is built the first time
+    a transcript contains a prompt, and then reused.
+    """
+
+    config: dict
+    config_file: str = "config.yaml"
+    bot: Optional[EphemerEar] = None
+    clients: Optional[ClientRegistry] = None
+    trigger_matcher: Optional[TriggerMatcher] = None
+    _owns_bot: bool = field(default=False, repr=False)
+    _owns_clients: bool = field(default=False, repr=False)
+    _transcript_caches: Dict[str, TranscriptCache] = field(default_factory=dict, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.clients is None and self.bot is not None:
+            self.clients = self.bot.clients
+        if self.trigger_matcher is None:
+            self.trigger_matcher = TriggerMatcher.from_config(self.config)
+        metrics.configure(self.config)
+
+    @classmethod
+    def from_bot(cls, bot: EphemerEar, config_file: Optional[str] = None) -> "TranscriptionContext":
+        return cls(config=bot.config, config_file=config_file or str(bot.config_path), bot=bot)
+
+    @classmethod
+    def from_config_file(cls, config_file: str = "config.yaml") -> "TranscriptionContext":
+        config = EphemerEar.load_yaml_to_dict(config_file)
+        return cls(config=config, config_file=config_file, clients=ClientRegistry.from_config(config), _owns_clients=True)
+
+    def get_bot(self) -> EphemerEar:
+        """Return the bot, building it from the loaded config on first use."""
+        with self._lock:
+            if self.bot is None:
+                self.bot = EphemerEar(self.config_file, config=self.config, clients=self.clients)
+                self.clients = self.bot.clients
+                self._owns_bot = True
+            return self.bot
+
+    def transcription_client(self):
+        return self.clients.transcription_client() if self.clients is not None else None
+
+    def transcript_cache(self, cache_dir: str) -> Optional[TranscriptCache]:
+        """Return the transcript cache under *cache_dir*, or None when disabled."""
+        bot_config = self.config.get("bot", {})
+        if not bot_config.get("transcript_cache", True):
+            return None
+        with self._lock:
+            cache = self._transcript_caches.get(cache_dir)
+            if cache is None:
+                cache = self._transcript_caches[cache_dir] = TranscriptCache(
+                    os.path.join(cache_dir, "transcripts"),
+                    max_bytes=int(bot_config.get("transcript_cache_max_mb", DEFAULT_TRANSCRIPT_CACHE_MB) * 1024 * 1024),
+                    max_age_days=bot_config.get("transcript_cache_max_days", DEFAULT_TRANSCRIPT_CACHE_DAYS),
+                )
+            return cache
+
+    def close(self) -> None:
+        """Close the bot and clients this context created."""
+        if self._owns_bot and self.bot is not None:
+            self.bot.close()
+        if self._owns_clients and self.clients is not None:
+            self.clients.close()
+
+
+class TranscriptStream:
+    """Takes a recording's chunk transcripts in order as they are transcribed.
+
+    Each chunk is appended to *partial_path* as it arrives, so progress can
+    be followed while a long recording is still being transcribed. The first
+    chunk is checked for a trigger word; when it has one, the prompt (the
+    rest of that chunk) is sent to the context's bot on a background thread
+    while the remaining chunks are transcribed.
+    """
+
+    def __init__(self, partial_path: str, context: TranscriptionContext, dispatch_prompt: bool = True) -> None:
+        self.partial_path = partial_path
+        self.context = context
+        self.dispatch_prompt = dispatch_prompt
+        self.chunks: List[str] = []
+        self.prompt: Optional[str] = None
+        self._prompt_thread: Optional[threading.Thread] = None
+        self._prompt_error: Optional[BaseException] = None
+
+    @property
+    def dispatched(self) -> bool:
+        return self.prompt is not None
+
+    def __call__(self, index: int, text: str) -> None:
+        with open(self.partial_path, "w" if index == 0 else "a", encoding="utf-8") as partial_file:
+            partial_file.write(text.strip() if index == 0 else " " + text)
+        self.chunks.append(text)
+        if index == 0 and self.dispatch_prompt:
+            self._dispatch(text)
+
+    def _dispatch(self, text: str) -> None:
+        trigger = self.context.trigger_matcher.search(text)
+        if trigger is None:
+            return
+        print(f"Transcript contains prompt (trigger '{trigger.word}'); sending it while the rest is transcribed")
+        self.prompt = trigger.prompt(text)
+
+        def run():
+            try:
+                with metrics.span("transcript.prompt", early=True):
+                    self.context.get_bot().gpt_chat(self.prompt)
+            except BaseException as exc:
+                self._prompt_error = exc
+
+        self._prompt_thread = threading.Thread(target=run, name="ephemerear-prompt", daemon=True)
+        self._prompt_thread.start()
+
+    def wait(self, raise_errors: bool = True) -> None:
+        """Wait for the prompt sent early, if any, and re-raise its error."""
+        if self._prompt_thread is not None:
+            self._prompt_thread.join()
+        if raise_errors and self._prompt_error is not None:
+            raise self._prompt_error
+
+    def discard(self) -> None:
+        Path(self.partial_path).unlink(missing_ok=True)
 
 
 def handle_audio(
@@ -111,13 +742,41 @@ def handle_audio(
     transcript_output_dir: str,
     cache_dir: str = "./cache",
     config_file: str = "config.yaml",
+    config: Optional[dict] = None,
+    client=None,
+    context: Optional[TranscriptionContext] = None,
 ) -> None:
-    """Transcribe an audio file and persist the transcript to markdown."""
-    with open(config_file, "r", encoding="utf-8") as file:
-        config = yaml.safe_load(file)
+    """Transcribe an audio file and persist the transcript to markdown.
+
+    Pass the process's :class:`TranscriptionContext` so the config, clients,
+    transcript cache and bot are reused. Without one, *config* (or
+    *config_file*) and *client* are used as before.
+    """
+    if context is None:
+        if config is None:
+            config = EphemerEar.load_yaml_to_dict(config_file)
+        context = TranscriptionContext(config=config, config_file=config_file)
+    config = context.config
+    if client is None:
+        client = context.transcription_client()
 
     stt_engine = config.get("bot", {}).get("stt_engine", "openai")
     openai_model = config.get("bot", {}).get("stt_model", DEFAULT_OPENAI_TRANSCRIBE_MODEL)
+    max_concurrency = config.get("bot", {}).get("stt_max_concurrency", DEFAULT_STT_MAX_CONCURRENCY)
+    encode_workers = config.get("bot", {}).get("chunk_encode_workers", DEFAULT_CHUNK_ENCODE_WORKERS)
+    chunk_minutes = config.get("bot", {}).get("stt_chunk_minutes", DEFAULT_CHUNK_LENGTH_MS / 60000)
+    max_upload_mb = config.get("bot", {}).get("stt_max_upload_mb", DEFAULT_MAX_UPLOAD_MB)
+    silence_search_seconds = config.get("bot", {}).get("stt_silence_search_seconds", DEFAULT_SILENCE_SEARCH_MS / 1000)
+    whisper_model = config.get("bot", {}).get("local_whisper_model", "base")
+    whisper_socket = config.get("bot", {}).get("whisper_socket")
+    # Preprocessing only shrinks what is uploaded, so it applies to the API.
+    preprocess = stt_engine == "openai" and config.get("bot", {}).get("stt_preprocess", False)
+    preprocess_codec = config.get("bot", {}).get("stt_preprocess_codec", "opus")
+    preprocess_bitrate = config.get("bot", {}).get("stt_preprocess_bitrate_kbps", 24)
+    trim_silence = config.get("bot", {}).get("stt_trim_silence", True)
+    min_silence_seconds = config.get("bot", {}).get("stt_min_silence_seconds", 1.0)
+
+    transcript_cache = context.transcript_cache(cache_dir)
 
     audio_filename = os.path.basename(audio_filepath)
     simplified_filename = audio_filename.split("-")[0]
@@ -133,29 +792,108 @@ def handle_audio(
         print(f"Skipping duplicate file: {audio_filename}")
         return
 
-    if stt_engine == "whisper":
-        whisper_model = config.get("bot", {}).get("local_whisper_model", "base")
-        transcription_result = whisper_local_transcribe(
-            audio_filepath,
-            model=whisper_model,
-            custom_prompt=custom_prompt,
+    with metrics.span("handle_audio", file=audio_filename):
+        stream = TranscriptStream(
+            os.path.join(year_month_path, f"{simplified_filename}.partial.md"),
+            context,
+            dispatch_prompt=config.get("bot", {}).get("early_prompt_dispatch", True),
         )
-    else:
-        transcription_result = transcribe_audio(
-            audio_filepath,
-            api_key,
-            custom_prompt=custom_prompt,
-            cache_dir=cache_dir,
-            model=openai_model,
+        audio_hash = None
+        transcription_result = None
+        if transcript_cache is not None:
+            audio_hash = hash_file(audio_filepath)
+            if preprocess:
+                # Preprocessed audio gets transcripts of its own.
+                audio_hash = cache_key(
+                    audio_hash, "preprocess", preprocess_codec, preprocess_bitrate, trim_silence, min_silence_seconds
+                )
+            stt_model = whisper_model if stt_engine == "whisper" else openai_model
+            file_key = cache_key(audio_hash, stt_engine, stt_model, custom_prompt)
+            transcription_result = transcript_cache.get(file_key)
+            if transcription_result is not None:
+                print(f"Reusing cached transcript for {audio_filename}")
+            metrics.count("transcript_cache.hits" if transcription_result is not None else "transcript_cache.misses")
+
+        if transcription_result is None:
+            metrics.count("audio.input_bytes", os.path.getsize(audio_filepath))
+            with metrics.span("stt.transcribe", engine=stt_engine):
+                if stt_engine == "whisper":
+                    transcription_result = whisper_local_transcribe(
+                        audio_filepath,
+                        model=whisper_model,
+                        custom_prompt=custom_prompt,
+                        socket_path=whisper_socket,
+                    )
+                else:
+                    upload_path = audio_filepath
+                    chunk_format = MP3_CHUNK_FORMAT
+                    if preprocess:
+                        from .preprocess import SPEECH_SAMPLE_RATE, preprocess_audio
+
+                        preprocessed = preprocess_audio(
+                            audio_filepath,
+                            os.path.join(cache_dir, "preprocessed"),
+                            audio_format=AudioFormat(preprocess_codec, preprocess_bitrate, SPEECH_SAMPLE_RATE, 1),
+                            trim_silence=trim_silence,
+                            min_silence_ms=int(min_silence_seconds * 1000),
+                            chunk_length_ms=int(chunk_minutes * 60 * 1000),
+                        )
+                        print(preprocessed.summary())
+                        upload_path = preprocessed.output_path
+                        chunk_format = preprocessed.audio_format
+                    transcribe_start = time.perf_counter()
+                    try:
+                        transcription_result = transcribe_audio(
+                            upload_path,
+                            api_key,
+                            custom_prompt=custom_prompt,
+                            cache_dir=cache_dir,
+                            model=openai_model,
+                            max_concurrency=max_concurrency,
+                            encode_workers=encode_workers,
+                            chunk_length_ms=int(chunk_minutes * 60 * 1000),
+                            max_upload_mb=max_upload_mb,
+                            silence_search_ms=int(silence_search_seconds * 1000),
+                            transcript_cache=transcript_cache,
+                            audio_hash=audio_hash,
+                            client=client,
+                            on_chunk=stream,
+                            audio_format=chunk_format,
+                        )
+                    except BaseException:
+                        # Let a prompt that was already sent finish.
+                        stream.wait(raise_errors=False)
+                        raise
+                    finally:
+                        if preprocess:
+                            Path(preprocessed.output_path).unlink(missing_ok=True)
+                            Path(preprocessed.timemap_path).unlink(missing_ok=True)
+                    if preprocess:
+                        print(
+                            f"Transcribed {preprocessed.output_ms / 1000:.1f}s of audio in "
+                            f"{time.perf_counter() - transcribe_start:.2f}s "
+                            f"({(preprocessed.input_ms - preprocessed.output_ms) / 1000:.1f}s of silence skipped, "
+                            f"{preprocessed.saved_bytes / 1e6:.2f} MB less uploaded)"
+                        )
+            if transcript_cache is not None:
+                transcript_cache.put(file_key, transcription_result)
+                transcript_cache.evict()
+
+        if transcript_cache is not None:
+            print(f"Transcript cache: {transcript_cache.stats()}")
+
+        handle_transcript(
+            transcription_result,
+            transcript_output_dir,
+            simplified_filename,
+            config_file=context.config_file,
+            context=context,
+            dispatch_prompt=not stream.dispatched,
         )
-
-    handle_transcript(
-        transcription_result,
-        transcript_output_dir,
-        simplified_filename,
-        config_file=config_file,
-    )
+        stream.discard()
+        stream.wait()
     print(f"Processed and handled file: {audio_filename}")
+    metrics.flush()
 
 
 def handle_transcript(
@@ -164,47 +902,96 @@ def handle_transcript(
     simplified_filename: str,
     year_month_folders: bool = True,
     config_file: str = "config.yaml",
+    trigger_matcher: Optional[TriggerMatcher] = None,
+    context: Optional[TranscriptionContext] = None,
+    dispatch_prompt: bool = True,
 ) -> str:
-    """Write transcript text to markdown and optionally trigger GPT follow-up."""
+    """Write transcript text to markdown and optionally trigger GPT follow-up.
+
+    The follow-up runs when *trigger_matcher* (by default the context's, or
+    the ``prompt``/``from``/``prom`` triggers) finds a trigger word near the
+    start of the transcript. Everything after the trigger word is the prompt.
+    It is sent to the *context*'s bot, or to a bot built from *config_file*.
+    Pass ``dispatch_prompt=False`` when the prompt has already been sent.
+    """
     if year_month_folders:
         now = datetime.now()
         transcript_output_dir = os.path.join(transcript_output_dir, now.strftime("%Y"), now.strftime("%m"))
         os.makedirs(transcript_output_dir, exist_ok=True)
 
     transcript_path = os.path.join(transcript_output_dir, f"{simplified_filename}.md")
-    with open(transcript_path, "w", encoding="utf-8") as transcript_file:
-        transcript_file.write(transcript_text)
+    with metrics.span("transcript.write"):
+        atomic_write_text(transcript_path, transcript_text)
 
     print(f"Transcript written to {transcript_path}")
 
-    if testforword(transcript_text, "prompt|from|prom"):
-        print("Transcript contains prompt")
-        prompt = transcript_text.lower().split("prompt", 1)[1]
-        prompt = prompt.replace(".", "").replace(",", "").strip()
-        ee = EphemerEar(config_file)
-        ee.gpt_chat(prompt)
+    if not dispatch_prompt:
+        return transcript_text
+
+    if trigger_matcher is None:
+        trigger_matcher = context.trigger_matcher if context is not None else cached_matcher(DEFAULT_TRIGGER_WORDS)
+    trigger = trigger_matcher.search(transcript_text)
+    if trigger is not None:
+        print(f"Transcript contains prompt (trigger '{trigger.word}')")
+        prompt = trigger.prompt(transcript_text)
+        with metrics.span("transcript.prompt"):
+            ee = context.get_bot() if context is not None else EphemerEar(config_file)
+            ee.gpt_chat(prompt)
 
     return transcript_text
 
 
 def _build_arg_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Transcribe an audio file with EphemerEar")
-    parser.add_argument("audio_file", help="Path to the recording to transcribe")
+    parser.add_argument(
+        "audio_file",
+        nargs="+",
+        help="Path to the recording to transcribe (with --batch/--watch: files, directories or globs)",
+    )
     parser.add_argument("--config", default="config.yaml", help="Path to config YAML")
     parser.add_argument("--prompt", default="", help="Optional transcription prompt")
+    parser.add_argument("--batch", action="store_true", help="Queue every recording found and process them in a worker pool")
+    parser.add_argument("--watch", action="store_true", help="Like --batch, then keep polling for new recordings")
+    parser.add_argument("--interval", type=float, default=30.0, help="Seconds between polls in --watch mode")
+    parser.add_argument("--workers", type=int, default=None, help="Files processed in parallel (default: bot.batch_workers or 2)")
+    parser.add_argument(
+        "--max-attempts",
+        type=int,
+        default=None,
+        help=f"Failures before a file is skipped until it changes (default: bot.batch_max_attempts or {DEFAULT_MAX_ATTEMPTS})",
+    )
+    parser.add_argument("--manifest", default=None, help="Batch manifest path (default: <bot.cache>/batch-manifest.json)")
     return parser
 
 
 def main() -> None:
     args = _build_arg_parser().parse_args()
     ee = EphemerEar(args.config)
-    handle_audio(
-        audio_filepath=args.audio_file,
-        api_key=ee.api_key,
-        custom_prompt=args.prompt,
-        transcript_output_dir=ee.config["stores"]["transcripts"],
-        cache_dir=ee.config["bot"]["cache"],
-        config_file=args.config,
+    context = TranscriptionContext.from_bot(ee, args.config)
+
+    def process(audio_filepath: str) -> None:
+        handle_audio(
+            audio_filepath=audio_filepath,
+            api_key=ee.api_key,
+            custom_prompt=args.prompt,
+            transcript_output_dir=ee.config["stores"]["transcripts"],
+            cache_dir=ee.config["bot"]["cache"],
+            context=context,
+        )
+
+    if not (args.batch or args.watch):
+        for audio_filepath in args.audio_file:
+            process(audio_filepath)
+        return
+
+    run_batch(
+        args.audio_file,
+        process,
+        manifest_path=args.manifest or os.path.join(ee.config["bot"]["cache"], "batch-manifest.json"),
+        workers=args.workers or ee.config["bot"].get("batch_workers", 2),
+        watch=args.watch,
+        interval=args.interval,
+        max_attempts=args.max_attempts or ee.config["bot"].get("batch_max_attempts", DEFAULT_MAX_ATTEMPTS),
     )
 
 
@@ -0,0 +1,84 @@
+"""Detect spoken trigger words at the start of a transcript.
+
+A recording is treated as a request to the bot when one of the first few
+words starts with a trigger word ("Prompt: remind me to ..."). Transcripts
+can run to hours, so :class:`TriggerMatcher` only tokenises the prefix it
+needs, with patterns compiled once, and reports where the prompt starts
+rather than copying or lowercasing the whole text.
+"""
+
+from __future__ import annotations
+
+import functools
+import re
+from dataclasses import dataclass
+from typing import Iterable, Optional, Tuple
+
+DEFAULT_TRIGGER_WORDS = ("prompt", "from", "prom")
+DEFAULT_TRIGGER_SCAN_WORDS = 15
+
+TOKEN_PATTERN = re.compile(r"\S+")
+# Punctuation and spaces between the trigger word and the prompt itself.
+_PROMPT_LEAD = re.compile(r"[\s.,:;!?\-]*")
+
+
+@dataclass(frozen=True)
+class TriggerMatch:
+    """Where a trigger word and the prompt following it sit in a transcript."""
+
+    word: str
+    trigger_span: Tuple[int, int]
+    prompt_span: Tuple[int, int]
+
+    def prompt(self, text: str) -> str:
+        start, end = self.prompt_span
+        return text[start:end]
+
+
+class TriggerMatcher:
+    """Finds the first of the first *scan_words* words that starts with a trigger word."""
+
+    def __init__(self, words: Iterable[str] = DEFAULT_TRIGGER_WORDS, scan_words: int = DEFAULT_TRIGGER_SCAN_WORDS) -> None:
+        self.words = tuple(words)
+        self.scan_words = scan_words
+        # Longest first, so "prompt" is reported rather than "prom".
+        alternatives = sorted(self.words, key=len, reverse=True)
+        self._pattern = re.compile("|".join(re.escape(word) for word in alternatives), re.IGNORECASE)
+
+    @classmethod
+    def from_config(cls, config: dict) -> "TriggerMatcher":
+        bot_config = config.get('bot', {})
+        return cached_matcher(
+            tuple(bot_config.get('trigger_words', DEFAULT_TRIGGER_WORDS)),
+            bot_config.get('trigger_scan_words', DEFAULT_TRIGGER_SCAN_WORDS),
+        )
+
+    def search(self, text: Optional[str]) -> Optional[TriggerMatch]:
+        """Return the first trigger in *text*, or None.
+
+        Only the first ``scan_words`` words are looked at, so the cost doesn't
+        depend on the length of *text*.
+        """
+        if not text or not self.words:
+            return None
+        for token, _ in zip(TOKEN_PATTERN.finditer(text), range(self.scan_words)):
+            match = self._pattern.match(text, token.start(), token.end())
+            if match is None:
+                continue
+            prompt_start = _PROMPT_LEAD.match(text, token.end()).end()
+            # Trim trailing whitespace without copying the text.
+            prompt_end = len(text)
+            while prompt_end > prompt_start and text[prompt_end - 1].isspace():
+                prompt_end -= 1
+            return TriggerMatch(
+                word=match.group(0).lower(),
+                trigger_span=(token.start(), token.end()),
+                prompt_span=(prompt_start, prompt_end),
+            )
+        return None
+
+
+@functools.lru_cache(maxsize=32)
+def cached_matcher(words: Tuple[str, ...], scan_words: int = DEFAULT_TRIGGER_SCAN_WORDS) -> TriggerMatcher:
+    """Return a shared matcher for *words*, compiled once per process."""
+    return TriggerMatcher(words, scan_words)
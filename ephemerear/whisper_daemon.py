@@ -0,0 +1,168 @@
+"""Long-lived local whisper worker and its client.
+
+Loading a whisper model usually takes longer than transcribing a short voice
+memo, so instead of loading it in every process a daemon keeps models warm
+and accepts jobs over a Unix socket:
+
+python -m ephemerear.whisper_daemon --preload base
+
+``whisper_local_transcribe`` submits jobs to the daemon when it is running
+and otherwise transcribes in-process, where models are also cached for the
+lifetime of the process.
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import json
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+from typing import Callable
+
+# Unix sockets (and os.getuid) are missing on some platforms, e.g. Windows.
+# There the daemon can't run and clients always transcribe in-process.
+_HAS_UNIX_SOCKETS = hasattr(socket, "AF_UNIX") and hasattr(socketserver, "ThreadingUnixStreamServer")
+_ServerBase = socketserver.ThreadingUnixStreamServer if _HAS_UNIX_SOCKETS else socketserver.BaseServer
+_USER = str(os.getuid()) if hasattr(os, "getuid") else os.environ.get("USERNAME", "user")
+
+DEFAULT_SOCKET_PATH = os.path.join(tempfile.gettempdir(), f"ephemerear-whisper-{_USER}.sock")
+
+
+class DaemonUnavailable(ConnectionError):
+    """Raised when no whisper daemon is listening on the socket."""
+
+
+@functools.lru_cache(maxsize=None)
+def load_model(model: str):
+    """Load (once per process) and return the whisper model called *model*."""
+    try:
+        import whisper
+    except ModuleNotFoundError as exc:
+        raise ModuleNotFoundError(
+            "Local whisper transcription requires the 'openai-whisper' package"
+        ) from exc
+
+    return whisper.load_model(model)
+
+
+def transcribe_in_process(file_path: str, model: str, custom_prompt: str) -> str:
+    """Transcribe *file_path* with a cached model in the current process."""
+    result = load_model(model).transcribe(file_path, language="en", initial_prompt=custom_prompt)
+    return result["text"]
+
+
+class _JobHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        try:
+            job = json.loads(self.rfile.readline())
+            # Whisper models aren't safe to share between threads, so jobs
+            # are accepted concurrently but run one at a time.
+            with self.server.lock:
+                text = self.server.transcribe(job["file_path"], job["model"], job.get("prompt", ""))
+            reply = {"text": text}
+        except Exception as exc:
+            reply = {"error": f"{type(exc).__name__}: {exc}"}
+        self.wfile.write((json.dumps(reply) + "\n").encode("utf-8"))
+
+
+class WhisperDaemon(_ServerBase):
+    """Unix socket server that runs whisper jobs against warm models."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        socket_path: str = DEFAULT_SOCKET_PATH,
+        transcribe: Callable[[str, str, str], str] = transcribe_in_process,
+    ) -> None:
+        if not _HAS_UNIX_SOCKETS:
+            raise OSError("The whisper daemon needs Unix sockets, which this platform doesn't support")
+        if os.path.exists(socket_path):
+            if is_daemon_running(socket_path):
+                raise RuntimeError(f"A whisper daemon is already listening on {socket_path}")
+            os.unlink(socket_path)
+        self.socket_path = socket_path
+        self.transcribe = transcribe
+        self.lock = threading.Lock()
+        super().__init__(socket_path, _JobHandler)
+
+    def server_close(self) -> None:
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+def is_daemon_running(socket_path: str = DEFAULT_SOCKET_PATH) -> bool:
+    """Return True if something accepts connections on *socket_path*."""
+    if not _HAS_UNIX_SOCKETS:
+        return False
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(1)
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            return False
+    return True
+
+
+def submit_job(
+    file_path: str,
+    model: str = "base",
+    custom_prompt: str = "",
+    socket_path: str = DEFAULT_SOCKET_PATH,
+    connect_timeout: float = 2.0,
+) -> str:
+    """Transcribe *file_path* on the daemon and return the text.
+
+    Raises :class:`DaemonUnavailable` if the daemon can't be reached or
+    closes the connection without replying, and ``RuntimeError`` if the
+    daemon reports that the job failed.
+    """
+    if not _HAS_UNIX_SOCKETS:
+        raise DaemonUnavailable("Unix sockets aren't supported on this platform")
+    job = {"file_path": os.path.abspath(file_path), "model": model, "prompt": custom_prompt}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(connect_timeout)
+        try:
+            sock.connect(socket_path)
+        except OSError as exc:
+            raise DaemonUnavailable(f"No whisper daemon on {socket_path}") from exc
+        # Transcription can take minutes, so only the connect is bounded.
+        sock.settimeout(None)
+        try:
+            sock.sendall((json.dumps(job) + "\n").encode("utf-8"))
+            with sock.makefile("r", encoding="utf-8") as reply_file:
+                reply = json.loads(reply_file.readline())
+        except (OSError, ValueError) as exc:
+            # The daemon went away (or was killed) while holding the job.
+            raise DaemonUnavailable(f"Whisper daemon on {socket_path} dropped the job") from exc
+
+    if "error" in reply:
+        raise RuntimeError(f"Whisper daemon failed to transcribe {file_path}: {reply['error']}")
+    return reply["text"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a warm local whisper transcription daemon")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="Unix socket to listen on")
+    parser.add_argument("--preload", nargs="*", default=[], help="Models to load before accepting jobs")
+    args = parser.parse_args()
+
+    for model in args.preload:
+        print(f"Loading whisper model {model}")
+        load_model(model)
+
+    with WhisperDaemon(args.socket) as server:
+        print(f"Whisper daemon listening on {args.socket}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
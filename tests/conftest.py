@@ -0,0 +1,42 @@
+import importlib
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+
+@pytest.fixture
+def bot_config(tmp_path, monkeypatch):
+    """Write a config whose files and stores all live under ``tmp_path``.
+
+    Token counting is replaced with a whitespace count so tests don't need
+    the tiktoken encoding files.
+    """
+    ee_module = importlib.import_module("ephemerear.EphemerEar")
+    monkeypatch.setattr(ee_module, "count_tokens", lambda text, encoding_name="p50k_base": len(text.split()))
+
+    bot_dir = tmp_path / "bot"
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(f"""
+bot:
+  name: TestBot
+  model: gpt-4o-mini
+  cache: {bot_dir}/cache/
+  history_file: {bot_dir}/memory/history.json
+  history_backend: jsonl
+  system_prompt: {bot_dir}/persona/system.md
+  use_pushover: false
+  max_message_window: 2000
+user:
+  name: TestUser
+  user_details: {bot_dir}/user/user_details.txt
+auth_tokens:
+  openai: test-openai-token
+stores:
+  responses: {bot_dir}/output/responses/
+  transcripts: {bot_dir}/output/transcripts/
+""")
+    return str(config_path)
@@ -0,0 +1,92 @@
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+from ephemerear.batch import DONE, FAILED, PENDING, WorkManifest, discover_audio_files, run_batch, run_queue
+
+
+def make_recordings(directory, names):
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for name in names:
+        path = directory / name
+        path.write_bytes(name.encode())
+        paths.append(str(path))
+    return paths
+
+
+def test_discover_expands_directories_and_globs(tmp_path):
+    make_recordings(tmp_path / "a", ["one.m4a", "notes.txt"])
+    make_recordings(tmp_path / "a" / "nested", ["two.MP3"])
+    make_recordings(tmp_path / "b", ["three.wav"])
+    found = discover_audio_files([str(tmp_path / "a"), str(tmp_path / "b" / "*.wav")])
+    assert [Path(f).name for f in found] == ["two.MP3", "one.m4a", "three.wav"]
+
+
+def test_manifest_requeues_interrupted_and_skips_done(tmp_path):
+    files = make_recordings(tmp_path / "rec", ["a.m4a", "b.m4a", "c.m4a"])
+    manifest_path = tmp_path / "manifest.json"
+    manifest = WorkManifest(str(manifest_path))
+    assert manifest.enqueue(files) == 3
+    manifest.mark(files[0], DONE)
+    manifest.mark(files[1], "running")
+
+    # Simulate a crash: a new process reloads the manifest from disk.
+    resumed = WorkManifest(str(manifest_path))
+    assert resumed.enqueue(files) == 0
+    assert resumed.pending() == files[1:]
+
+    os.utime(files[0], (time.time() - 100, time.time() - 100))
+    assert resumed.enqueue(files) == 1
+
+
+def test_run_queue_records_failures(tmp_path):
+    files = make_recordings(tmp_path / "rec", ["good.m4a", "bad.m4a"])
+    manifest = WorkManifest(str(tmp_path / "manifest.json"))
+    manifest.enqueue(files)
+
+    def process(file_path):
+        if file_path.endswith("bad.m4a"):
+            raise ValueError("corrupt audio")
+
+    assert run_queue(manifest, process, workers=2) == {DONE: 1, FAILED: 1}
+    saved = json.loads((tmp_path / "manifest.json").read_text())
+    assert saved[files[0]]["status"] == DONE
+    assert saved[files[1]]["error"] == "ValueError: corrupt audio"
+
+
+def test_run_batch_only_processes_new_files_on_rerun(tmp_path):
+    make_recordings(tmp_path / "rec", ["a.m4a", "b.m4a"])
+    processed = []
+    manifest_path = str(tmp_path / "manifest.json")
+    run_batch([str(tmp_path / "rec")], processed.append, manifest_path)
+    make_recordings(tmp_path / "rec", ["c.m4a"])
+    run_batch([str(tmp_path / "rec")], processed.append, manifest_path)
+    assert sorted(Path(p).name for p in processed) == ["a.m4a", "b.m4a", "c.m4a"]
+    assert PENDING not in {e["status"] for e in WorkManifest(manifest_path).entries.values()}
+
+
+def test_failed_files_are_retried_until_max_attempts(tmp_path):
+    (bad,) = make_recordings(tmp_path / "rec", ["bad.m4a"])
+    manifest = WorkManifest(str(tmp_path / "manifest.json"), max_attempts=2)
+    attempts = []
+
+    def process(file_path):
+        attempts.append(file_path)
+        raise ValueError("corrupt audio")
+
+    for _ in range(4):
+        manifest.enqueue([bad])
+        run_queue(manifest, process)
+    assert len(attempts) == 2
+    assert manifest.entries[bad]["attempts"] == 2
+
+    # Replacing the recording gives it a fresh set of attempts.
+    Path(bad).write_bytes(b"re-exported")
+    assert manifest.enqueue([bad]) == 1
+    assert "attempts" not in manifest.entries[bad]
@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+from ephemerear.cache import TranscriptCache, cache_key, hash_file
+
+
+def test_hash_file_depends_only_on_content(tmp_path):
+    first = tmp_path / "a.m4a"
+    second = tmp_path / "renamed.m4a"
+    first.write_bytes(b"same audio")
+    second.write_bytes(b"same audio")
+    assert hash_file(str(first)) == hash_file(str(second))
+
+
+def test_cache_key_changes_with_model_and_prompt():
+    base = cache_key("hash", "openai", "gpt-4o-mini-transcribe", "")
+    assert base == cache_key("hash", "openai", "gpt-4o-mini-transcribe", "")
+    assert base != cache_key("hash", "openai", "whisper-1", "")
+    assert base != cache_key("hash", "openai", "gpt-4o-mini-transcribe", "In English:")
+
+
+def test_get_and_put_track_hits_and_misses(tmp_path):
+    cache = TranscriptCache(tmp_path / "cache")
+    assert cache.get("abc123") is None
+    cache.put("abc123", "hello world")
+    assert cache.get("abc123") == "hello world"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+
+def test_evict_removes_expired_then_least_recently_used(tmp_path):
+    cache = TranscriptCache(tmp_path / "cache", max_bytes=10, max_age_days=1)
+    for key in ("aa01", "bb02", "cc03"):
+        cache.put(key, "x" * 5)
+    old = time.time() - 3 * 86400
+    os.utime(cache._path("aa01"), (old, old))
+    os.utime(cache._path("bb02"), (old + 86400 * 2.5, old + 86400 * 2.5))
+    cache.get("cc03")
+
+    assert cache.evict() == 1
+    assert cache.get("aa01") is None
+    assert cache.get("bb02") is not None
+
+    cache.put("dd04", "x" * 5)
+    os.utime(cache._path("bb02"), (time.time() - 60, time.time() - 60))
+    assert cache.evict() == 1
+    assert cache.get("bb02") is None
+    assert cache.get("dd04") == "x" * 5
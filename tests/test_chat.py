@@ -0,0 +1,119 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from ephemerear.EphemerEar import EphemerEar
+
+
+def completion(content):
+    message = SimpleNamespace(content=content, function_call=None)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class FakeAsyncOpenAI:
+    """Stand-in for ``AsyncOpenAI`` that answers after a fixed delay."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        await asyncio.sleep(self.latency)
+        return completion(f"echo: {kwargs['messages'][-1]['content']}")
+
+
+def test_agpt_chat_records_history_and_response(bot_config, monkeypatch):
+    ee = EphemerEar(bot_config)
+    fake = FakeAsyncOpenAI()
+    monkeypatch.setattr(ee.clients, "async_openai", lambda: fake)
+
+    reply = asyncio.run(ee.agpt_chat("hello there"))
+
+    assert reply == "echo: hello there"
+    assert [m["content"] for m in ee.get_history()] == ["hello there", "echo: hello there"]
+    assert fake.requests[0]["messages"][0]["role"] == "system"
+
+
+def test_agpt_chat_runs_conversations_concurrently(bot_config, monkeypatch):
+    ee = EphemerEar(bot_config)
+    monkeypatch.setattr(ee.clients, "async_openai", lambda: FakeAsyncOpenAI(latency=0.2))
+
+    async def chat_many():
+        return await asyncio.gather(*(
+            ee.agpt_chat(f"message {i}", conversation_id=f"user-{i}") for i in range(5)
+        ))
+
+    start = time.perf_counter()
+    replies = asyncio.run(chat_many())
+    elapsed = time.perf_counter() - start
+
+    assert replies == [f"echo: message {i}" for i in range(5)]
+    assert elapsed < 0.6
+    assert len(ee.get_history()) == 10
+    # Locks of finished conversations are not kept around.
+    assert not ee._conversation_locks
+
+
+def test_agpt_chat_serialises_turns_in_one_conversation(bot_config, monkeypatch):
+    ee = EphemerEar(bot_config)
+    fake = FakeAsyncOpenAI(latency=0.05)
+    monkeypatch.setattr(ee.clients, "async_openai", lambda: fake)
+
+    async def chat_twice():
+        await asyncio.gather(ee.agpt_chat("first"), ee.agpt_chat("second"))
+
+    asyncio.run(chat_twice())
+
+    # The second turn was prepared after the first was saved, so it sees it.
+    second_prompt = [m["content"] for m in fake.requests[1]["messages"]]
+    assert "echo: first" in second_prompt
+
+
+def chunk(content=None, function_name=None, function_arguments=None):
+    function_call = None
+    if function_name is not None or function_arguments is not None:
+        function_call = SimpleNamespace(name=function_name, arguments=function_arguments)
+    delta = SimpleNamespace(content=content, function_call=function_call)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+class FakeStreamingOpenAI:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        assert kwargs["stream"] is True
+        return iter(self.chunks)
+
+
+def test_gpt_chat_stream_yields_deltas_and_saves_at_end(bot_config, monkeypatch):
+    ee = EphemerEar(bot_config)
+    fake = FakeStreamingOpenAI([chunk("Hel"), chunk("lo"), chunk(" there")])
+    monkeypatch.setattr(ee.clients, "openai", lambda: fake)
+
+    stream = ee.gpt_chat_stream("hi")
+    assert next(stream) == "Hel"
+    assert ee.get_history() == []
+
+    assert list(stream) == ["lo", " there"]
+    assert [m["content"] for m in ee.get_history()] == ["hi", "Hello there"]
+
+
+def test_gpt_chat_stream_assembles_function_call_arguments(bot_config, monkeypatch):
+    ee = EphemerEar(bot_config)
+    calls = []
+    ee.available_functions["remember"] = lambda text: calls.append(text) or "stored"
+    fake = FakeStreamingOpenAI([
+        chunk(function_name="remember", function_arguments=""),
+        chunk(function_arguments='{"text": "buy '),
+        chunk(function_arguments='milk"}'),
+    ])
+    monkeypatch.setattr(ee.clients, "openai", lambda: fake)
+
+    assert list(ee.gpt_chat_stream("remember to buy milk")) == [
+        "Function 'remember' executed with response: stored"
+    ]
+    assert calls == ["buy milk"]
@@ -0,0 +1,84 @@
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+from ephemerear.clients import ClientRegistry
+
+
+class CountingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    connections = 0
+
+    def setup(self):
+        type(self).connections += 1
+        super().setup()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = b'{"status": 1}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    CountingHandler.connections = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CountingHandler)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_clients_are_created_once(monkeypatch):
+    registry = ClientRegistry("test-key", timeout=5, pool_size=3)
+    assert registry.openai() is registry.openai()
+    assert registry.transcription_client() is registry.transcription_client()
+    assert registry.transcription_client().max_retries == 0
+    assert registry.openai().timeout == 5
+    # Uploads keep the SDK's long timeout rather than the chat timeout.
+    assert registry.transcription_client().timeout.read == 600
+    assert ClientRegistry("test-key", timeout=5, stt_timeout=900).transcription_client().timeout == 900
+    session = registry.http_session()
+    assert session is registry.http_session()
+    assert session.get_adapter("https://api.pushover.net")._pool_maxsize == 3
+    registry.close()
+
+
+def test_transcription_client_can_be_created_first():
+    registry = ClientRegistry("test-key")
+    assert registry.transcription_client().max_retries == 0
+    assert registry.transcription_client().base_url == registry.openai().base_url
+    registry.close()
+
+
+def test_http_session_keeps_connections_alive(stub_server):
+    registry = ClientRegistry("test-key")
+    for _ in range(5):
+        registry.http_session().post(stub_server, data={"message": "hi"}).raise_for_status()
+    assert CountingHandler.connections == 1
+    registry.close()
+
+
+def test_from_config_reads_pool_settings():
+    config = {
+        "bot": {"http_timeout": 12, "http_pool_size": 4, "openai_base_url": "http://localhost:9999/v1"},
+        "auth_tokens": {"openai": "test-key"},
+    }
+    registry = ClientRegistry.from_config(config)
+    assert (registry.timeout, registry.pool_size) == (12, 4)
+    assert str(registry.openai().base_url).startswith("http://localhost:9999/v1")
@@ -0,0 +1,64 @@
+import os
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+from ephemerear.fileio import atomic_write_text, create_unique, file_lock
+
+
+def test_atomic_write_keeps_old_content_on_failure(tmp_path, monkeypatch):
+    path = tmp_path / "state.json"
+    atomic_write_text(path, "old")
+    os.chmod(path, 0o600)
+
+    def fail(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", fail)
+    with pytest.raises(OSError):
+        atomic_write_text(path, "new")
+    monkeypatch.undo()
+    assert path.read_text() == "old"
+    assert os.listdir(tmp_path) == ["state.json"]
+
+    atomic_write_text(path, "new")
+    assert path.read_text() == "new"
+    assert path.stat().st_mode & 0o777 == 0o600
+
+
+def test_create_unique_never_hands_out_a_name_twice(tmp_path):
+    paths = []
+
+    def claim():
+        paths.append(create_unique(tmp_path, "2026-10-18_at_09-00-00_response", ".md"))
+
+    threads = [threading.Thread(target=claim) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(paths)) == 20
+    assert tmp_path / "2026-10-18_at_09-00-00_response.md" in paths
+    assert tmp_path / "2026-10-18_at_09-00-00_response-2.md" in paths
+
+
+def test_file_lock_serialises_threads(tmp_path):
+    counter = tmp_path / "counter"
+    counter.write_text("0")
+
+    def increment():
+        for _ in range(50):
+            with file_lock(tmp_path / "counter.lock"):
+                counter.write_text(str(int(counter.read_text()) + 1))
+
+    threads = [threading.Thread(target=increment) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter.read_text() == "200"
@@ -0,0 +1,102 @@
+import json
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+from ephemerear.history import JSONHistoryStore, JSONLHistoryStore, open_history_store
+
+
+def make_messages(count, start=0):
+    return [{"role": "user", "content": f"message {i}", "tokens": 2} for i in range(start, start + count)]
+
+
+def test_jsonl_store_rotates_segments(tmp_path):
+    store = JSONLHistoryStore(tmp_path / "history", segment_size=3)
+    store.append(make_messages(4))
+    store.append(make_messages(3, start=4))
+    assert len(store.segments()) == 3
+    assert [m["content"] for m in store.read_all()] == [f"message {i}" for i in range(7)]
+
+
+def test_jsonl_tail_by_messages_and_tokens(tmp_path):
+    store = JSONLHistoryStore(tmp_path / "history", segment_size=4)
+    store.append(make_messages(10))
+    assert [m["content"] for m in store.tail(max_messages=3)] == ["message 7", "message 8", "message 9"]
+    tail = store.tail(max_tokens=9, token_counter=lambda m: m["tokens"])
+    assert [m["content"] for m in tail] == [f"message {i}" for i in range(6, 10)]
+
+
+def test_jsonl_store_reopens_at_last_segment(tmp_path):
+    JSONLHistoryStore(tmp_path / "history", segment_size=3).append(make_messages(2))
+    store = JSONLHistoryStore(tmp_path / "history", segment_size=3)
+    store.append(make_messages(2, start=2))
+    assert len(store.segments()) == 2
+    assert len(store.read_all()) == 4
+
+
+def test_open_history_store_migrates_legacy_json(tmp_path):
+    legacy = tmp_path / "history.json"
+    legacy.write_text(json.dumps([
+        {"role": "system", "content": "not persisted"},
+        {"role": "user", "content": "hello"},
+        {"role": "assistant", "content": "hi"},
+    ]))
+    store = open_history_store(legacy, backend="jsonl")
+    assert [m["content"] for m in store.read_all()] == ["hello", "hi"]
+    assert not legacy.exists()
+    assert (tmp_path / "history.json.migrated").exists()
+
+    # Re-opening doesn't migrate again.
+    reopened = open_history_store(legacy, backend="jsonl")
+    assert len(reopened.read_all()) == 2
+
+
+def test_json_store_append_keeps_existing_history(tmp_path):
+    store = JSONHistoryStore(tmp_path / "history.json")
+    store.append(make_messages(2))
+    store.append(make_messages(1, start=2))
+    assert len(json.loads((tmp_path / "history.json").read_text())) == 3
+
+
+def _append_from_process(backend, path, worker, count):
+    store = JSONHistoryStore(path) if backend == "json" else JSONLHistoryStore(path, segment_size=7)
+    for i in range(count):
+        store.append([{"role": "user", "content": f"worker {worker} message {i}"}])
+
+
+def test_concurrent_appends_from_processes_keep_every_message(tmp_path):
+    import multiprocessing
+
+    for backend, path in (("json", tmp_path / "history.json"), ("jsonl", tmp_path / "history")):
+        workers = [
+            multiprocessing.Process(target=_append_from_process, args=(backend, path, worker, 25))
+            for worker in range(4)
+        ]
+        for process in workers:
+            process.start()
+        for process in workers:
+            process.join()
+        store = JSONHistoryStore(path) if backend == "json" else JSONLHistoryStore(path, segment_size=7)
+        contents = [m["content"] for m in store.read_all()]
+        assert sorted(contents) == sorted(f"worker {w} message {i}" for w in range(4) for i in range(25))
+        assert store.count() == 100
+
+
+def test_jsonl_store_ignores_and_repairs_torn_last_line(tmp_path):
+    store = JSONLHistoryStore(tmp_path / "history", segment_size=10)
+    store.append(make_messages(2))
+    with store.segments()[-1].open("a", encoding="utf-8") as file:
+        file.write('{"role": "user", "content": "cut sh')
+    assert store.count() == 2
+    store.append(make_messages(1, start=2))
+    assert [m["content"] for m in store.read_all()] == ["message 0", "message 1", "message 2"]
+
+
+def test_jsonl_replace_drops_surplus_segments(tmp_path):
+    store = JSONLHistoryStore(tmp_path / "history", segment_size=2)
+    store.append(make_messages(5))
+    store.replace(make_messages(3, start=10))
+    assert len(store.segments()) == 2
+    assert [m["content"] for m in store.read_all()] == ["message 10", "message 11", "message 12"]
@@ -0,0 +1,60 @@
+import importlib
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+# ``ephemerear.EphemerEar`` is shadowed by the class of the same name once the
+# package is imported, so fetch the module itself explicitly.
+ee_module = importlib.import_module("ephemerear.EphemerEar")
+from ephemerear.EphemerEar import message_tokens, select_message_window
+
+
+def fake_count_tokens(text, encoding_name='p50k_base'):
+    return len(text.split())
+
+
+def test_message_tokens_caches_count_on_entry(monkeypatch):
+    calls = []
+
+    def counting(text, encoding_name='p50k_base'):
+        calls.append(text)
+        return fake_count_tokens(text)
+
+    monkeypatch.setattr(ee_module, "count_tokens", counting)
+    entry = {"role": "user", "content": "one two three"}
+    assert message_tokens(entry) == 3
+    assert message_tokens(entry) == 3
+    assert entry["tokens"] == 3
+    assert len(calls) == 1
+
+
+def test_select_message_window_keeps_newest_messages(monkeypatch):
+    monkeypatch.setattr(ee_module, "count_tokens", fake_count_tokens)
+    history = [
+        {"role": "user", "content": "a b c d"},
+        {"role": "assistant", "content": "e f"},
+        {"role": "system", "content": "ignored system prompt"},
+        {"role": "user", "content": "g h i"},
+    ]
+    window = select_message_window(history, max_tokens=6)
+    assert window == [
+        {"role": "assistant", "content": "e f"},
+        {"role": "user", "content": "g h i"},
+    ]
+
+
+def test_select_message_window_stops_at_first_overflow(monkeypatch):
+    counted = []
+
+    def counting(text, encoding_name='p50k_base'):
+        counted.append(text)
+        return fake_count_tokens(text)
+
+    monkeypatch.setattr(ee_module, "count_tokens", counting)
+    history = [{"role": "user", "content": "x " * 5} for _ in range(1000)]
+    window = select_message_window(history, max_tokens=12)
+    assert len(window) == 2
+    # Only the messages inspected before the budget filled are tokenised.
+    assert len(counted) == 3
@@ -0,0 +1,58 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+# Modules that must only be imported once the feature that needs them is used.
+HEAVY_MODULES = {"asyncio", "yaml", "pydub", "numpy", "openai", "httpx", "requests", "tiktoken", "whisper"}
+
+
+def imported_modules(statement):
+    """Return the modules imported by *statement*, from ``python -X importtime``."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = set()
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            name = line.rsplit("|", 1)[1].strip()
+            modules.add(name.split(".")[0])
+    return modules
+
+
+@pytest.mark.parametrize("statement", [
+    "import ephemerear",
+    "from ephemerear.EphemerEar import EphemerEar",
+    "from ephemerear.registry import BotRegistry",
+])
+def test_chat_imports_skip_heavy_dependencies(statement):
+    assert not imported_modules(statement) & HEAVY_MODULES
+
+
+def test_transcribe_import_defers_audio_tooling():
+    assert not imported_modules("import ephemerear.transcribe") & HEAVY_MODULES
+
+
+def test_lazy_names_resolve():
+    import ephemerear
+
+    assert ephemerear.handle_audio is ephemerear.transcribe.handle_audio
+    assert callable(ephemerear.EphemerEar)
+    with pytest.raises(AttributeError):
+        ephemerear.does_not_exist
+
+
+def test_submodules_are_not_shadowed_by_reexports():
+    import types
+
+    import ephemerear
+
+    assert isinstance(ephemerear.metrics, types.ModuleType)
+    assert ephemerear.metrics.metrics is not None
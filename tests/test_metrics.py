@@ -0,0 +1,95 @@
+import json
+import urllib.request
+from types import SimpleNamespace
+
+import pytest
+
+from ephemerear.EphemerEar import EphemerEar
+from ephemerear.metrics import Metrics, metrics
+
+
+@pytest.fixture
+def recorder(tmp_path):
+    recorder = Metrics()
+    recorder.enable(str(tmp_path / "metrics.jsonl"))
+    yield recorder
+    recorder.close()
+
+
+def read_events(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_disabled_metrics_record_nothing(tmp_path):
+    recorder = Metrics()
+    with recorder.span("stage") as span:
+        span.set(bytes=10)
+    recorder.count("things", 3)
+    assert recorder.snapshot() == {"spans": {}, "counters": {}}
+
+
+def test_spans_and_counts_are_logged_with_parents(recorder, tmp_path):
+    with recorder.span("handle_audio", file="a.m4a"):
+        with recorder.span("stt.request") as span:
+            span.set(attempt=0)
+        recorder.count("audio.exported_bytes", 1024)
+    with pytest.raises(ValueError):
+        with recorder.span("stt.request"):
+            raise ValueError("boom")
+    recorder.flush()
+
+    events = read_events(tmp_path / "metrics.jsonl")
+    assert [(e["type"], e["name"]) for e in events] == [
+        ("span", "stt.request"),
+        ("count", "audio.exported_bytes"),
+        ("span", "handle_audio"),
+        ("span", "stt.request"),
+    ]
+    assert events[0]["parent"] == "handle_audio" and events[0]["attempt"] == 0
+    assert events[2]["file"] == "a.m4a" and "parent" not in events[2]
+    assert events[3]["error"] is True
+
+    snapshot = recorder.snapshot()
+    assert snapshot["spans"]["stt.request"]["count"] == 2
+    assert snapshot["spans"]["stt.request"]["errors"] == 1
+    assert snapshot["counters"] == {"audio.exported_bytes": 1024}
+
+
+def test_prometheus_endpoint_serves_totals(recorder):
+    with recorder.span("chat.completion"):
+        pass
+    recorder.count("transcript_cache.hits", 2)
+    server = recorder.serve_prometheus(0)
+
+    url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+    body = urllib.request.urlopen(url, timeout=5).read().decode()
+
+    assert 'ephemerear_span_seconds_count{span="chat.completion"} 1' in body
+    assert "ephemerear_transcript_cache_hits_total 2" in body
+
+
+class FakeCompletions:
+    def create(self, **kwargs):
+        message = SimpleNamespace(content="hi there", tool_calls=None, function_call=None)
+        usage = SimpleNamespace(prompt_tokens=12, completion_tokens=3, total_tokens=15)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+def test_chat_turn_is_instrumented(bot_config, tmp_path, monkeypatch):
+    config = EphemerEar.load_yaml_to_dict(bot_config)
+    config["bot"]["metrics"] = True
+    config["bot"]["metrics_file"] = str(tmp_path / "chat-metrics.jsonl")
+    ee = EphemerEar(bot_config, config=config)
+    ee.background_side_effects = False
+    monkeypatch.setattr(ee.clients, "openai", lambda: SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions())))
+    try:
+        ee.gpt_chat("hello")
+        snapshot = metrics.snapshot()
+    finally:
+        metrics.disable()
+        metrics.reset()
+        metrics.path = None
+
+    assert {"history.read", "chat.window", "chat.completion", "history.write", "response.write"} <= set(snapshot["spans"])
+    assert snapshot["counters"]["chat.prompt_tokens"] == 12
+    assert snapshot["counters"]["chat.turns"] == 1
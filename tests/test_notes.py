@@ -0,0 +1,103 @@
+from ephemerear import functions as Functions
+from ephemerear.notes import NoteStore, normalize
+
+
+def test_normalize_ignores_markup_case_and_punctuation():
+    assert normalize("- [ ] Buy MILK!") == normalize("buy milk") == "buy milk"
+
+
+def test_add_skips_entries_with_the_same_text(tmp_path):
+    store = NoteStore(tmp_path / "notes.sqlite3")
+
+    first, created = store.add("todo", "- [ ] Book the dentist appointment for Tuesday")
+    assert created
+    assert store.add("todo", "- [x] book the dentist appointment for tuesday.")[0].id == first.id
+    assert store.add("todo", "- [ ] Book the vet appointment for Friday")[1] is True
+    # The same text is a separate entry when it is a different kind.
+    assert store.add("memory", "Book the dentist appointment for Tuesday")[1] is True
+
+    assert [note.text for note in store.list("todo")] == [
+        "- [ ] Book the vet appointment for Friday",
+        "- [ ] Book the dentist appointment for Tuesday",
+    ]
+
+
+def test_entries_differing_by_a_number_or_time_are_kept(tmp_path):
+    for similarity in (None, 0.8):
+        store = NoteStore(tmp_path / f"notes-{similarity}.sqlite3", similarity=similarity)
+        for first, second in [
+            ("Call the dentist at 3pm on Tuesday", "Call the dentist at 4pm on Tuesday"),
+            ("Buy 2 apples", "Buy 3 apples"),
+            ("Email Sam about the Q3 report", "Email Sam about the Q4 report"),
+            ("Water the plants on Monday", "Water the plants on Thursday"),
+        ]:
+            assert store.add("todo", first)[1] is True
+            assert store.add("todo", second)[1] is True
+
+    fuzzy = NoteStore(tmp_path / "fuzzy.sqlite3", similarity=0.9)
+    first, _ = fuzzy.add("todo", "Book the dentist appointment for Tuesday at 3pm")
+    assert fuzzy.add("todo", "Book the dentist appointmnt for Tuesday at 3pm")[0].id == first.id
+
+
+def test_search_matches_all_words(tmp_path):
+    store = NoteStore(tmp_path / "notes.sqlite3")
+    store.add("memory", "Sam's birthday is on the 3rd of June")
+    store.add("memory", "Prefers oat milk in coffee")
+    store.add("todo", "- [ ] Buy Sam a birthday present")
+
+    assert [note.text for note in store.search("sam birthday", kind="memory")] == ["Sam's birthday is on the 3rd of June"]
+    assert len(store.search("Sam birthday")) == 2
+    assert store.search('"unbalanced OR') == []
+
+
+def test_render_markdown_appends_only_new_entries(tmp_path):
+    store = NoteStore(tmp_path / "notes.sqlite3")
+    markdown = tmp_path / "todos.md"
+    store.add("todo", "- [ ] one")
+
+    assert store.render_markdown("todo", markdown) == 1
+    markdown.write_text(markdown.read_text() + "a line the user added\n")
+    store.add("todo", "- [ ] two")
+
+    assert store.render_markdown("todo", markdown) == 1
+    assert store.render_markdown("todo", markdown) == 0
+    assert markdown.read_text() == "# To-Do List\n\n- [ ] one\na line the user added\n- [ ] two\n"
+
+    markdown.unlink()
+    assert store.render_markdown("todo", markdown) == 2
+
+
+def test_existing_markdown_is_imported(tmp_path):
+    todo_file = tmp_path / "todos" / "todos.md"
+    todo_file.parent.mkdir()
+    todo_file.write_text("# To-Do List\n\n- [ ] Water the plants\n")
+
+    result = Functions.add_todo(text="- [ ] water the plants", todo_file=str(todo_file))
+
+    assert result == "This to-do item is already on your list: - [ ] Water the plants"
+    assert todo_file.read_text() == "# To-Do List\n\n- [ ] Water the plants\n"
+
+
+def test_list_and_search_tools(tmp_path):
+    todo_file = str(tmp_path / "todos.md")
+    memory_file = str(tmp_path / "memory.md")
+    Functions.add_todo(text="- [ ] Renew passport", todo_file=todo_file)
+    Functions.add_todo(text="- [ ] Renew passport", todo_file=todo_file)
+    Functions.commit_to_memory(text="Passport number ends in 42", memory_file=memory_file)
+
+    listed = Functions.list_todos(todo_file=todo_file)
+    found = Functions.search_notes("passport", todo_file=todo_file, memory_file=memory_file)
+
+    assert listed.count("Renew passport") == 1
+    assert "[todo]" in found and "[memory]" in found
+    assert Functions.search_notes("passport", kind="memory", todo_file=todo_file, memory_file=memory_file).startswith("[memory]")
+
+
+def test_search_notes_ranks_across_kinds(tmp_path):
+    todo_file = str(tmp_path / "todos.md")
+    memory_file = str(tmp_path / "memory.md")
+    Functions.add_todo(text="- [ ] Pick up the dry cleaning and a new umbrella from town", todo_file=todo_file)
+    Functions.commit_to_memory(text="Umbrella", memory_file=memory_file)
+
+    found = Functions.search_notes("umbrella", todo_file=todo_file, memory_file=memory_file)
+    assert found.splitlines()[0].startswith("[memory]")
@@ -0,0 +1,103 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from ephemerear.registry import BotRegistry
+
+
+def make_bot_config(directory, name, bot_config_text, openai_key="test-openai-token"):
+    text = Path(bot_config_text).read_text().replace("TestBot", name).replace("test-openai-token", openai_key)
+    path = Path(directory) / f"{name}.yaml"
+    path.write_text(text)
+    return path
+
+
+def bump_mtime(path):
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_get_returns_cached_instance(bot_config):
+    registry = BotRegistry({"test": bot_config})
+
+    assert registry.get("test") is registry["test"]
+    registry.close()
+
+
+def test_config_change_rebuilds_bot(bot_config):
+    registry = BotRegistry({"test": bot_config})
+    first = registry.get("test")
+
+    config_path = Path(bot_config)
+    config_path.write_text(config_path.read_text().replace("TestBot", "RenamedBot"))
+    bump_mtime(config_path)
+    second = registry.get("test")
+
+    assert second is not first
+    assert second.config["bot"]["name"] == "RenamedBot"
+    registry.close()
+
+
+def test_replaced_bot_can_finish_its_turn(bot_config):
+    registry = BotRegistry({"test": bot_config})
+    first = registry.get("test")
+    first.side_effects.flush()
+
+    config_path = Path(bot_config)
+    config_path.write_text(config_path.read_text().replace("TestBot", "RenamedBot"))
+    bump_mtime(config_path)
+    registry.get("test")
+
+    # A turn that was running on the old bot still saves its response.
+    first._dispatch_side_effects("question", "answer")
+    responses = list(Path(first.config["stores"]["responses"]).rglob("*.md"))
+    assert len(responses) == 1
+    registry.close()
+
+
+def test_prompt_change_rebuilds_bot(bot_config):
+    registry = BotRegistry({"test": bot_config})
+    first = registry.get("test")
+
+    prompt = Path(first.config["bot"]["system_prompt"])
+    prompt.write_text("A new persona for {user_name}.")
+    bump_mtime(prompt)
+
+    assert registry.get("test").system_prompt == "A new persona for TestUser."
+    registry.close()
+
+
+def test_from_directory_routes_by_stem_and_shares_clients(bot_config, tmp_path):
+    bots_dir = tmp_path / "bots"
+    bots_dir.mkdir()
+    make_bot_config(bots_dir, "alpha", bot_config)
+    make_bot_config(bots_dir, "beta", bot_config)
+    make_bot_config(bots_dir, "gamma", bot_config, openai_key="other-key")
+    (bots_dir / "notes.txt").write_text("not a bot")
+
+    registry = BotRegistry.from_directory(bots_dir)
+
+    assert registry.bot_ids == ["alpha", "beta", "gamma"]
+    assert registry.get("alpha").config["bot"]["name"] == "alpha"
+    assert registry.get("alpha").clients is registry.get("beta").clients
+    assert registry.get("alpha").clients is not registry.get("gamma").clients
+    assert registry.get("alpha").available_functions is not registry.get("beta").available_functions
+    registry.close()
+
+
+def test_bots_with_different_stt_timeouts_get_their_own_clients(bot_config, tmp_path):
+    slow = make_bot_config(tmp_path, "slow", bot_config)
+    slow.write_text(slow.read_text().replace("bot:\n", "bot:\n  stt_timeout: 900\n", 1))
+    registry = BotRegistry({"test": bot_config, "slow": slow})
+
+    assert registry.get("test").clients is not registry.get("slow").clients
+    assert registry.get("slow").clients.stt_timeout == 900
+    registry.close()
+
+
+def test_unknown_bot_id_raises(bot_config):
+    registry = BotRegistry({"test": bot_config})
+
+    with pytest.raises(KeyError, match="nope"):
+        registry.get("nope")
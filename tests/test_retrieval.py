@@ -0,0 +1,141 @@
+import os
+import zlib
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+from ephemerear.EphemerEar import EphemerEar
+from ephemerear.retrieval import Retriever, VectorIndex, split_passages
+
+
+class HashingEmbedder:
+    """Bag-of-words vectors, so texts sharing words are similar."""
+
+    def __init__(self, dim=64):
+        self.dim = dim
+        self.texts = []
+
+    def __call__(self, texts):
+        self.texts.extend(texts)
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, zlib.crc32(word.strip(".,!?").encode()) % self.dim] += 1
+        return vectors
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_split_passages_overlaps():
+    words = " ".join(f"w{i}" for i in range(250))
+
+    passages = split_passages(words, max_words=100, overlap=20)
+
+    assert [len(p.split()) for p in passages] == [100, 100, 90]
+    assert passages[1].split()[0] == "w80"
+    assert split_passages("") == []
+
+
+def test_refresh_only_embeds_new_or_changed_files(tmp_path):
+    notes = tmp_path / "notes"
+    write(notes / "garden.md", "The tomatoes need watering every morning.")
+    write(notes / "car.md", "The car is due for a service in March.")
+    embedder = HashingEmbedder()
+    retriever = Retriever(VectorIndex(tmp_path / "index"), embedder, [notes])
+
+    assert retriever.refresh() == 2
+    assert retriever.refresh() == 0
+
+    write(notes / "car.md", "The car service is booked for the 14th of March.")
+    assert retriever.refresh() == 1
+    assert embedder.texts[-1] == "The car service is booked for the 14th of March."
+
+    (notes / "garden.md").unlink()
+    retriever.refresh()
+    assert [p["text"] for p in retriever.retrieve("tomatoes watering")] == [
+        "The car service is booked for the 14th of March."
+    ]
+
+
+def test_search_ranks_by_similarity_and_persists(tmp_path):
+    notes = tmp_path / "notes"
+    write(notes / "a.md", "Sam likes oat milk in coffee.")
+    write(notes / "b.md", "The dentist appointment is on Tuesday.")
+    write(notes / "c.md", "Remember to renew the passport before summer.")
+    retriever = Retriever(VectorIndex(tmp_path / "index"), HashingEmbedder(), [notes])
+    retriever.refresh()
+
+    reopened = Retriever(VectorIndex(tmp_path / "index"), HashingEmbedder(), [notes])
+    assert reopened.refresh() == 0
+    top = reopened.retrieve("when is the dentist appointment", k=1)
+    assert top[0]["text"] == "The dentist appointment is on Tuesday."
+    assert Path(top[0]["source"]).name == "b.md"
+
+
+def test_retrieve_respects_token_budget(tmp_path):
+    notes = tmp_path / "notes"
+    write(notes / "long.md", "coffee " * 50)
+    write(notes / "short.md", "coffee beans")
+    retriever = Retriever(VectorIndex(tmp_path / "index"), HashingEmbedder(), [notes])
+    retriever.refresh()
+
+    assert [p["text"] for p in retriever.retrieve("coffee", max_tokens=10)] == ["coffee beans"]
+
+
+def test_compaction_drops_stale_rows(tmp_path):
+    notes = tmp_path / "notes"
+    retriever = Retriever(VectorIndex(tmp_path / "index"), HashingEmbedder(), [notes])
+    for version in range(4):
+        write(notes / "log.md", f"version {version} of the log")
+        retriever.refresh()
+
+    index = VectorIndex(tmp_path / "index")
+    assert index.rows <= 2 * index.active_rows
+    assert (tmp_path / "index" / "vectors.f32").stat().st_size == index.rows * index.dim * 4
+    assert [p["text"] for _, p in index.search(HashingEmbedder()(["log"])[0])] == ["version 3 of the log"]
+
+
+def test_index_ignores_rows_not_in_manifest(tmp_path):
+    index = VectorIndex(tmp_path / "index")
+    stat = os.stat(tmp_path)
+    index.add_file("a.md", stat, ["alpha"], np.ones((1, 4)))
+    # Simulate a crash after the rows were written but before the manifest.
+    with open(tmp_path / "index" / "vectors.f32", "ab") as file:
+        file.write(np.ones(4, dtype=np.float32).tobytes())
+    with open(tmp_path / "index" / "passages.jsonl", "a") as file:
+        file.write('{"source": "b.md", "text": "beta"}\n')
+
+    reopened = VectorIndex(tmp_path / "index")
+    reopened.add_file("c.md", stat, ["gamma"], np.ones((1, 4)))
+
+    assert [p["text"] for p in VectorIndex(tmp_path / "index").passages] == ["alpha", "gamma"]
+
+
+def test_gpt_chat_adds_retrieved_passages(bot_config, monkeypatch, tmp_path):
+    config_path = Path(bot_config)
+    config_path.write_text(config_path.read_text().replace("  use_pushover: false\n", "  use_pushover: false\n  retrieval: true\n"))
+    ee = EphemerEar(bot_config)
+    ee.retriever.embed = HashingEmbedder()
+    write(Path(ee.config["stores"]["transcripts"]) / "2024" / "walk.md", "Idea: build a cedar planter box for the balcony.")
+    ee.retriever.refresh()
+
+    requests = []
+    reply = SimpleNamespace(content="Sure.", tool_calls=None, function_call=None)
+    fake = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(
+        create=lambda **kwargs: requests.append(kwargs) or SimpleNamespace(choices=[SimpleNamespace(message=reply)])
+    )))
+    monkeypatch.setattr(ee.clients, "openai", lambda: fake)
+
+    ee.gpt_chat("what was my idea for the balcony planter?")
+    ee.close()
+
+    messages = requests[0]["messages"]
+    assert messages[1]["role"] == "system"
+    assert "cedar planter box" in messages[1]["content"]
+    assert messages[-1]["content"] == "what was my idea for the balcony planter?"
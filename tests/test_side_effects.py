@@ -0,0 +1,109 @@
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from ephemerear.EphemerEar import EphemerEar
+from ephemerear.side_effects import SideEffectQueue
+
+
+class RecordingNotifier:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.sent = []
+
+    def __call__(self, title, message, message_url):
+        time.sleep(self.delay)
+        self.sent.append((title, message, message_url))
+
+
+def test_notifications_within_window_are_coalesced():
+    notifier = RecordingNotifier()
+    queue = SideEffectQueue(notifier, coalesce_window=0.2)
+
+    queue.notify("ephemerear", "Response: hi")
+    queue.notify("ephemerear", "Written to MD", message_url="file:///tmp/hi.md")
+    queue.notify("ephemerear", "Response: hi")
+    assert queue.flush(timeout=2)
+
+    assert notifier.sent == [("ephemerear", "Response: hi\n\nWritten to MD", "file:///tmp/hi.md")]
+    assert queue.pushes_sent == 1
+    queue.close()
+
+
+def test_coalesced_message_is_truncated():
+    notifier = RecordingNotifier()
+    queue = SideEffectQueue(notifier, coalesce_window=0, max_message_length=10)
+
+    queue.notify("t", "x" * 50)
+    queue.close()
+
+    assert len(notifier.sent[0][1]) == 10
+
+
+def test_failures_do_not_stop_the_worker():
+    notifier = RecordingNotifier()
+    queue = SideEffectQueue(notifier, coalesce_window=0)
+    written = []
+
+    def fail():
+        raise OSError("disk full")
+
+    queue.submit(fail)
+    queue.submit(written.append, "after")
+    queue.notify("t", "still sent")
+    assert queue.flush(timeout=2)
+
+    assert written == ["after"]
+    assert notifier.sent == [("t", "still sent", None)]
+    queue.close()
+
+
+def test_close_drains_pending_work():
+    notifier = RecordingNotifier()
+    queue = SideEffectQueue(notifier, coalesce_window=60)
+    written = []
+
+    queue.submit(written.append, "file")
+    queue.notify("t", "pending")
+    queue.close(timeout=2)
+
+    assert written == ["file"]
+    assert notifier.sent == [("t", "pending", None)]
+
+
+def test_closed_queue_runs_work_inline():
+    notifier = RecordingNotifier()
+    queue = SideEffectQueue(notifier, coalesce_window=60)
+    queue.close(timeout=2)
+    written = []
+
+    queue.submit(written.append, "late file")
+    queue.notify("t", "late")
+
+    assert written == ["late file"]
+    assert notifier.sent == [("t", "late", None)]
+
+
+def test_gpt_chat_returns_before_side_effects_finish(bot_config, monkeypatch):
+    ee = EphemerEar(bot_config)
+    ee.notify = True
+    release = threading.Event()
+    pushes = []
+    monkeypatch.setattr(ee, "send_pushover", lambda *args, **kwargs: release.wait(2) and pushes.append(args))
+    message = SimpleNamespace(content="done", function_call=None)
+    fake = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(
+        create=lambda **kwargs: SimpleNamespace(choices=[SimpleNamespace(message=message)])
+    )))
+    monkeypatch.setattr(ee.clients, "openai", lambda: fake)
+
+    start = time.perf_counter()
+    assert ee.gpt_chat("hi") == "done"
+    assert time.perf_counter() - start < 0.5
+    assert [m["content"] for m in ee.get_history()] == ["hi", "done"]
+
+    release.set()
+    ee.close()
+
+    assert len(pushes) == 1
+    assert len(list(Path(ee.config["stores"]["responses"]).rglob("*.md"))) == 1
@@ -0,0 +1,133 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from ephemerear.EphemerEar import EphemerEar
+from ephemerear.history import JSONHistoryStore, JSONLHistoryStore
+from ephemerear.summary import RollingSummary
+
+
+def turns(count, start=0):
+    messages = []
+    for i in range(start, start + count):
+        messages.append({"role": "user", "content": f"question {i}"})
+        messages.append({"role": "assistant", "content": f"answer {i}"})
+    return messages
+
+
+@pytest.mark.parametrize("make_store", [
+    lambda path: JSONHistoryStore(path / "history.json"),
+    lambda path: JSONLHistoryStore(path / "history", segment_size=3),
+])
+def test_count_and_slice(tmp_path, make_store):
+    store = make_store(tmp_path)
+    store.append(turns(5))
+
+    assert store.count() == 10
+    assert [m["content"] for m in store.slice(2, 7)] == [
+        "question 1", "answer 1", "question 2", "answer 2", "question 3"
+    ]
+    store.append(turns(1, start=5))
+    assert store.count() == 12
+    assert store.slice(11, 20)[0]["content"] == "answer 5"
+
+
+def test_refresh_folds_evicted_messages_and_persists(tmp_path):
+    store = JSONLHistoryStore(tmp_path / "history")
+    store.append(turns(5))
+    calls = []
+
+    def summarize(previous, messages):
+        calls.append((previous, [m["content"] for m in messages]))
+        return f"{previous} +{len(messages)}".strip()
+
+    summary = RollingSummary(tmp_path / "history.summary.json", summarize, min_messages=4)
+
+    assert summary.refresh(store, window_start=2) is False
+    assert summary.refresh(store, window_start=6) is True
+    assert calls == [("", ["question 0", "answer 0", "question 1", "answer 1", "question 2", "answer 2"])]
+    assert summary.refresh(store, window_start=10) is True
+    assert calls[-1][0] == "+6"
+
+    reloaded = RollingSummary(tmp_path / "history.summary.json", summarize)
+    assert (reloaded.text, reloaded.covered) == ("+6 +4", 10)
+    assert "+6 +4" in reloaded.message()["content"]
+
+    # A rewritten, shorter history invalidates the summary.
+    store.replace(turns(1))
+    summary.min_messages = 1
+    summary.refresh(store, window_start=1)
+    assert (summary.text, summary.covered) == ("+1", 1)
+
+
+class SummarizingOpenAI:
+    """Answers chat turns and summary requests, reporting token usage."""
+
+    def __init__(self):
+        self.chat_requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        if kwargs["messages"][0]["content"].startswith("You maintain a running summary"):
+            content = "The user asked numbered questions."
+        else:
+            self.chat_requests.append(kwargs)
+            content = "ok"
+        message = SimpleNamespace(content=content, tool_calls=None, function_call=None)
+        usage = SimpleNamespace(prompt_tokens=100, completion_tokens=5, total_tokens=105)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+def test_long_backlog_is_folded_in_token_bounded_batches(tmp_path):
+    store = JSONLHistoryStore(tmp_path / "history")
+    store.append(turns(250))
+    batches = []
+
+    def summarize(previous, messages):
+        if len(batches) == 2:
+            raise RuntimeError("model unavailable")
+        batches.append(len(messages))
+        return f"{previous} +{len(messages)}".strip()
+
+    summary = RollingSummary(tmp_path / "history.summary.json", summarize,
+                             token_counter=lambda m: 10, max_batch_tokens=1000)
+    try:
+        summary.refresh(store, window_start=500)
+    except RuntimeError:
+        pass
+    # Each batch was within budget, and the ones done before the failure stick.
+    assert batches == [100, 100]
+    assert summary.covered == 200
+
+    summary.summarize = lambda previous, messages: batches.append(len(messages)) or previous
+    assert summary.refresh(store, window_start=500) is True
+    assert batches[2:] == [100, 100, 100]
+    assert summary.covered == 500
+
+
+def test_gpt_chat_sends_summary_within_window(bot_config, monkeypatch):
+    config_path = Path(bot_config)
+    config_path.write_text(
+        config_path.read_text()
+        .replace("max_message_window: 2000", "max_message_window: 20")
+        .replace("  use_pushover: false\n", "  use_pushover: false\n  summarize_history: true\n  summary_min_messages: 4\n")
+    )
+    ee = EphemerEar(bot_config)
+    ee.history_store.append(turns(10))
+    fake = SummarizingOpenAI()
+    monkeypatch.setattr(ee.clients, "openai", lambda: fake)
+
+    ee.gpt_chat("first new question")
+    ee.history_summary.wait(timeout=2)
+    assert ee.history_summary.covered > 0
+    assert ee.last_usage == {"prompt_tokens": 100, "completion_tokens": 5, "total_tokens": 105}
+    assert ee.get_history()[-1]["usage"]["total_tokens"] == 105
+
+    ee.gpt_chat("second new question")
+    ee.close()
+
+    messages = fake.chat_requests[-1]["messages"]
+    assert messages[1]["content"].endswith("The user asked numbered questions.")
+    # Summary and history together stay within max_message_window (whitespace tokens in tests).
+    assert sum(len(m["content"].split()) for m in messages[1:]) <= 20
@@ -0,0 +1,194 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from ephemerear.EphemerEar import EphemerEar
+from ephemerear.tools import ToolExecutor, parse_tool_arguments
+
+
+def tool_call(call_id, name, arguments):
+    return SimpleNamespace(id=call_id, type="function", function=SimpleNamespace(name=name, arguments=arguments))
+
+
+def message(content=None, tool_calls=None):
+    return SimpleNamespace(content=content, tool_calls=tool_calls, function_call=None)
+
+
+class ScriptedOpenAI:
+    """Returns the scripted replies in order and records each request."""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        return SimpleNamespace(choices=[SimpleNamespace(message=self.replies.pop(0))])
+
+
+def test_executor_runs_calls_concurrently_in_order():
+    def slow(text):
+        time.sleep(0.2)
+        return text.upper()
+
+    executor = ToolExecutor({"slow": slow})
+    start = time.perf_counter()
+    results = executor.run([tool_call("a", "slow", '{"text": "one"}'), tool_call("b", "slow", '{"text": "two"}')])
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.35
+    assert results == [
+        {"role": "tool", "tool_call_id": "a", "content": "Function 'slow' executed with response: ONE"},
+        {"role": "tool", "tool_call_id": "b", "content": "Function 'slow' executed with response: TWO"},
+    ]
+    executor.close()
+
+
+def test_executor_reports_timeouts_failures_and_unknown_tools():
+    def fail():
+        raise ValueError("bad input")
+
+    executor = ToolExecutor({"sleep": lambda: time.sleep(1), "fail": fail}, timeouts={"sleep": 0.05})
+    results = executor.run([tool_call("a", "sleep", "{}"), tool_call("b", "fail", ""), tool_call("c", "nope", "{}")])
+
+    assert [r["content"] for r in results] == [
+        "Function 'sleep' timed out after 0.05 seconds.",
+        "Function 'fail' failed: bad input",
+        "Function 'nope' is not available.",
+    ]
+    executor.close()
+
+
+def test_executor_times_calls_from_when_they_start():
+    def slow():
+        time.sleep(0.3)
+        return "ok"
+
+    executor = ToolExecutor({"slow": slow}, timeout=0.5, max_workers=1)
+    results = executor.run([tool_call(c, "slow", "{}") for c in "abc"])
+
+    assert [r["content"] for r in results] == ["Function 'slow' executed with response: ok"] * 3
+    executor.close()
+
+
+def test_executor_cancels_calls_that_never_get_a_worker():
+    ran = []
+    executor = ToolExecutor({"sleep": lambda: time.sleep(1), "record": lambda: ran.append(1)}, timeout=0.05, max_workers=1)
+    results = executor.run([tool_call("a", "sleep", "{}"), tool_call("b", "record", "{}")])
+
+    assert [r["content"] for r in results] == [
+        "Function 'sleep' timed out after 0.05 seconds.",
+        "Function 'record' did not start: all 1 tool workers were busy.",
+    ]
+    time.sleep(1.1)
+    assert ran == []
+    executor.close()
+
+
+def test_parse_tool_arguments_converts_dates():
+    arguments = parse_tool_arguments('{"text": "x", "when": "2024-05-01T09:30:00"}')
+
+    assert arguments["when"].hour == 9
+    assert arguments["text"] == "x"
+
+
+def test_gpt_chat_runs_tool_calls_and_sends_results_back(bot_config, monkeypatch):
+    ee = EphemerEar(bot_config)
+    todos, memories = [], []
+    ee.available_functions["add_todo"] = lambda text: todos.append(text) or "added"
+    ee.available_functions["commit_to_memory"] = lambda text: memories.append(text) or "remembered"
+    fake = ScriptedOpenAI([
+        message(tool_calls=[
+            tool_call("call_1", "add_todo", '{"text": "- [ ] milk"}'),
+            tool_call("call_2", "add_todo", '{"text": "- [ ] eggs"}'),
+            tool_call("call_3", "commit_to_memory", '{"text": "likes tea"}'),
+        ]),
+        message(content="Added two todos and noted that you like tea."),
+    ])
+    monkeypatch.setattr(ee.clients, "openai", lambda: fake)
+
+    reply = ee.gpt_chat("add milk and eggs, and remember I like tea")
+
+    assert reply == "Added two todos and noted that you like tea."
+    assert sorted(todos) == ["- [ ] eggs", "- [ ] milk"]
+    assert memories == ["likes tea"]
+    assert fake.requests[0]["tools"][0]["type"] == "function"
+    follow_up = fake.requests[1]["messages"]
+    assert follow_up[-4]["tool_calls"][0]["id"] == "call_1"
+    assert [m["tool_call_id"] for m in follow_up[-3:]] == ["call_1", "call_2", "call_3"]
+    assert [m["content"] for m in ee.get_history()][-1] == reply
+
+
+def test_last_round_disables_tool_calls(bot_config, monkeypatch):
+    ee = EphemerEar(bot_config)
+    ee.max_tool_rounds = 1
+    ee.available_functions["add_todo"] = lambda text: "added"
+    fake = ScriptedOpenAI([
+        message(tool_calls=[tool_call("call_1", "add_todo", '{"text": "x"}')]),
+        message(content=None),
+    ])
+    monkeypatch.setattr(ee.clients, "openai", lambda: fake)
+
+    reply = ee.gpt_chat("add x")
+
+    assert "tool_choice" not in fake.requests[0]
+    assert fake.requests[1]["tool_choice"] == "none"
+    # No text after the tools ran, so their results are the reply.
+    assert reply == "Function 'add_todo' executed with response: added"
+
+
+def tool_chunk(index, call_id=None, name=None, arguments=None):
+    call = SimpleNamespace(index=index, id=call_id, function=SimpleNamespace(name=name, arguments=arguments))
+    delta = SimpleNamespace(content=None, function_call=None, tool_calls=[call])
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+def text_chunk(content):
+    delta = SimpleNamespace(content=content, function_call=None, tool_calls=None)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+class ScriptedStreamingOpenAI(ScriptedOpenAI):
+    def create(self, **kwargs):
+        assert kwargs["stream"] is True
+        self.requests.append(kwargs)
+        return iter(self.replies.pop(0))
+
+
+def test_gpt_chat_stream_assembles_and_runs_tool_calls(bot_config, monkeypatch):
+    ee = EphemerEar(bot_config)
+    calls = []
+    ee.available_functions["remember"] = lambda text: calls.append(text) or "stored"
+    fake = ScriptedStreamingOpenAI([
+        [
+            tool_chunk(0, call_id="call_1", name="remember", arguments=""),
+            tool_chunk(1, call_id="call_2", name="remember", arguments='{"text": "eggs"}'),
+            tool_chunk(0, arguments='{"text": "buy '),
+            tool_chunk(0, arguments='milk"}'),
+        ],
+        [text_chunk("Both "), text_chunk("stored.")],
+    ])
+    monkeypatch.setattr(ee.clients, "openai", lambda: fake)
+
+    assert list(ee.gpt_chat_stream("remember milk and eggs")) == ["Both ", "stored."]
+    assert sorted(calls) == ["buy milk", "eggs"]
+    assert [m["tool_call_id"] for m in fake.requests[1]["messages"][-2:]] == ["call_1", "call_2"]
+
+
+class ScriptedAsyncOpenAI(ScriptedOpenAI):
+    async def create(self, **kwargs):
+        return super().create(**kwargs)
+
+
+def test_agpt_chat_runs_tool_calls(bot_config, monkeypatch):
+    ee = EphemerEar(bot_config)
+    ee.available_functions["add_todo"] = lambda text: "added"
+    fake = ScriptedAsyncOpenAI([
+        message(tool_calls=[tool_call("call_1", "add_todo", '{"text": "x"}')]),
+        message(content="Done."),
+    ])
+    monkeypatch.setattr(ee.clients, "async_openai", lambda: fake)
+
+    assert asyncio.run(ee.agpt_chat("add x")) == "Done."
+    assert fake.requests[1]["messages"][-1]["content"] == "Function 'add_todo' executed with response: added"
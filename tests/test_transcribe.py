@@ -0,0 +1,369 @@
+import math
+import shutil
+import struct
+import sys
+import threading
+import time
+import wave
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+from ephemerear.cache import TranscriptCache, cache_key, hash_file
+from ephemerear.EphemerEar import EphemerEar
+from ephemerear.preprocess import TimestampMap, preprocess_audio, speech_segments
+from ephemerear.transcribe import (
+    DEFAULT_OPENAI_TRANSCRIBE_MODEL,
+    TranscriptionContext,
+    chunk_spans,
+    find_quiet_point,
+    frame_rms,
+    handle_audio,
+    handle_transcript,
+    iter_audio_chunks,
+    plan_chunks,
+    probe_duration_ms,
+    transcribe_audio,
+    whisper_api_transcribe,
+)
+
+requires_ffmpeg = pytest.mark.skipif(
+    shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None,
+    reason="ffmpeg and ffprobe are required for audio tests",
+)
+
+
+def write_tone(path, seconds, rate=8000, frequency=440.0, silences=()):
+    """Write a mono sine tone, muted during each ``(start_s, end_s)`` in *silences*."""
+    def sample(i):
+        t = i / rate
+        if any(start <= t < end for start, end in silences):
+            return 0
+        return int(8000 * math.sin(2 * math.pi * frequency * t))
+
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(b"".join(struct.pack("<h", sample(i)) for i in range(int(seconds * rate))))
+    return str(path)
+
+
+class FakeAPIError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+class FakeTranscriptionClient:
+    """Stand-in for ``OpenAI`` that sleeps instead of calling the API."""
+
+    def __init__(self, latency=0.0, failures=None):
+        self.latency = latency
+        self.failures = dict(failures or {})
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self.audio = SimpleNamespace(transcriptions=SimpleNamespace(create=self.create))
+
+    def create(self, model, file, prompt):
+        name = Path(file.name).stem
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            status_code = self.failures.pop(name, None)
+        try:
+            time.sleep(self.latency)
+            if status_code is not None:
+                raise FakeAPIError(status_code)
+            return SimpleNamespace(text=name)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+@pytest.fixture
+def chunk_files(tmp_path):
+    chunks = []
+    for i in range(8):
+        chunk = tmp_path / f"chunk{i}.mp3"
+        chunk.write_bytes(b"")
+        chunks.append(str(chunk))
+    return chunks
+
+
+def test_concurrent_transcription_preserves_order_and_is_faster(chunk_files):
+    client = FakeTranscriptionClient(latency=0.05)
+    start = time.perf_counter()
+    sequential = whisper_api_transcribe(chunk_files, "key", max_concurrency=1, client=client)
+    sequential_time = time.perf_counter() - start
+
+    client = FakeTranscriptionClient(latency=0.05)
+    start = time.perf_counter()
+    concurrent = whisper_api_transcribe(chunk_files, "key", max_concurrency=4, client=client)
+    concurrent_time = time.perf_counter() - start
+
+    assert concurrent == sequential == " ".join(f"chunk{i}" for i in range(8))
+    assert client.max_in_flight == 4
+    assert concurrent_time < sequential_time / 2
+
+
+def test_transient_errors_are_retried(chunk_files):
+    client = FakeTranscriptionClient(failures={"chunk2": 429, "chunk5": 503})
+    text = whisper_api_transcribe(chunk_files, "key", retry_backoff=0.001, client=client)
+    assert text.split() == [f"chunk{i}" for i in range(8)]
+    assert client.calls == 10
+
+
+def test_client_errors_are_not_retried(chunk_files):
+    client = FakeTranscriptionClient(failures={"chunk0": 400})
+    with pytest.raises(FakeAPIError):
+        whisper_api_transcribe(chunk_files[:1], "key", retry_backoff=0.001, client=client)
+    assert client.calls == 1
+
+
+def test_chunk_spans_cover_whole_duration():
+    assert chunk_spans(2500, 1000) == [(0, 1000), (1000, 2000), (2000, 2500)]
+    assert chunk_spans(0, 1000) == [(0, 0)]
+
+
+@requires_ffmpeg
+def test_iter_audio_chunks_streams_chunks_in_order(tmp_path):
+    audio = write_tone(tmp_path / "tone.wav", seconds=3)
+    cache_dir = tmp_path / "cache"
+    plan = plan_chunks(audio, max_chunk_ms=1000, silence_search_ms=0)
+    chunks = iter_audio_chunks(audio, cache_dir=str(cache_dir), encode_workers=1, plan=plan)
+
+    first = next(chunks)
+    assert Path(first).name == "tone_chunk000.mp3"
+    assert Path(first).exists()
+
+    rest = list(chunks)
+    assert [Path(c).name for c in rest] == ["tone_chunk001.mp3", "tone_chunk002.mp3"]
+    # MP3 framing adds a little padding to each chunk.
+    for chunk in [first] + rest:
+        assert abs(probe_duration_ms(chunk) - 1000) < 250
+
+
+def test_frame_rms_is_computed_per_frame():
+    samples = [0] * 4 + [3, -3, 3, -3]
+    assert list(frame_rms(samples, 4)) == [0.0, 3.0]
+
+
+def test_plan_respects_byte_budget_without_silence_search():
+    # 1 MB at 128 kbps is 62.5 seconds of audio.
+    plan = plan_chunks("unused.wav", max_chunk_ms=600_000, max_chunk_bytes=1_000_000,
+                       silence_search_ms=0, duration_ms=180_000)
+    assert plan.target_length_ms == 62_500
+    assert len(plan.spans) == 3
+    assert plan.spans[-1][1] == 180_000
+
+
+def test_plan_cuts_never_cross(monkeypatch):
+    # Move cuts as far apart as the search allows: the first one later, the
+    # second one earlier.
+    def far_edge(file_path, center_ms, search_ms):
+        return center_ms + search_ms // 2 if center_ms < 30_000 else center_ms - search_ms // 2
+
+    monkeypatch.setattr("ephemerear.transcribe.find_quiet_point", far_edge)
+    plan = plan_chunks("unused.wav", max_chunk_ms=60_000, silence_search_ms=30_000, duration_ms=61_000)
+
+    assert len(plan.spans) == 3
+    assert all(0 < end - start <= 60_000 for start, end in plan.spans)
+
+
+@requires_ffmpeg
+def test_plan_moves_cuts_to_nearby_silence(tmp_path):
+    audio = write_tone(tmp_path / "speech.wav", seconds=4, silences=[(2.3, 2.6)])
+    assert 2300 <= find_quiet_point(audio, center_ms=2000, search_ms=1400) <= 2600
+
+    plan = plan_chunks(audio, max_chunk_ms=3500, silence_search_ms=1400)
+    assert len(plan.spans) == 2
+    assert 2300 <= plan.cuts[0] <= 2600
+    assert all(end - start <= 3500 for start, end in plan.spans)
+    assert "cut moved" in plan.summary()
+
+
+@requires_ffmpeg
+def test_transcribe_audio_reuses_cached_chunks(tmp_path):
+    audio = write_tone(tmp_path / "tone.wav", seconds=3)
+    cache = TranscriptCache(tmp_path / "transcripts")
+    options = dict(cache_dir=str(tmp_path / "chunks"), chunk_length_ms=1000, silence_search_ms=0, transcript_cache=cache)
+
+    client = FakeTranscriptionClient()
+    first = transcribe_audio(audio, "key", client=client, **options)
+    assert client.calls == 3
+    assert list((tmp_path / "chunks").iterdir()) == []
+
+    client = FakeTranscriptionClient()
+    assert transcribe_audio(audio, "key", client=client, **options) == first
+    assert client.calls == 0
+    assert cache.hits == 3
+
+
+def cached_recording(tmp_path, context, name, text):
+    """Write a fake recording whose transcript is already in the context's cache."""
+    audio = tmp_path / f"{name}-recording.m4a"
+    audio.write_bytes(name.encode() * 64)
+    cache = context.transcript_cache(context.config["bot"]["cache"])
+    cache.put(cache_key(hash_file(str(audio)), "openai", DEFAULT_OPENAI_TRANSCRIBE_MODEL, ""), text)
+    return str(audio)
+
+
+def test_handle_audio_reuses_the_context_bot(bot_config, tmp_path, monkeypatch):
+    ee = EphemerEar(bot_config)
+    prompts = []
+    monkeypatch.setattr(ee, "gpt_chat", prompts.append)
+    context = TranscriptionContext.from_bot(ee)
+    monkeypatch.setattr(EphemerEar, "load_yaml_to_dict", staticmethod(lambda path: pytest.fail("config re-read")))
+    monkeypatch.setattr(EphemerEar, "__init__", lambda *args, **kwargs: pytest.fail("bot rebuilt"))
+
+    for name, text in [("one", "Prompt: remind me to call Sam."), ("two", "Just some notes."), ("three", "Prompt: buy milk")]:
+        handle_audio(
+            cached_recording(tmp_path, context, name, text),
+            ee.api_key,
+            "",
+            ee.config["stores"]["transcripts"],
+            cache_dir=ee.config["bot"]["cache"],
+            context=context,
+        )
+
+    assert prompts == ["remind me to call Sam.", "buy milk"]
+    assert context.transcript_cache(ee.config["bot"]["cache"]).hits == 3
+
+
+def test_context_builds_the_bot_once_on_first_prompt(bot_config, tmp_path, monkeypatch):
+    built = []
+    monkeypatch.setattr(EphemerEar, "gpt_chat", lambda self, prompt: built.append(self))
+    context = TranscriptionContext.from_config_file(bot_config)
+
+    handle_transcript("No trigger here.", str(tmp_path), "plain", context=context)
+    assert context.bot is None
+
+    handle_transcript("Prompt: first", str(tmp_path), "first", context=context)
+    handle_transcript("Prompt: second", str(tmp_path), "second", context=context)
+    assert len(built) == 2 and built[0] is built[1] is context.bot
+    assert context.bot.clients is context.clients
+    context.close()
+
+
+class SpokenPromptClient(FakeTranscriptionClient):
+    """Says a prompt in the first chunk, which comes back at once; later chunks are slow."""
+
+    def __init__(self, latency):
+        super().__init__(latency=latency)
+        self.completed = 0
+
+    def create(self, model, file, prompt):
+        index = int(Path(file.name).stem[-3:])
+        if index:
+            time.sleep(self.latency)
+        with self._lock:
+            self.completed += 1
+        return SimpleNamespace(text="Prompt: call Sam back." if index == 0 else f"more {index}")
+
+
+@requires_ffmpeg
+def test_handle_audio_sends_the_prompt_before_transcription_finishes(bot_config, tmp_path, monkeypatch):
+    config = EphemerEar.load_yaml_to_dict(bot_config)
+    config["bot"].update(stt_chunk_minutes=1 / 60, stt_silence_search_seconds=0, transcript_cache=False)
+    ee = EphemerEar(bot_config, config=config)
+    client = SpokenPromptClient(latency=0.3)
+    sent = []
+    monkeypatch.setattr(ee, "gpt_chat", lambda prompt: sent.append((prompt, client.completed)))
+    audio = write_tone(tmp_path / "memo-recording.wav", seconds=3)
+
+    handle_audio(
+        audio,
+        ee.api_key,
+        "",
+        ee.config["stores"]["transcripts"],
+        cache_dir=str(tmp_path / "chunks"),
+        client=client,
+        context=TranscriptionContext.from_bot(ee),
+    )
+
+    assert sent == [("call Sam back.", 1)]
+    (transcript,) = Path(ee.config["stores"]["transcripts"]).rglob("*.md")
+    assert transcript.name == "memo.md"
+    assert transcript.read_text() == "Prompt: call Sam back. more 1 more 2"
+
+
+def test_speech_segments_drop_long_pauses_and_pad_speech():
+    # 30 ms frames: 1.5 s of speech, 3 s of silence, 0.6 s of speech.
+    rms = [5000.0] * 50 + [0.0] * 100 + [5000.0] * 20
+    assert speech_segments(rms, frame_ms=30, min_silence_ms=1000, padding_ms=240) == [(0, 1740), (4260, 5100)]
+
+    short_pause = [5000.0] * 20 + [0.0] * 10 + [5000.0] * 20
+    assert speech_segments(short_pause, frame_ms=30, min_silence_ms=1000, padding_ms=0) == [(0, 1500)]
+    assert speech_segments([0.0] * 40, frame_ms=30) == [(0, 1200)]
+
+
+def test_timestamp_map_translates_back_to_the_original():
+    timestamp_map = TimestampMap([(0, 1000), (4000, 5000), (9000, 9500)])
+    assert timestamp_map.duration_ms == 2500
+    assert timestamp_map.to_source(500) == 500
+    assert timestamp_map.to_source(1000) == 4000
+    assert timestamp_map.to_source(2200) == 9200
+
+
+@requires_ffmpeg
+def test_preprocess_trims_silence_and_shrinks_the_upload(tmp_path):
+    audio = write_tone(tmp_path / "memo.wav", seconds=12, rate=44100, silences=[(3, 9)])
+    result = preprocess_audio(audio, str(tmp_path / "preprocessed"))
+
+    assert result.output_bytes < result.input_bytes / 10
+    assert 6000 <= result.output_ms <= 7000
+    assert len(result.timestamp_map.segments) == 2
+    assert abs(probe_duration_ms(result.output_path) - result.output_ms) < 150
+    assert TimestampMap.load(result.timemap_path) == result.timestamp_map
+
+    # A recording with the same name from another folder doesn't overwrite it.
+    (tmp_path / "other").mkdir()
+    other = preprocess_audio(write_tone(tmp_path / "other" / "memo.wav", seconds=2, rate=44100),
+                             str(tmp_path / "preprocessed"))
+    assert other.output_path != result.output_path
+    assert other.timemap_path != result.timemap_path
+    assert TimestampMap.load(result.timemap_path) == result.timestamp_map
+
+    # Audio that will be chunked is kept as WAV and only the chunks are encoded.
+    chunked = preprocess_audio(audio, str(tmp_path / "chunked"), chunk_length_ms=4000)
+    assert chunked.encoded_per_chunk and chunked.output_path.endswith(".wav")
+    chunks = iter_audio_chunks(chunked.output_path, target_length_ms=4000, cache_dir=str(tmp_path / "chunks"),
+                               audio_format=chunked.audio_format)
+    assert {Path(chunk).suffix for chunk in chunks} == {".ogg"}
+
+
+@requires_ffmpeg
+def test_handle_audio_uploads_the_preprocessed_recording(bot_config, tmp_path):
+    config = EphemerEar.load_yaml_to_dict(bot_config)
+    config["bot"].update(stt_preprocess=True, transcript_cache=False)
+    ee = EphemerEar(bot_config, config=config)
+    uploads = []
+
+    class RecordingClient(FakeTranscriptionClient):
+        def create(self, model, file, prompt):
+            uploads.append((Path(file.name).suffix, probe_duration_ms(file.name)))
+            return super().create(model, file, prompt)
+
+    audio = write_tone(tmp_path / "memo-recording.wav", seconds=8, rate=44100, silences=[(2, 6)])
+    handle_audio(
+        audio,
+        ee.api_key,
+        "",
+        ee.config["stores"]["transcripts"],
+        cache_dir=str(tmp_path / "cache"),
+        client=RecordingClient(),
+        context=TranscriptionContext.from_bot(ee),
+    )
+
+    ((suffix, duration_ms),) = uploads
+    assert suffix == ".ogg"
+    assert duration_ms < 5000
+    assert not list((tmp_path / "cache" / "preprocessed").iterdir())
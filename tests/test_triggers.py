@@ -0,0 +1,44 @@
+import importlib
+
+from ephemerear.triggers import TriggerMatcher
+
+# Imported through the module: pytest would collect a bare ``testforword``.
+ee_module = importlib.import_module("ephemerear.EphemerEar")
+
+
+def test_finds_trigger_and_prompt_span():
+    text = "Okay. Prompt: remind me to call Sam on Friday.  \n"
+    match = TriggerMatcher().search(text)
+
+    assert match.word == "prompt"
+    assert text[slice(*match.trigger_span)] == "Prompt:"
+    assert match.prompt(text) == "remind me to call Sam on Friday."
+
+
+def test_only_scans_the_first_words():
+    matcher = TriggerMatcher(scan_words=3)
+
+    assert matcher.search("one two three prompt four") is None
+    assert matcher.search("one two prompt four").prompt("one two prompt four") == "four"
+
+
+def test_configured_trigger_words():
+    matcher = TriggerMatcher.from_config({"bot": {"trigger_words": ["hey-bot", "ask"]}})
+
+    assert matcher.search("prompt: ignored") is None
+    assert matcher.search("Hey-Bot, what's the weather").prompt("Hey-Bot, what's the weather") == "what's the weather"
+    assert TriggerMatcher.from_config({"bot": {"trigger_words": ["hey-bot", "ask"]}}) is matcher
+
+
+def test_trigger_without_prompt_text():
+    match = TriggerMatcher().search("Prompt.")
+
+    assert match is not None
+    assert match.prompt("Prompt.") == ""
+
+
+def test_testforword_matches_word_prefixes():
+    assert ee_module.testforword("Notes from today", "prompt|from|prom")
+    assert ee_module.testforword("PROMPTING is fun", "prompt")
+    assert not ee_module.testforword("a b c prompt", "prompt", splitrange=3)
+    assert not ee_module.testforword(None, "prompt")
@@ -0,0 +1,102 @@
+import socket
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+from ephemerear.transcribe import whisper_local_transcribe
+from ephemerear.whisper_daemon import DaemonUnavailable, WhisperDaemon, is_daemon_running, submit_job
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    jobs = []
+
+    def fake_transcribe(file_path, model, custom_prompt):
+        jobs.append((file_path, model, custom_prompt))
+        if file_path.endswith("broken.m4a"):
+            raise ValueError("cannot decode")
+        return f"{Path(file_path).name} via {model}"
+
+    server = WhisperDaemon(str(tmp_path / "whisper.sock"), transcribe=fake_transcribe)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield server, jobs
+    server.shutdown()
+    server.server_close()
+
+
+def test_submit_job_runs_on_daemon(daemon):
+    server, jobs = daemon
+    assert is_daemon_running(server.socket_path)
+    text = submit_job("memo.m4a", model="small", custom_prompt="Hi", socket_path=server.socket_path)
+    assert text == "memo.m4a via small"
+    assert jobs[0][0] == str(Path("memo.m4a").resolve())
+
+
+def test_daemon_errors_are_reported_to_client(daemon):
+    server, _ = daemon
+    with pytest.raises(RuntimeError, match="cannot decode"):
+        submit_job("broken.m4a", socket_path=server.socket_path)
+
+
+def test_whisper_local_transcribe_prefers_daemon(daemon):
+    server, jobs = daemon
+    assert whisper_local_transcribe("memo.m4a", socket_path=server.socket_path) == "memo.m4a via base"
+    assert len(jobs) == 1
+
+
+def test_whisper_local_transcribe_falls_back_in_process(tmp_path, monkeypatch):
+    socket_path = str(tmp_path / "missing.sock")
+    with pytest.raises(DaemonUnavailable):
+        submit_job("memo.m4a", socket_path=socket_path)
+
+    monkeypatch.setattr(
+        "ephemerear.whisper_daemon.transcribe_in_process",
+        lambda file_path, model, custom_prompt: "in-process",
+    )
+    assert whisper_local_transcribe("memo.m4a", socket_path=socket_path) == "in-process"
+
+
+def test_daemon_closing_without_reply_is_unavailable(tmp_path):
+    socket_path = str(tmp_path / "dying.sock")
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen(1)
+
+    def accept_and_close():
+        connection, _ = listener.accept()
+        connection.recv(4096)
+        connection.close()
+
+    thread = threading.Thread(target=accept_and_close, daemon=True)
+    thread.start()
+    try:
+        with pytest.raises(DaemonUnavailable):
+            submit_job("memo.m4a", socket_path=socket_path)
+    finally:
+        thread.join(timeout=5)
+        listener.close()
+
+
+def test_platforms_without_unix_sockets_fall_back_in_process():
+    script = """
+import os, socket, socketserver, sys
+del os.getuid, socket.AF_UNIX, socketserver.ThreadingUnixStreamServer
+import ephemerear.transcribe
+assert "ephemerear.whisper_daemon" not in sys.modules
+from ephemerear.whisper_daemon import DaemonUnavailable, is_daemon_running, submit_job
+assert not is_daemon_running()
+try:
+    submit_job("memo.m4a")
+except DaemonUnavailable:
+    pass
+else:
+    raise AssertionError("submit_job should report the daemon unavailable")
+"""
+    subprocess.run([sys.executable, "-c", script], cwd=ROOT_DIR, check=True)